@@ -1,99 +1,357 @@
-from fastapi import APIRouter, HTTPException, Query
-from typing import List, Optional
+from fastapi import APIRouter, HTTPException, Query, Header, Response
+from fastapi.responses import StreamingResponse
+from typing import List, Literal, Optional, Sequence, Tuple
 from datetime import datetime, timedelta
 
+from app.core.serialization import (
+    documents_response,
+    json_response,
+    nearby_station_list_adapter,
+    alert_list_adapter,
+    analytics_adapter,
+    flow_summary_adapter,
+    history_adapter,
+    incident_stats_adapter,
+    station_list_adapter
+)
+from app.core.tenants import get_tenant_index, is_known_tenant
 from app.database.connection import get_database
-from app.models.schemas import StationResponse, Alert, Analytics
+from app.models.schemas import StationResponse, NearbyStation, Alert, Analytics, AvailabilityHistory, FlowSummary, IncidentStats, Tenant
+from app.services.alert_service import ALERT_FIELDS, decode_alert_cursor, find_alerts
 from app.services.gbfs_service import gbfs_service
-from app.services.analytics_service import analytics_service
+from app.services.incident_stats import incident_stats_service
+from app.services.analytics_service import analytics_service, to_naive_utc
+from app.services.flow_service import flow_service
+from app.services.result_cache import caches
+from app.services.station_cache import (
+    STATION_FIELDS,
+    station_cache,
+    build_station_fields,
+    build_station_response,
+    station_projection,
+    station_status_query
+)
+from app.services.station_stream import station_stream
+from app.services.station_locator import station_locator
+from app.services.station_metadata import station_metadata
+from app.services.status_history_service import status_history_service
 
 router = APIRouter()
 
+def parse_fields(fields: Optional[str], allowed: Sequence[str]) -> Optional[Tuple[str, ...]]:
+    """Comma-separated ?fields= as a tuple in response field order (None when absent)"""
+    if fields is None:
+        return None
+    requested = {name.strip() for name in fields.split(",") if name.strip()}
+    unknown = requested.difference(allowed)
+    if unknown or not requested:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Invalid fields: {', '.join(sorted(unknown)) or '(none)'}; choose from {', '.join(allowed)}"
+        )
+    return tuple(name for name in allowed if name in requested)
+
 @router.get("/health")
 async def health_check():
     """Health check endpoint"""
     return {"status": "healthy", "timestamp": datetime.now()}
 
+@router.get("/tenants", response_model=List[Tenant])
+async def get_tenants():
+    """Configured tenants; stations and trips outside every polygon belong to the default tenant"""
+    index = get_tenant_index()
+    return [
+        Tenant(
+            tenant_id=tenant_id,
+            name=index.names[tenant_id],
+            is_default=tenant_id == index.default_tenant,
+            bounds=list(index.bounds[tenant_id]) if tenant_id in index.bounds else None
+        )
+        for tenant_id in index.tenant_ids
+    ]
+
+@router.get("/stations/nearby", response_model=List[NearbyStation])
+async def get_nearby_stations(
+    lat: float = Query(..., ge=-90, le=90),
+    lon: float = Query(..., ge=-180, le=180),
+    limit: int = Query(10, ge=1, le=100),
+    min_bikes: int = Query(0, ge=0, description="Only stations with at least this many bikes"),
+    min_docks: int = Query(0, ge=0, description="Only stations with at least this many free docks"),
+    max_distance_m: Optional[float] = Query(None, gt=0),
+    tenant_id: Optional[str] = None,
+    include_inactive: bool = False
+):
+    """Get the nearest stations to a point, closest first, from the in-memory spatial index"""
+    if tenant_id is not None and not is_known_tenant(tenant_id):
+        raise HTTPException(status_code=400, detail="Invalid tenant_id")
+    
+    query = dict(
+        lat=lat,
+        lon=lon,
+        limit=limit,
+        min_bikes=min_bikes,
+        min_docks=min_docks,
+        max_distance_m=max_distance_m,
+        tenant_id=tenant_id,
+        include_inactive=include_inactive
+    )
+    if station_locator.is_ready:
+        return json_response(nearby_station_list_adapter, station_locator.nearest(**query))
+    
+    try:
+        stations = await station_locator.nearest_from_db(get_database(), **query)
+        return json_response(nearby_station_list_adapter, stations)
+        
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error fetching nearby stations: {str(e)}")
+
 @router.get("/stations/{tenant_id}", response_model=List[StationResponse])
-async def get_tenant_stations(tenant_id: str):
+async def get_tenant_stations(
+    tenant_id: str,
+    fields: Optional[str] = Query(None, description="Comma-separated response fields to return"),
+    status: Optional[List[Literal["green", "yellow", "red"]]] = Query(None, description="Only stations with these status colors"),
+    if_none_match: Optional[str] = Header(None)
+):
     """Get all stations for a tenant"""
-    if tenant_id not in ["manhattan", "brooklyn"]:
+    if not is_known_tenant(tenant_id):
         raise HTTPException(status_code=400, detail="Invalid tenant_id")
     
+    selected_fields = parse_fields(fields, STATION_FIELDS)
+    status_colors = frozenset(status) if status else None
+    
+    snapshot = station_cache.get(tenant_id)
+    if snapshot is not None:
+        snapshot = snapshot.view(selected_fields, status_colors)
+        headers = {"ETag": snapshot.etag, "Cache-Control": "no-cache"}
+        if if_none_match and snapshot.etag in [tag.strip() for tag in if_none_match.split(",")]:
+            return Response(status_code=304, headers=headers)
+        return Response(
+            content=snapshot.body,
+            media_type="application/json",
+            headers=headers
+        )
+    
     try:
         db = get_database()
-        stations_cursor = db.stations.find({"tenant_id": tenant_id})
-        stations = await stations_cursor.to_list(None)
+        query = {"tenant_id": tenant_id, "removed_at": {"$exists": False}}
+        if status_colors is not None:
+            query.update(station_status_query(status_colors))
+        
+        if selected_fields is not None:
+            stations = await db.stations.find(query, station_projection(selected_fields)).to_list(None)
+            return documents_response([build_station_fields(station, selected_fields) for station in stations])
         
-        response_stations = []
-        for station in stations:
-            status = station["current_status"]
-            
-            bikes_available = status["bikes_available"]
-            docks_available = status["docks_available"]
-            
-            if bikes_available <= 3 or docks_available <= 3:
-                status_color = "red" if bikes_available == 0 or docks_available == 0 else "yellow"
-            else:
-                status_color = "green"
-            
-            response_stations.append(StationResponse(
-                station_id=station["station_id"],
-                name=station["name"],
-                lat=station["lat"],
-                lon=station["lon"],
-                capacity=station["capacity"],
-                bikes_available=bikes_available,
-                docks_available=docks_available,
-                last_updated=status["last_updated"],
-                status_color=status_color
-            ))
+        stations_cursor = db.stations.find(query)
+        stations = await stations_cursor.to_list(None)
         
-        return response_stations
+        return json_response(
+            station_list_adapter,
+            [build_station_response(station) for station in stations]
+        )
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error fetching stations: {str(e)}")
 
+@router.get("/stations/{tenant_id}/stream")
+async def stream_tenant_stations(tenant_id: str):
+    """
+    Server-Sent Events: a `snapshot` of all stations on connect, then an
+    `update` with only the changed/removed stations after each GBFS cycle
+    """
+    if not is_known_tenant(tenant_id):
+        raise HTTPException(status_code=400, detail="Invalid tenant_id")
+    
+    return StreamingResponse(
+        station_stream.stream(tenant_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@router.get("/stations/{tenant_id}/history", response_model=AvailabilityHistory)
+async def get_station_history(
+    tenant_id: str,
+    start: Optional[datetime] = Query(None, description="Window start (default: 24h before end)"),
+    end: Optional[datetime] = Query(None, description="Window end (default: now, UTC)"),
+    interval_minutes: int = Query(15, ge=1, le=1440),
+    station_id: Optional[str] = None,
+    include_stations: bool = False
+):
+    """Get downsampled availability curves for a tenant or a single station"""
+    if not is_known_tenant(tenant_id):
+        raise HTTPException(status_code=400, detail="Invalid tenant_id")
+    
+    end = to_naive_utc(end) or datetime.utcnow()
+    start = to_naive_utc(start) or end - timedelta(days=1)
+    if start >= end:
+        raise HTTPException(status_code=400, detail="start must be before end")
+    if (end - start) / timedelta(minutes=interval_minutes) > 2000:
+        raise HTTPException(status_code=400, detail="Window too large for interval; increase interval_minutes")
+    
+    try:
+        history = await status_history_service.get_history(
+            get_database(),
+            tenant_id,
+            start,
+            end,
+            interval_minutes,
+            station_id=station_id,
+            include_stations=include_stations
+        )
+        return json_response(history_adapter, history)
+        
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error fetching station history: {str(e)}")
+
 @router.get("/alerts/{tenant_id}", response_model=List[Alert])
 async def get_tenant_alerts(
     tenant_id: str, 
-    limit: Optional[int] = Query(50, ge=1, le=100)
+    limit: Optional[int] = Query(50, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor of the previous page"),
+    type: Optional[List[Literal["low_bikes", "full_station", "offline"]]] = Query(None),
+    severity: Optional[List[Literal["info", "warning", "critical"]]] = Query(None),
+    fields: Optional[str] = Query(None, description="Comma-separated response fields to return")
 ):
-    """Get recent alerts for a tenant"""
-    if tenant_id not in ["manhattan", "brooklyn"]:
+    """
+    Get open alerts for a tenant, newest first. When more remain, the
+    X-Next-Cursor response header holds the cursor of the next page.
+    """
+    if not is_known_tenant(tenant_id):
         raise HTTPException(status_code=400, detail="Invalid tenant_id")
     
+    selected_fields = parse_fields(fields, ALERT_FIELDS)
+    try:
+        after = decode_alert_cursor(cursor) if cursor else None
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
     try:
         db = get_database()
         
-        alerts_cursor = db.alerts.find(
-            {"tenant_id": tenant_id, "resolved": False}
-        ).sort("timestamp", -1).limit(limit)
+        alerts, next_cursor = await find_alerts(
+            db, tenant_id, limit,
+            after=after,
+            types=type,
+            severities=severity,
+            fields=list(selected_fields) if selected_fields is not None else None
+        )
+        headers = {"X-Next-Cursor": next_cursor} if next_cursor else None
         
-        alerts = await alerts_cursor.to_list(None)
-        
-        return [Alert(**alert) for alert in alerts]
+        if selected_fields is not None:
+            return documents_response(alerts, headers)
+        return json_response(alert_list_adapter, alert_list_adapter.validate_python(alerts), headers)
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error fetching alerts: {str(e)}")
 
+@router.get("/alerts/{tenant_id}/stats", response_model=IncidentStats)
+async def get_alert_stats(
+    tenant_id: str,
+    start: Optional[datetime] = Query(None, description="Window start (default: 7 days before end), rounded down to a UTC day"),
+    end: Optional[datetime] = Query(None, description="Window end (default: now, UTC), rounded up to a UTC day"),
+    limit: int = Query(20, ge=1, le=1000),
+    sort_by: Literal["critical_minutes", "incidents"] = "critical_minutes",
+    type: Optional[Literal["low_bikes", "full_station", "offline"]] = None
+):
+    """Stations that were most often or longest empty, full or offline over a window"""
+    if not is_known_tenant(tenant_id):
+        raise HTTPException(status_code=400, detail="Invalid tenant_id")
+    
+    end = to_naive_utc(end) or datetime.utcnow()
+    start = to_naive_utc(start) or end - timedelta(days=7)
+    if start >= end:
+        raise HTTPException(status_code=400, detail="start must be before end")
+    
+    try:
+        stats = await incident_stats_service.get_stats(
+            get_database(),
+            tenant_id,
+            start,
+            end,
+            limit=limit,
+            sort_by=sort_by,
+            alert_type=type
+        )
+        return json_response(incident_stats_adapter, stats)
+        
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error fetching alert stats: {str(e)}")
+
 @router.get("/analytics/{tenant_id}", response_model=Analytics)
-async def get_tenant_analytics(tenant_id: str):
-    """Get analytics for a tenant"""
-    if tenant_id not in ["manhattan", "brooklyn"]:
+async def get_tenant_analytics(
+    tenant_id: str,
+    start: Optional[datetime] = Query(None, description="Window start (inclusive)"),
+    end: Optional[datetime] = Query(None, description="Window end (exclusive)"),
+    station_id: Optional[str] = Query(None, description="Limit to trips starting at this station")
+):
+    """Get analytics for a tenant, optionally over a time window"""
+    if not is_known_tenant(tenant_id):
         raise HTTPException(status_code=400, detail="Invalid tenant_id")
     
+    start = to_naive_utc(start)
+    end = to_naive_utc(end)
+    if start and end and start >= end:
+        raise HTTPException(status_code=400, detail="start must be before end")
+    
     try:
-        analytics = await analytics_service.get_tenant_analytics(tenant_id)
-        return analytics
+        analytics = await analytics_service.get_tenant_analytics(
+            tenant_id,
+            start=start,
+            end=end,
+            station_id=station_id
+        )
+        return json_response(analytics_adapter, analytics)
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error fetching analytics: {str(e)}")
 
+@router.get("/flows/{tenant_id}", response_model=FlowSummary)
+async def get_tenant_flows(
+    tenant_id: str,
+    start: Optional[datetime] = Query(None, description="Window start (inclusive)"),
+    end: Optional[datetime] = Query(None, description="Window end (exclusive)"),
+    top_k: int = Query(20, ge=1, le=1000),
+    station_limit: Optional[int] = Query(None, ge=1, description="Only the stations with the largest net imbalance"),
+    include_self_loops: bool = True
+):
+    """Get top origin-destination flows and per-station net inflow/outflow for a tenant"""
+    if not is_known_tenant(tenant_id):
+        raise HTTPException(status_code=400, detail="Invalid tenant_id")
+    
+    start = to_naive_utc(start)
+    end = to_naive_utc(end)
+    if start and end and start >= end:
+        raise HTTPException(status_code=400, detail="start must be before end")
+    
+    try:
+        flows = await flow_service.get_flow_summary(
+            tenant_id,
+            start=start,
+            end=end,
+            top_k=top_k,
+            station_limit=station_limit,
+            include_self_loops=include_self_loops
+        )
+        return json_response(flow_summary_adapter, flows)
+        
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error computing flows: {str(e)}")
+
+@router.get("/cache/stats")
+async def get_cache_stats():
+    """Hit/miss counters and sizes of the in-process caches (per worker)"""
+    stats = {name: cache.stats() for name, cache in caches.items()}
+    stats["station_metadata"] = station_metadata.stats()
+    return stats
+
 @router.post("/stations/refresh")
 async def refresh_stations():
     """Manually trigger station data refresh"""
     try:
+        if not gbfs_service.is_leader:
+            # Only the lease holder polls GBFS; other workers reload what it wrote
+            await gbfs_service.sync_from_database()
+            return {"message": "Stations reloaded from the polling worker's latest data"}
+        
         success = await gbfs_service.update_stations_data()
         if success:
             return {"message": "Stations updated successfully"}
@@ -1,5 +1,11 @@
+from importlib.util import find_spec
+from pathlib import Path
+from typing import Literal
+from pydantic import field_validator
 from pydantic_settings import BaseSettings
 
+REPO_ROOT = Path(__file__).resolve().parents[3]
+
 class Settings(BaseSettings):
     db_password: str 
     mongodb_url: str 
@@ -7,6 +13,39 @@ class Settings(BaseSettings):
     gbfs_info_url: str = "https://gbfs.citibikenyc.com/gbfs/en/station_information.json"
     gbfs_status_url: str = "https://gbfs.citibikenyc.com/gbfs/en/station_status.json"
     update_interval: int = 60  # seconds
+    tenants_file: str = ""  # tenant polygons (JSON); empty uses the bundled app/core/tenants.json
+    tenant_grid_cell_degrees: float = 0.005
+    resolved_alert_ttl_days: int = 7
+    status_history_retention_days: int = 90
+    incident_stats_retention_days: int = 400
+    analytics_backend: Literal["mongo", "parquet"] = "mongo"
+    parquet_trip_path: str = "data/parquet/trips"  # relative paths are taken from the repository root
+    stream_queue_size: int = 16  # pending updates per subscriber before it is resynced
+    stream_heartbeat_seconds: int = 15
+    leader_lease_seconds: int = 30  # GBFS poller lease; renewed every third of this
+    follower_sync_seconds: int = 5  # how often non-polling workers check the stations version
+    flow_cache_size: int = 32  # cached (tenant, window) flow matrices
+    flow_cache_ttl_seconds: int = 600
+    analytics_cache_size: int = 256
+    analytics_cache_ttl_seconds: int = 3600
+    cache_version_check_seconds: int = 5  # how often caches look for a new trips version
+    profile_slow_request_ms: int = 0  # log sampled stacks for slower requests; 0 disables the profiler
+    profile_sample_interval_ms: int = 5
+
+    @field_validator("analytics_backend")
+    @classmethod
+    def require_pyarrow_for_parquet(cls, value: str) -> str:
+        """Fail at startup rather than serve empty analytics from every request"""
+        if value == "parquet" and find_spec("pyarrow") is None:
+            raise ValueError("ANALYTICS_BACKEND=parquet requires pyarrow (pip install pyarrow)")
+        return value
+
+    @field_validator("parquet_trip_path")
+    @classmethod
+    def resolve_from_repo_root(cls, value: str) -> str:
+        """The API runs from backend/ and ingest from data/scripts/; both must see the same directory"""
+        path = Path(value).expanduser()
+        return str(path if path.is_absolute() else REPO_ROOT / path)
 
     class Config:
         env_file = ".env"
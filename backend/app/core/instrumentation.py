@@ -0,0 +1,168 @@
+import logging
+import sys
+import threading
+import time
+from collections import Counter as TallyCounter, deque
+from typing import Deque, Dict, List, Optional, Tuple
+
+from pymongo import monitoring
+
+from app.core.metrics import http_request_duration, mongo_command_duration, slow_requests
+
+logger = logging.getLogger(__name__)
+
+UNMATCHED_ROUTE = "unmatched"
+
+class MongoCommandMetrics(monitoring.CommandListener):
+    """Driver command listener feeding mongo_command_duration by collection and command"""
+
+    def __init__(self):
+        self._pending: Dict[Tuple, Tuple[str, str]] = {}
+
+    def started(self, event):
+        command = event.command_name
+        target = event.command.get("collection") if command == "getMore" else event.command.get(command)
+        collection = target if isinstance(target, str) else "-"
+        self._pending[(event.connection_id, event.request_id)] = (collection, command)
+
+    def _finish(self, event, outcome: str):
+        labels = self._pending.pop((event.connection_id, event.request_id), None)
+        if labels is not None:
+            mongo_command_duration.labels(labels[0], labels[1], outcome).observe(event.duration_micros / 1e6)
+
+    def succeeded(self, event):
+        self._finish(event, "ok")
+
+    def failed(self, event):
+        self._finish(event, "error")
+
+mongo_command_metrics = MongoCommandMetrics()
+
+class SlowRequestProfiler:
+    """
+    Opt-in sampling profiler for slow requests. While any request is waiting
+    for its response to start, a daemon thread samples the event loop
+    thread's stack every interval; a request slower than the threshold logs
+    the stacks most often seen during its lifetime. Samples cover everything
+    the loop ran in that window, including other requests and idle waits.
+    """
+
+    def __init__(self, threshold_ms: float, interval_ms: float, max_samples: int = 20000):
+        self.threshold_seconds = threshold_ms / 1000
+        self.interval_seconds = interval_ms / 1000
+        self._samples: Deque[Tuple[float, Tuple[str, ...]]] = deque(maxlen=max_samples)
+        self._active = 0
+        self._loop_thread_id: Optional[int] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stopped = threading.Event()
+
+    def start(self):
+        """Call from the event loop thread"""
+        if self._thread is None:
+            self._loop_thread_id = threading.get_ident()
+            self._stopped.clear()
+            self._thread = threading.Thread(target=self._run, name="slow-request-profiler", daemon=True)
+            self._thread.start()
+            logger.info(
+                f"🔬 Profiling requests slower than {self.threshold_seconds * 1000:.0f}ms "
+                f"(sampling every {self.interval_seconds * 1000:.0f}ms)"
+            )
+
+    def stop(self):
+        if self._thread is not None:
+            self._stopped.set()
+            self._thread.join(timeout=1)
+            self._thread = None
+
+    def _run(self):
+        while not self._stopped.wait(self.interval_seconds):
+            if not self._active:
+                continue
+            frame = sys._current_frames().get(self._loop_thread_id)
+            stack = []
+            while frame is not None and len(stack) < 12:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({code.co_filename.rsplit('/', 2)[-1]}:{frame.f_lineno})")
+                frame = frame.f_back
+            if stack:
+                self._samples.append((time.perf_counter(), tuple(stack)))
+
+    def request_started(self):
+        self._active += 1
+
+    def request_finished(self):
+        self._active -= 1
+
+    def summarize(self, started: float, finished: float, top: int = 5) -> List[str]:
+        """Most frequent stacks (innermost frame first) sampled between started and finished"""
+        tally = TallyCounter(stack for sampled_at, stack in list(self._samples) if started <= sampled_at <= finished)
+        total = sum(tally.values())
+        return [
+            f"{count / total:.0%} {' <- '.join(stack[:6])}"
+            for stack, count in tally.most_common(top)
+        ]
+
+    def report(self, method: str, route: str, duration: float, started: float, finished: float):
+        lines = self.summarize(started, finished)
+        detail = "\n  ".join(lines) if lines else "no samples"
+        logger.warning(f"🐢 Slow request {method} {route} took {duration * 1000:.0f}ms:\n  {detail}")
+
+class MetricsMiddleware:
+    """
+    ASGI middleware recording http_request_duration per route template. The
+    duration ends when the response starts, so streaming responses (SSE)
+    are measured to their first byte rather than their lifetime.
+    """
+
+    def __init__(self, app, profiler: Optional[SlowRequestProfiler] = None):
+        self.app = app
+        self.profiler = profiler
+        self._route_paths: Optional[Dict] = None
+
+    def _route_template(self, scope) -> str:
+        endpoint = scope.get("endpoint")
+        if endpoint is None:
+            return UNMATCHED_ROUTE
+        if self._route_paths is None:
+            self._route_paths = {
+                route.endpoint: route.path
+                for route in scope["app"].routes
+                if hasattr(route, "endpoint")
+            }
+        return self._route_paths.get(endpoint, UNMATCHED_ROUTE)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        profiler = self.profiler
+        started = time.perf_counter()
+        status = 500
+        responded_at: Optional[float] = None
+        if profiler is not None:
+            profiler.request_started()
+
+        async def send_with_timing(message):
+            nonlocal status, responded_at
+            if message["type"] == "http.response.start" and responded_at is None:
+                status = message["status"]
+                responded_at = time.perf_counter()
+                if profiler is not None:
+                    profiler.request_finished()
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            if responded_at is None:
+                responded_at = time.perf_counter()
+                if profiler is not None:
+                    profiler.request_finished()
+            duration = responded_at - started
+            route = self._route_template(scope)
+            http_request_duration.labels(scope["method"], route, str(status)).observe(duration)
+
+            if profiler is not None and duration >= profiler.threshold_seconds:
+                slow_requests.labels(route).inc()
+                profiler.report(scope["method"], route, duration, started, responded_at)
@@ -0,0 +1,215 @@
+"""
+Minimal in-process metrics in the Prometheus text exposition format.
+
+Recording is a dict lookup plus a few additions under an uncontended lock
+(pymongo reports command events from its own threads), so instruments can
+sit on hot paths. Values are per worker process; scrape each worker or
+aggregate in Prometheus.
+"""
+import bisect
+import math
+import threading
+from abc import ABC, abstractmethod
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+CYCLE_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+_metrics: List["_Metric"] = []
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    pairs = []
+    for name, value in zip(names, values):
+        escaped = str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+        pairs.append(f'{name}="{escaped}"')
+    return "{" + ",".join(pairs) + "}"
+
+class _Metric(ABC):
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        _metrics.append(self)
+
+    @abstractmethod
+    def _samples(self) -> Iterable[str]:
+        """Sample lines in the exposition format"""
+
+    def render(self) -> str:
+        header = f"# HELP {self.name} {self.documentation}\n# TYPE {self.name} {self.kind}\n"
+        return header + "".join(f"{line}\n" for line in self._samples())
+
+class _RecordedMetric(_Metric):
+    """Metric whose values are recorded into one child per label combination"""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._children: Dict[Tuple[str, ...], object] = {}
+        self._lock = threading.Lock()
+
+    def labels(self, *values: str):
+        """Child for one label combination (created on first use)"""
+        child = self._children.get(values)
+        if child is None:
+            if len(values) != len(self.labelnames):
+                raise ValueError(f"{self.name} expects labels {self.labelnames}")
+            with self._lock:
+                child = self._children.setdefault(values, self._new_child())
+        return child
+
+    @abstractmethod
+    def _new_child(self):
+        """Holder of the values for one label combination"""
+
+class _Value:
+    __slots__ = ("value", "_lock")
+
+    def __init__(self):
+        self.value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0):
+        with self._lock:
+            self.value += amount
+
+    def set(self, value: float):
+        self.value = value
+
+class Counter(_RecordedMetric):
+    kind = "counter"
+
+    def _new_child(self):
+        return _Value()
+
+    def inc(self, amount: float = 1.0):
+        self.labels().inc(amount)
+
+    def _samples(self):
+        for values, child in list(self._children.items()):
+            yield f"{self.name}_total{_format_labels(self.labelnames, values)} {_format_value(child.value)}"
+
+class Gauge(_RecordedMetric):
+    kind = "gauge"
+
+    def _new_child(self):
+        return _Value()
+
+    def set(self, value: float):
+        self.labels().set(value)
+
+    def _samples(self):
+        for values, child in list(self._children.items()):
+            yield f"{self.name}{_format_labels(self.labelnames, values)} {_format_value(child.value)}"
+
+class _HistogramChild:
+    __slots__ = ("upper_bounds", "counts", "sum", "_lock")
+
+    def __init__(self, upper_bounds: Tuple[float, ...]):
+        self.upper_bounds = upper_bounds
+        self.counts = [0] * (len(upper_bounds) + 1)
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        index = bisect.bisect_left(self.upper_bounds, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+
+class Histogram(_RecordedMetric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.upper_bounds = tuple(sorted(buckets))
+
+    def _new_child(self):
+        return _HistogramChild(self.upper_bounds)
+
+    def observe(self, value: float):
+        self.labels().observe(value)
+
+    def _samples(self):
+        for values, child in list(self._children.items()):
+            counts = list(child.counts)
+            cumulative = 0
+            for upper_bound, count in zip(self.upper_bounds + (math.inf,), counts):
+                cumulative += count
+                labels = _format_labels(self.labelnames + ("le",), values + (_format_value(upper_bound),))
+                yield f"{self.name}_bucket{labels} {cumulative}"
+            labels = _format_labels(self.labelnames, values)
+            yield f"{self.name}_sum{labels} {_format_value(child.sum)}"
+            yield f"{self.name}_count{labels} {cumulative}"
+
+class CallbackMetric(_Metric):
+    """
+    Values read from existing service stats at scrape time instead of being
+    recorded, so it has no labels() children to record into
+    """
+
+    def __init__(self, name: str, documentation: str, kind: str, labelnames: Sequence[str], callback: Callable[[], Dict[Tuple[str, ...], float]]):
+        super().__init__(name, documentation, labelnames)
+        self.kind = kind
+        self.callback = callback
+
+    def _samples(self):
+        suffix = "_total" if self.kind == "counter" else ""
+        for values, value in self.callback().items():
+            yield f"{self.name}{suffix}{_format_labels(self.labelnames, values)} {_format_value(value)}"
+
+def render_metrics() -> str:
+    """Every registered metric in the Prometheus text format"""
+    return "".join(metric.render() for metric in _metrics)
+
+def find_metric(name: str) -> Optional[_Metric]:
+    return next((metric for metric in _metrics if metric.name == name), None)
+
+# Instruments shared across the app
+
+http_request_duration = Histogram(
+    "bikescope_http_request_duration_seconds",
+    "Time from request to response start, by route template",
+    ("method", "route", "status")
+)
+slow_requests = Counter(
+    "bikescope_http_slow_requests",
+    "Requests slower than PROFILE_SLOW_REQUEST_MS",
+    ("route",)
+)
+mongo_command_duration = Histogram(
+    "bikescope_mongo_command_duration_seconds",
+    "MongoDB command latency as reported by the driver",
+    ("collection", "command", "outcome")
+)
+gbfs_phase_duration = Histogram(
+    "bikescope_gbfs_phase_duration_seconds",
+    "Duration of each phase of a GBFS poll cycle",
+    ("phase",),
+    buckets=CYCLE_BUCKETS
+)
+gbfs_cycle_overrun = Histogram(
+    "bikescope_gbfs_cycle_overrun_seconds",
+    "How far a poll cycle ran past UPDATE_INTERVAL (0 when on time)",
+    buckets=(0.0,) + CYCLE_BUCKETS
+)
+gbfs_cycles = Counter(
+    "bikescope_gbfs_cycles",
+    "GBFS poll cycles by result",
+    ("result",)
+)
+alerts_written = Counter(
+    "bikescope_alerts_written",
+    "Alert transitions written to MongoDB",
+    ("action",)
+)
@@ -0,0 +1,68 @@
+from typing import Any, Dict, List, Optional
+
+import orjson
+from bson import ObjectId
+from fastapi import Response
+from pydantic import TypeAdapter
+
+from app.models.schemas import (
+    StationResponse,
+    NearbyStation,
+    Alert,
+    Analytics,
+    AvailabilityHistory,
+    StationUpdate,
+    FlowSummary,
+    IncidentStats
+)
+
+station_list_adapter = TypeAdapter(List[StationResponse])
+nearby_station_list_adapter = TypeAdapter(List[NearbyStation])
+alert_list_adapter = TypeAdapter(List[Alert])
+analytics_adapter = TypeAdapter(Analytics)
+history_adapter = TypeAdapter(AvailabilityHistory)
+station_update_adapter = TypeAdapter(StationUpdate)
+flow_summary_adapter = TypeAdapter(FlowSummary)
+incident_stats_adapter = TypeAdapter(IncidentStats)
+
+def decode_json(content: bytes) -> Any:
+    """Decode a JSON payload (GBFS feeds) with orjson"""
+    return orjson.loads(content)
+
+def encode_model(adapter: TypeAdapter, value: Any) -> bytes:
+    """
+    Serialize validated models straight to JSON bytes in pydantic-core.
+    Output matches FastAPI's response_model path (aliases, compact separators,
+    UTF-8) without its re-validation and jsonable_encoder passes.
+    """
+    return adapter.dump_json(value, by_alias=True)
+
+def _encode_bson(value: Any) -> Any:
+    if isinstance(value, ObjectId):
+        return str(value)
+    raise TypeError(f"Type is not JSON serializable: {type(value).__name__}")
+
+def encode_documents(documents: Any) -> bytes:
+    """
+    Serialize partial documents (field projections) that cannot be validated
+    against a response model; output formatting matches encode_model
+    """
+    return orjson.dumps(documents, default=_encode_bson)
+
+def documents_response(documents: Any, headers: Optional[Dict[str, str]] = None) -> Response:
+    return Response(
+        content=encode_documents(documents),
+        media_type="application/json",
+        headers=headers
+    )
+
+def json_response(
+    adapter: TypeAdapter,
+    value: Any,
+    headers: Optional[Dict[str, str]] = None
+) -> Response:
+    return Response(
+        content=encode_model(adapter, value),
+        media_type="application/json",
+        headers=headers
+    )
@@ -0,0 +1,224 @@
+import json
+import logging
+import math
+import os
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+BUNDLED_TENANTS_FILE = os.path.join(os.path.dirname(__file__), "tenants.json")
+MAX_GRID_CELLS_PER_AXIS = 2000
+
+# Grid cell values other than tenant codes
+BOUNDARY_CELL = -1
+
+def _polygon_rings(geometry: Optional[Dict]) -> List[np.ndarray]:
+    """GeoJSON Polygon/MultiPolygon as closed (lon, lat) rings"""
+    if not geometry:
+        return []
+    if geometry["type"] == "Polygon":
+        polygons = [geometry["coordinates"]]
+    elif geometry["type"] == "MultiPolygon":
+        polygons = geometry["coordinates"]
+    else:
+        raise ValueError(f"Unsupported tenant geometry type: {geometry['type']}")
+
+    rings = []
+    for polygon in polygons:
+        for ring in polygon:
+            points = np.asarray(ring, dtype=np.float64)[:, :2]
+            if len(points) < 3:
+                raise ValueError("Tenant polygon rings need at least 3 points")
+            if not np.array_equal(points[0], points[-1]):
+                points = np.vstack([points, points[:1]])
+            rings.append(points)
+    return rings
+
+def _edges(rings: List[np.ndarray]) -> np.ndarray:
+    """(n, 4) array of x1, y1, x2, y2 for every ring segment"""
+    if not rings:
+        return np.empty((0, 4))
+    return np.vstack([np.hstack([ring[:-1], ring[1:]]) for ring in rings])
+
+def points_in_polygon(lon: np.ndarray, lat: np.ndarray, edges: np.ndarray) -> np.ndarray:
+    """Even-odd ray casting of many points against one tenant's polygon edges"""
+    inside = np.zeros(lon.shape, dtype=bool)
+    for x1, y1, x2, y2 in edges:
+        if y1 == y2:
+            continue
+        crosses = (y1 > lat) != (y2 > lat)
+        inside ^= crosses & (lon < (x2 - x1) * (lat - y1) / (y2 - y1) + x1)
+    return inside
+
+class TenantIndex:
+    """
+    Point-in-polygon tenant classifier over a uniform lat/lon grid built
+    once from the tenant polygons. Cells no polygon edge passes through lie
+    wholly inside one tenant (or none), so their points are classified by a
+    single array lookup; only points in edge cells are ray-cast, row by row
+    against just the edges spanning that grid row. Points outside every
+    polygon belong to the default tenant. Where polygons overlap, the
+    tenant listed first wins.
+    """
+
+    def __init__(self, tenants: List[Dict], default_tenant: str, cell_degrees: float = 0.005):
+        self.tenant_ids: Tuple[str, ...] = tuple(tenant["tenant_id"] for tenant in tenants)
+        if len(set(self.tenant_ids)) != len(self.tenant_ids):
+            raise ValueError("Duplicate tenant_id in tenant definitions")
+        if default_tenant not in self.tenant_ids:
+            raise ValueError(f"Default tenant {default_tenant!r} is not defined")
+
+        self.default_tenant = default_tenant
+        self.names: Dict[str, str] = {tenant["tenant_id"]: tenant.get("name", tenant["tenant_id"]) for tenant in tenants}
+        self._labels = np.array(self.tenant_ids, dtype=object)
+        self._default_code = self.tenant_ids.index(default_tenant)
+
+        rings = [_polygon_rings(tenant.get("geometry")) for tenant in tenants]
+        self._edges = [_edges(tenant_rings) for tenant_rings in rings]
+        self.bounds: Dict[str, Tuple[float, float, float, float]] = {
+            tenant_id: (
+                float(min(ring[:, 0].min() for ring in tenant_rings)),
+                float(min(ring[:, 1].min() for ring in tenant_rings)),
+                float(max(ring[:, 0].max() for ring in tenant_rings)),
+                float(max(ring[:, 1].max() for ring in tenant_rings))
+            )
+            for tenant_id, tenant_rings in zip(self.tenant_ids, rings) if tenant_rings
+        }
+        self._build_grid(cell_degrees)
+
+    def _build_grid(self, cell_degrees: float):
+        if not self.bounds:
+            self._origin = (0.0, 0.0)
+            self._cell = 1.0
+            self._grid = np.empty((0, 0), dtype=np.int16)
+            return
+
+        min_lon = min(bounds[0] for bounds in self.bounds.values())
+        min_lat = min(bounds[1] for bounds in self.bounds.values())
+        max_lon = max(bounds[2] for bounds in self.bounds.values())
+        max_lat = max(bounds[3] for bounds in self.bounds.values())
+        cell = max(cell_degrees, (max_lon - min_lon) / MAX_GRID_CELLS_PER_AXIS, (max_lat - min_lat) / MAX_GRID_CELLS_PER_AXIS)
+        columns = int(math.ceil((max_lon - min_lon) / cell)) + 1
+        rows = int(math.ceil((max_lat - min_lat) / cell)) + 1
+        self._origin = (min_lon, min_lat)
+        self._cell = cell
+
+        # Cells an edge's bounding box touches need exact tests; a horizontal
+        # ray from a point only crosses edges spanning the point's grid row
+        boundary = np.zeros((rows, columns), dtype=bool)
+        self._row_edges: List[List[np.ndarray]] = []
+        for edges in self._edges:
+            by_row: List[List[np.ndarray]] = [[] for _ in range(rows)]
+            for edge in edges:
+                x1, y1, x2, y2 = edge
+                col_from = self._cell_index(min(x1, x2), min_lon, columns)
+                col_to = self._cell_index(max(x1, x2), min_lon, columns)
+                row_from = self._cell_index(min(y1, y2), min_lat, rows)
+                row_to = self._cell_index(max(y1, y2), min_lat, rows)
+                boundary[row_from:row_to + 1, col_from:col_to + 1] = True
+                for row in range(row_from, row_to + 1):
+                    by_row[row].append(edge)
+            self._row_edges.append([np.array(row_edges).reshape(-1, 4) for row_edges in by_row])
+
+        # Every other cell is wholly inside or outside each polygon: test its center
+        center_lon, center_lat = np.meshgrid(
+            min_lon + (np.arange(columns) + 0.5) * cell,
+            min_lat + (np.arange(rows) + 0.5) * cell
+        )
+        grid = np.full((rows, columns), self._default_code, dtype=np.int16)
+        unassigned = ~boundary
+        for code, edges in enumerate(self._edges):
+            if not len(edges):
+                continue
+            inside = unassigned & points_in_polygon(center_lon, center_lat, edges)
+            grid[inside] = code
+            unassigned &= ~inside
+        grid[boundary] = BOUNDARY_CELL
+        self._grid = grid
+
+        logger.info(
+            f"🗺️ Tenant grid: {len(self.tenant_ids)} tenants, {rows}x{columns} cells of {cell:.4f}°, "
+            f"{int(boundary.sum())} boundary cells"
+        )
+
+    def _cell_index(self, value: float, origin: float, count: int) -> int:
+        # Same arithmetic as classify() so edges and points land in the same cells
+        return min(max(int(np.floor((value - origin) / self._cell)), 0), count - 1)
+
+    def classify(self, lat, lon) -> np.ndarray:
+        """Tenant id for every coordinate pair; NaN and out-of-area points get the default tenant"""
+        lat = np.asarray(lat, dtype=np.float64)
+        lon = np.asarray(lon, dtype=np.float64)
+        codes = np.full(lat.shape, self._default_code, dtype=np.int16)
+
+        rows, columns = self._grid.shape
+        if rows:
+            with np.errstate(invalid="ignore"):
+                row = np.floor((lat - self._origin[1]) / self._cell)
+                column = np.floor((lon - self._origin[0]) / self._cell)
+                on_grid = (row >= 0) & (row < rows) & (column >= 0) & (column < columns)
+            cells = self._grid[row[on_grid].astype(np.intp), column[on_grid].astype(np.intp)]
+            codes[on_grid] = cells
+
+            exact = np.flatnonzero(codes == BOUNDARY_CELL)
+            if len(exact):
+                exact_rows = row[exact].astype(np.intp)
+                order = np.argsort(exact_rows, kind="stable")
+                exact = exact[order]
+                exact_rows = exact_rows[order]
+                grid_rows, starts = np.unique(exact_rows, return_index=True)
+                for grid_row, start, end in zip(grid_rows, starts, np.append(starts[1:], len(exact))):
+                    points = exact[start:end]
+                    resolved = np.full(points.shape, self._default_code, dtype=np.int16)
+                    unassigned = np.ones(points.shape, dtype=bool)
+                    for code, row_edges in enumerate(self._row_edges):
+                        edges = row_edges[grid_row]
+                        if not len(edges):
+                            continue
+                        inside = unassigned & points_in_polygon(lon[points], lat[points], edges)
+                        resolved[inside] = code
+                        unassigned &= ~inside
+                    codes[points] = resolved
+
+        return self._labels[codes]
+
+    def assign(self, lat: Optional[float], lon: Optional[float]) -> str:
+        if lat is None or lon is None:
+            return self.default_tenant
+        return self.classify([lat], [lon])[0]
+
+    def __contains__(self, tenant_id: str) -> bool:
+        return tenant_id in self.names
+
+def load_tenant_index(path: Optional[str] = None, cell_degrees: Optional[float] = None) -> TenantIndex:
+    """Build the index from a tenants JSON file (TENANTS_FILE, else the bundled definitions)"""
+    if path is None or cell_degrees is None:
+        from app.core.config import settings
+        path = path or settings.tenants_file or BUNDLED_TENANTS_FILE
+        cell_degrees = cell_degrees or settings.tenant_grid_cell_degrees
+
+    with open(path) as f:
+        definitions = json.load(f)
+    return TenantIndex(definitions["tenants"], definitions["default_tenant"], cell_degrees)
+
+_tenant_index: Optional[TenantIndex] = None
+
+def get_tenant_index() -> TenantIndex:
+    """Process-wide index shared by GBFS polling, trip ingest and request validation"""
+    global _tenant_index
+    if _tenant_index is None:
+        _tenant_index = load_tenant_index()
+    return _tenant_index
+
+def assign_tenant(lat: float, lon: float) -> str:
+    """Classify a single coordinate"""
+    return get_tenant_index().assign(lat, lon)
+
+def classify_tenants(lat, lon) -> np.ndarray:
+    """Classify whole lat/lon columns at once; same rules as assign_tenant"""
+    return get_tenant_index().classify(lat, lon)
+
+def is_known_tenant(tenant_id: str) -> bool:
+    return tenant_id in get_tenant_index()
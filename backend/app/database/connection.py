@@ -1,7 +1,12 @@
 import logging
 from typing import Optional
 from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorDatabase
+from pymongo import MongoClient
 from app.core.config import settings
+from app.core.instrumentation import mongo_command_metrics
+from app.services.trip_rollups import ROLLUP_COLLECTION, ROLLUP_KEY, ROLLUP_RANGE_INDEXES
+from app.services.status_history_service import HISTORY_COLLECTION
+from app.services.incident_stats import INCIDENT_STATS_COLLECTION
 
 logger = logging.getLogger(__name__)
 
@@ -14,7 +19,7 @@ database = Database()
 async def connect_to_mongo():
     """Create database connection"""
     try:
-        database.client = AsyncIOMotorClient(settings.mongodb_url)
+        database.client = AsyncIOMotorClient(settings.mongodb_url, event_listeners=[mongo_command_metrics])
         database.database = database.client[settings.database_name]
         
         await database.client.admin.command('ping')
@@ -53,6 +58,10 @@ async def create_indexes():
             database.database.stations, 
             [("tenant_id", 1)]
         )
+        await safe_create_index(
+            database.database.stations, 
+            [("location", "2dsphere")]
+        )
         
         await safe_create_index(
             database.database.alerts, 
@@ -62,6 +71,15 @@ async def create_indexes():
             database.database.alerts, 
             [("station_id", 1), ("timestamp", -1)]
         )
+        await safe_create_index(
+            database.database.alerts, 
+            [("tenant_id", 1), ("resolved", 1), ("timestamp", -1), ("_id", -1)]
+        )
+        await safe_create_index(
+            database.database.alerts, 
+            [("resolved_at", 1)],
+            expireAfterSeconds=settings.resolved_alert_ttl_days * 86400
+        )
         
         await safe_create_index(
             database.database.trips, 
@@ -75,6 +93,60 @@ async def create_indexes():
             database.database.trips, 
             [("started_at", -1)]
         )
+        await safe_create_index(
+            database.database.trips, 
+            [("source_file", 1)]
+        )
+        await safe_create_index(
+            database.database.trips, 
+            [("tenant_id", 1), ("started_at", 1)]
+        )
+        await safe_create_index(
+            database.database.trips, 
+            [("tenant_id", 1), ("start_station_id", 1), ("started_at", 1)]
+        )
+        
+        await safe_create_index(
+            database.database[ROLLUP_COLLECTION],
+            ROLLUP_KEY,
+            unique=True
+        )
+        await safe_create_index(
+            database.database[ROLLUP_COLLECTION],
+            [("date", 1)]
+        )
+        for index in ROLLUP_RANGE_INDEXES:
+            await safe_create_index(database.database[ROLLUP_COLLECTION], index)
+        
+        await safe_create_index(
+            database.database[HISTORY_COLLECTION],
+            [("station_id", 1), ("date", 1)],
+            unique=True
+        )
+        await safe_create_index(
+            database.database[HISTORY_COLLECTION],
+            [("tenant_id", 1), ("date", 1)]
+        )
+        await safe_create_index(
+            database.database[HISTORY_COLLECTION],
+            [("date", 1)],
+            expireAfterSeconds=settings.status_history_retention_days * 86400
+        )
+        
+        await safe_create_index(
+            database.database[INCIDENT_STATS_COLLECTION],
+            [("station_id", 1), ("date", 1)],
+            unique=True
+        )
+        await safe_create_index(
+            database.database[INCIDENT_STATS_COLLECTION],
+            [("tenant_id", 1), ("date", 1)]
+        )
+        await safe_create_index(
+            database.database[INCIDENT_STATS_COLLECTION],
+            [("date", 1)],
+            expireAfterSeconds=settings.incident_stats_retention_days * 86400
+        )
         
         logger.info("✅ Database indexes verified/created")
         
@@ -83,4 +155,9 @@ async def create_indexes():
 
 def get_database():
     """Get database instance"""
-    return database.database
\ No newline at end of file
+    return database.database
+
+def get_sync_database():
+    """Get a synchronous (pymongo) database handle for offline scripts"""
+    client = MongoClient(settings.mongodb_url)
+    return client[settings.database_name]
\ No newline at end of file
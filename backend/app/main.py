@@ -2,11 +2,18 @@ import asyncio
 import logging
 from contextlib import asynccontextmanager
 from fastapi import FastAPI
+from fastapi.responses import ORJSONResponse, PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 
+from app.core.config import settings
+from app.core.instrumentation import MetricsMiddleware, SlowRequestProfiler
+from app.core.metrics import CallbackMetric, render_metrics
+from app.core.tenants import get_tenant_index
 from app.database.connection import connect_to_mongo, close_mongo_connection
 from app.api.routes import router
 from app.services.gbfs_service import gbfs_service
+from app.services.result_cache import caches
+from app.services.station_stream import station_stream
 
 logging.basicConfig(
     level=logging.INFO,
@@ -16,6 +23,33 @@ logger = logging.getLogger(__name__)
 
 background_task = None
 
+profiler = (
+    SlowRequestProfiler(settings.profile_slow_request_ms, settings.profile_sample_interval_ms)
+    if settings.profile_slow_request_ms > 0 else None
+)
+
+# Read from service stats at scrape time
+CallbackMetric(
+    "bikescope_gbfs_leader", "1 if this worker holds the GBFS poller lease", "gauge", (),
+    lambda: {(): int(gbfs_service.is_leader)}
+)
+CallbackMetric(
+    "bikescope_stream_subscribers", "Open station stream connections", "gauge", ("tenant_id",),
+    lambda: {(tenant_id,): count for tenant_id, count in station_stream.stats()["subscribers"].items()}
+)
+CallbackMetric(
+    "bikescope_result_cache_entries", "Entries held by each result cache", "gauge", ("cache",),
+    lambda: {(name,): cache.stats()["entries"] for name, cache in caches.items()}
+)
+CallbackMetric(
+    "bikescope_result_cache_lookups", "Result cache lookups by outcome", "counter", ("cache", "outcome"),
+    lambda: {
+        (name, outcome): getattr(cache, outcome)
+        for name, cache in caches.items()
+        for outcome in ("hits", "misses", "coalesced")
+    }
+)
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Application startup and shutdown"""
@@ -24,10 +58,14 @@ async def lifespan(app: FastAPI):
     logger.info("🚀 Starting BikeScope Analytics API...")
     
     try:
+        get_tenant_index()  # fail fast on invalid tenant definitions
         await connect_to_mongo()
+        await gbfs_service.start()
+        station_stream.start()
+        if profiler is not None:
+            profiler.start()
         
-        logger.info("📡 Performing initial GBFS data fetch...")
-        await gbfs_service.update_stations_data()
+        await gbfs_service.initial_sync()
         
         background_task = asyncio.create_task(gbfs_service.start_background_updates())
         
@@ -49,6 +87,10 @@ async def lifespan(app: FastAPI):
         except asyncio.CancelledError:
             logger.info("Background task cancelled")
     
+    if profiler is not None:
+        profiler.stop()
+    await station_stream.close()
+    await gbfs_service.close()
     await close_mongo_connection()
     
     logger.info("👋 BikeScope API shutdown complete")
@@ -57,7 +99,8 @@ app = FastAPI(
     title="BikeScope Analytics API",
     description="Multi-tenant bike share analytics system",
     version="1.0.0",
-    lifespan=lifespan
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse
 )
 
 app.add_middleware(
@@ -66,8 +109,11 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "X-Next-Cursor"],
 )
 
+app.add_middleware(MetricsMiddleware, profiler=profiler)
+
 app.include_router(router, prefix="/api/v1")
 
 @app.get("/")
@@ -78,6 +124,11 @@ async def root():
         "version": "1.0.0"
     }
 
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Prometheus scrape endpoint (this worker's metrics only)"""
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(
@@ -85,5 +136,7 @@ if __name__ == "__main__":
         host="0.0.0.0",
         port=8000,
         reload=True,
-        log_level="info"
+        log_level="info",
+        # Open station streams never finish on their own; cancel them so shutdown can proceed
+        timeout_graceful_shutdown=5
     )
\ No newline at end of file
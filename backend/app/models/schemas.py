@@ -1,7 +1,7 @@
 from pydantic import BaseModel, Field, GetJsonSchemaHandler
 from pydantic.json_schema import JsonSchemaValue
 from pydantic_core import core_schema
-from typing import List, Literal, Any
+from typing import Dict, List, Literal, Any, Optional
 from datetime import datetime
 from bson import ObjectId
 
@@ -45,7 +45,7 @@ class StationStatus(BaseModel):
 class Station(BaseModel):
     id: PyObjectId = Field(default_factory=PyObjectId, alias="_id")
     station_id: str
-    tenant_id: Literal["manhattan", "brooklyn"]
+    tenant_id: str
     name: str
     lat: float = Field(ge=-90, le=90)
     lon: float = Field(ge=-180, le=180)
@@ -58,9 +58,15 @@ class Station(BaseModel):
         "json_encoders": {ObjectId: str}
     }
 
+class Tenant(BaseModel):
+    tenant_id: str
+    name: str
+    is_default: bool = False
+    bounds: Optional[List[float]] = None  # [min_lon, min_lat, max_lon, max_lat] of its polygons
+
 class Alert(BaseModel):
     id: PyObjectId = Field(default_factory=PyObjectId, alias="_id")
-    tenant_id: Literal["manhattan", "brooklyn"]
+    tenant_id: str
     station_id: str
     station_name: str
     type: Literal["low_bikes", "full_station", "offline"]
@@ -97,10 +103,94 @@ class StationResponse(BaseModel):
     last_updated: datetime
     status_color: Literal["green", "yellow", "red"]
 
+class NearbyStation(StationResponse):
+    """Station returned by a nearest-station query"""
+    distance_m: float
+
 class AlertResponse(BaseModel):
     """Response model for alerts"""
     station_id: str
     station_name: str
     type: str
     severity: str
-    timestamp: datetime
\ No newline at end of file
+    timestamp: datetime
+
+class AvailabilityPoint(BaseModel):
+    """Station availability in effect at the start of an interval"""
+    timestamp: datetime
+    bikes_available: int
+    docks_available: int
+    is_installed: bool
+    is_renting: bool
+
+class TenantAvailabilityPoint(BaseModel):
+    """Tenant-wide availability summed over reporting stations"""
+    timestamp: datetime
+    bikes_available: int
+    docks_available: int
+    stations_reporting: int
+    empty_stations: int
+
+class StationAvailabilityHistory(BaseModel):
+    station_id: str
+    points: List[AvailabilityPoint]
+
+class AvailabilityHistory(BaseModel):
+    """Response model for downsampled availability curves"""
+    tenant_id: str
+    interval_minutes: int
+    tenant: List[TenantAvailabilityPoint]
+    stations: List[StationAvailabilityHistory] = []
+
+class StationUpdate(BaseModel):
+    """Pushed to stream subscribers: stations that changed in one GBFS cycle"""
+    tenant_id: str
+    sequence: int
+    published_at: datetime
+    stations: List[StationResponse]
+    removed: List[str] = []
+
+class StationFlow(BaseModel):
+    """Trips between one origin and one destination station"""
+    start_station_id: str
+    end_station_id: str
+    start_station_name: Optional[str] = None
+    end_station_name: Optional[str] = None
+    trip_count: int
+    avg_duration_minutes: Optional[float] = None
+
+class StationFlowBalance(BaseModel):
+    station_id: str
+    name: Optional[str] = None
+    outflow: int
+    inflow: int
+    net_inflow: int
+
+class FlowSummary(BaseModel):
+    """Response model for origin-destination flows"""
+    tenant_id: str
+    start: Optional[datetime] = None
+    end: Optional[datetime] = None
+    total_trips: int
+    station_count: int
+    pair_count: int
+    top_flows: List[StationFlow]
+    stations: List[StationFlowBalance]
+
+class StationIncidentStats(BaseModel):
+    station_id: str
+    name: Optional[str] = None
+    incidents: int
+    incidents_by_type: Dict[str, int]
+    critical_minutes: float
+    critical_minutes_per_day: float
+    minutes_by_type: Dict[str, float]
+
+class IncidentStats(BaseModel):
+    """Response model for per-station alert history over a window of whole UTC days"""
+    tenant_id: str
+    start: datetime
+    end: datetime
+    days: int
+    station_count: int
+    stations: List[StationIncidentStats]
@@ -0,0 +1,264 @@
+import base64
+import logging
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from bson import ObjectId
+from bson.errors import InvalidId
+from pymongo import DESCENDING, InsertOne, UpdateOne
+
+from app.core.metrics import alerts_written
+from app.models.schemas import Alert
+from app.services.incident_stats import INCIDENT_STATS_COLLECTION, incident_stats_service
+
+logger = logging.getLogger(__name__)
+
+AlertKey = Tuple[str, str]  # (station_id, type)
+
+LOW_AVAILABILITY_THRESHOLD = 3
+
+# Selectable with ?fields=, named as they appear in responses
+ALERT_FIELDS = tuple(field.alias or name for name, field in Alert.model_fields.items())
+
+# Keyset order for alert pages; backed by the (tenant_id, resolved, timestamp, _id) index
+ALERT_SORT = [("timestamp", DESCENDING), ("_id", DESCENDING)]
+
+def detect_alert_conditions(station_doc: Dict) -> Dict[str, str]:
+    """Return the active alert conditions for a station as {type: severity}"""
+    conditions = {}
+    status = station_doc["current_status"]
+
+    if status["bikes_available"] <= LOW_AVAILABILITY_THRESHOLD:
+        conditions["low_bikes"] = "warning" if status["bikes_available"] > 0 else "critical"
+
+    if status["docks_available"] <= LOW_AVAILABILITY_THRESHOLD:
+        conditions["full_station"] = "warning" if status["docks_available"] > 0 else "critical"
+
+    if not status["is_installed"] or not status["is_renting"]:
+        conditions["offline"] = "critical"
+
+    return conditions
+
+class AlertEngine:
+    """
+    Tracks the open alert per (station, type) in memory and only writes
+    on lifecycle transitions: open, severity change and resolve. Each
+    transition also feeds the per-station daily incident stats.
+    """
+
+    def __init__(self):
+        self._open: Dict[AlertKey, Dict] = {}
+        self._loaded = False
+        self.last_cycle_counts: Dict[str, int] = {}
+
+    async def load_open_alerts(self, db):
+        """
+        Rebuild in-memory state from unresolved alerts. Duplicate open alerts
+        for the same (station, type), left over from insert-per-poll, are
+        compacted by resolving all but the newest.
+        """
+        self._open = {}
+        duplicate_ids = []
+
+        cursor = db.alerts.find({"resolved": False}).sort("timestamp", -1)
+        async for alert in cursor:
+            key = (alert["station_id"], alert["type"])
+            if key in self._open:
+                duplicate_ids.append(alert["_id"])
+            else:
+                self._open[key] = alert
+
+        if duplicate_ids:
+            now = datetime.utcnow()
+            await db.alerts.update_many(
+                {"_id": {"$in": duplicate_ids}},
+                {"$set": {"resolved": True, "resolved_at": now, "updated_at": now}}
+            )
+            logger.info(f"🧹 Compacted {len(duplicate_ids)} duplicate open alerts")
+
+        self._loaded = True
+        logger.info(f"Loaded {len(self._open)} open alerts")
+
+    def evaluate(self, station_docs: Iterable[Dict], removed_ids: Iterable[str] = ()) -> List:
+        """
+        Diff the given stations against the open alert state and return the
+        write operations for every transition. Open alerts of removed_ids
+        (stations that left the feed) are resolved; other stations not
+        passed in keep their current alerts.
+        """
+        operations = []
+        counts = {"opened": 0, "updated": 0, "resolved": 0}
+        now = datetime.utcnow()
+
+        for station_doc in station_docs:
+            station_id = station_doc["station_id"]
+            conditions = detect_alert_conditions(station_doc)
+
+            for alert_type in ("low_bikes", "full_station", "offline"):
+                key = (station_id, alert_type)
+                open_alert = self._open.get(key)
+                severity = conditions.get(alert_type)
+
+                if severity and open_alert is None:
+                    alert = {
+                        "_id": ObjectId(),
+                        "tenant_id": station_doc["tenant_id"],
+                        "station_id": station_id,
+                        "station_name": station_doc["name"],
+                        "type": alert_type,
+                        "severity": severity,
+                        "timestamp": now,
+                        "updated_at": now,
+                        "resolved": False
+                    }
+                    self._open[key] = alert
+                    incident_stats_service.record_opened(alert)
+                    operations.append(InsertOne(alert))
+                    counts["opened"] += 1
+
+                elif severity and open_alert["severity"] != severity:
+                    incident_stats_service.record_elapsed(open_alert, now)
+                    open_alert["severity"] = severity
+                    open_alert["updated_at"] = now
+                    operations.append(UpdateOne(
+                        {"_id": open_alert["_id"]},
+                        {"$set": {"severity": severity, "updated_at": now}}
+                    ))
+                    counts["updated"] += 1
+
+                elif not severity and open_alert is not None:
+                    operations.append(self._resolve(key, now))
+                    counts["resolved"] += 1
+
+        removed_ids = set(removed_ids)
+        if removed_ids:
+            for key in [key for key in self._open if key[0] in removed_ids]:
+                operations.append(self._resolve(key, now))
+                counts["resolved"] += 1
+
+        self.last_cycle_counts = counts
+        return operations
+
+    def _resolve(self, key: AlertKey, now: datetime) -> UpdateOne:
+        open_alert = self._open.pop(key)
+        incident_stats_service.record_elapsed(open_alert, now)
+        return UpdateOne(
+            {"_id": open_alert["_id"]},
+            {"$set": {"resolved": True, "resolved_at": now, "updated_at": now}}
+        )
+
+    async def apply(self, db, station_docs: Iterable[Dict], removed_ids: Iterable[str] = ()) -> Dict[str, int]:
+        """Evaluate stations (and stations removed from the feed) and persist the resulting transitions in one batch"""
+        if not self._loaded:
+            await self.load_open_alerts(db)
+
+        operations = self.evaluate(station_docs, removed_ids)
+        if operations:
+            try:
+                await db.alerts.bulk_write(operations, ordered=False)
+            except Exception:
+                # In-memory state may now be ahead of the database; reload next cycle.
+                # Unwritten transitions are credited again from the reloaded alerts.
+                self._loaded = False
+                incident_stats_service.discard_pending()
+                raise
+
+            stats_operations = incident_stats_service.take_operations()
+            if stats_operations:
+                try:
+                    await db[INCIDENT_STATS_COLLECTION].bulk_write(stats_operations, ordered=False)
+                except Exception as e:
+                    logger.warning(f"Failed to update incident stats: {e}")
+
+            counts = self.last_cycle_counts
+            for action, count in counts.items():
+                if count:
+                    alerts_written.labels(action).inc(count)
+            logger.info(
+                f"🚨 Alerts: {counts['opened']} opened, "
+                f"{counts['updated']} severity changes, {counts['resolved']} resolved"
+            )
+
+        return self.last_cycle_counts
+
+    def invalidate(self):
+        """Reload open alerts from the database before the next write (e.g. after another worker wrote them)"""
+        self._loaded = False
+        incident_stats_service.discard_pending()
+
+    @property
+    def open_alert_count(self) -> int:
+        return len(self._open)
+
+def encode_alert_cursor(alert: Dict) -> str:
+    """Opaque cursor pointing just after this alert in ALERT_SORT order"""
+    raw = f"{alert['timestamp'].isoformat()}|{alert['_id']}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+def decode_alert_cursor(cursor: str) -> Tuple[datetime, ObjectId]:
+    """Raises ValueError for a malformed cursor"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        timestamp, alert_id = raw.split("|")
+        return datetime.fromisoformat(timestamp), ObjectId(alert_id)
+    except (ValueError, UnicodeDecodeError, InvalidId) as e:
+        raise ValueError("Invalid cursor") from e
+
+def build_alert_query(
+    tenant_id: str,
+    types: Optional[List[str]] = None,
+    severities: Optional[List[str]] = None,
+    after: Optional[Tuple[datetime, ObjectId]] = None
+) -> Dict:
+    """Open alerts for a tenant, optionally filtered and starting after a cursor position"""
+    query: Dict = {"tenant_id": tenant_id, "resolved": False}
+    if types:
+        query["type"] = {"$in": types}
+    if severities:
+        query["severity"] = {"$in": severities}
+    if after is not None:
+        timestamp, alert_id = after
+        query["$or"] = [
+            {"timestamp": {"$lt": timestamp}},
+            {"timestamp": timestamp, "_id": {"$lt": alert_id}}
+        ]
+    return query
+
+async def find_alerts(
+    db,
+    tenant_id: str,
+    limit: int,
+    after: Optional[Tuple[datetime, ObjectId]] = None,
+    types: Optional[List[str]] = None,
+    severities: Optional[List[str]] = None,
+    fields: Optional[List[str]] = None
+) -> Tuple[List[Dict], Optional[str]]:
+    """
+    One page of open alerts after a decoded cursor position, newest first,
+    and the cursor of the next page (None on the last page). With fields,
+    only those are read from MongoDB.
+    """
+    projection = None
+    if fields is not None:
+        # timestamp and _id locate the next page even when not requested
+        projection = {field: 1 for field in fields}
+        projection["timestamp"] = 1
+
+    # One extra document tells whether another page exists
+    documents = await db.alerts.find(
+        build_alert_query(tenant_id, types, severities, after),
+        projection
+    ).sort(ALERT_SORT).limit(limit + 1).to_list(None)
+
+    next_cursor = None
+    if len(documents) > limit:
+        documents = documents[:limit]
+        next_cursor = encode_alert_cursor(documents[-1])
+    if fields is not None:
+        documents = [
+            {field: document[field] for field in fields if field in document}
+            for document in documents
+        ]
+    return documents, next_cursor
+
+alert_engine = AlertEngine()
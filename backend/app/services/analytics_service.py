@@ -1,120 +1,274 @@
 import logging
-from datetime import datetime, timedelta
-from typing import Dict, List
-from collections import Counter
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
 
+from app.core.config import settings
 from app.database.connection import get_database
 from app.models.schemas import Analytics, TopStation
+from app.services.coordination import TRIPS_VERSION, get_version
+from app.services.parquet_store import ParquetTripStore
+from app.services.result_cache import ResultCache
+from app.services.station_metadata import station_metadata
+from app.services.trip_rollups import ROLLUP_COLLECTION, MIN_TRIP_SECONDS, MAX_TRIP_SECONDS
 
 logger = logging.getLogger(__name__)
 
+TOP_STATIONS_LIMIT = 5
+
+def to_naive_utc(value: Optional[datetime]) -> Optional[datetime]:
+    """Trips are stored as naive datetimes; normalize aware inputs to match"""
+    if value is not None and value.tzinfo is not None:
+        return value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+def is_hour_aligned(value: Optional[datetime]) -> bool:
+    return value is None or (value.minute == 0 and value.second == 0 and value.microsecond == 0)
+
+def build_range_filter(start: Optional[datetime], end: Optional[datetime]) -> Dict:
+    range_filter = {}
+    if start is not None:
+        range_filter["$gte"] = start
+    if end is not None:
+        range_filter["$lt"] = end
+    return range_filter
+
 class AnalyticsService:
     def __init__(self):
-        self.db = get_database()
+        self.backend = settings.analytics_backend
+        self.parquet_store = ParquetTripStore(settings.parquet_trip_path)
+        self.cache = ResultCache(
+            "analytics",
+            max_entries=settings.analytics_cache_size,
+            ttl_seconds=settings.analytics_cache_ttl_seconds,
+            version_source=self._trips_version,
+            version_check_seconds=settings.cache_version_check_seconds
+        )
+
+    async def _trips_version(self) -> int:
+        return await get_version(self.db, TRIPS_VERSION)
+
+    @property
+    def db(self):
+        """Get database instance (lazy loading)"""
+        return get_database()
+
+    def build_trip_match(
+        self,
+        tenant_id: str,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        station_id: Optional[str] = None
+    ) -> Dict:
+        """Match on the (tenant_id, [start_station_id,] started_at) index prefix"""
+        match = {"tenant_id": tenant_id}
+        if station_id:
+            match["start_station_id"] = station_id
+        if start is not None or end is not None:
+            match["started_at"] = build_range_filter(start, end)
+        return match
+
+    def build_analytics_pipeline(
+        self,
+        tenant_id: str,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        station_id: Optional[str] = None
+    ) -> List[Dict]:
+        """Build a single $facet pipeline computing every analytics metric in MongoDB"""
+        return [
+            {"$match": self.build_trip_match(tenant_id, start, end, station_id)},
+            {"$facet": {
+                "top_stations": [
+                    {"$match": {"start_station_id": {"$nin": [None, ""]}}},
+                    {"$group": {"_id": "$start_station_id", "trip_count": {"$sum": 1}}},
+                    {"$sort": {"trip_count": -1, "_id": 1}},
+                    {"$limit": TOP_STATIONS_LIMIT}
+                ],
+                "avg_duration": [
+                    {"$match": {"duration_seconds": {
+                        "$gte": MIN_TRIP_SECONDS,
+                        "$lte": MAX_TRIP_SECONDS
+                    }}},
+                    {"$group": {"_id": None, "avg_seconds": {"$avg": "$duration_seconds"}}}
+                ],
+                "peak_hour": [
+                    {"$match": {"started_at": {"$type": "date"}}},
+                    {"$group": {"_id": {"$hour": "$started_at"}, "count": {"$sum": 1}}},
+                    {"$sort": {"count": -1, "_id": 1}},
+                    {"$limit": 1}
+                ],
+                "total": [
+                    {"$count": "count"}
+                ]
+            }}
+        ]
+
+    def build_rollup_analytics_pipeline(
+        self,
+        tenant_id: str,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        station_id: Optional[str] = None
+    ) -> List[Dict]:
+        """Build the $facet pipeline over precomputed hourly rollups"""
+        match = {"tenant_id": tenant_id}
+        if station_id:
+            match["station_id"] = station_id
+        if start is not None or end is not None:
+            match["hour_start"] = build_range_filter(start, end)
+
+        return [
+            {"$match": match},
+            {"$facet": {
+                "top_stations": [
+                    {"$match": {"station_id": {"$nin": [None, ""]}}},
+                    {"$group": {"_id": "$station_id", "trip_count": {"$sum": "$trip_count"}}},
+                    {"$sort": {"trip_count": -1, "_id": 1}},
+                    {"$limit": TOP_STATIONS_LIMIT}
+                ],
+                "avg_duration": [
+                    {"$group": {
+                        "_id": None,
+                        "duration_sum": {"$sum": "$duration_sum"},
+                        "duration_count": {"$sum": "$duration_count"}
+                    }},
+                    {"$project": {
+                        "avg_seconds": {"$cond": [
+                            {"$gt": ["$duration_count", 0]},
+                            {"$divide": ["$duration_sum", "$duration_count"]},
+                            None
+                        ]}
+                    }}
+                ],
+                "peak_hour": [
+                    {"$group": {"_id": "$hour", "count": {"$sum": "$trip_count"}}},
+                    {"$sort": {"count": -1, "_id": 1}},
+                    {"$limit": 1}
+                ],
+                "total": [
+                    {"$group": {"_id": None, "count": {"$sum": "$trip_count"}}}
+                ]
+            }}
+        ]
+
+    async def _run_facets(self, collection, pipeline: List[Dict]) -> Dict:
+        cursor = collection.aggregate(pipeline, allowDiskUse=True)
+        results = await cursor.to_list(1)
+        return results[0] if results else {}
+
+    async def compute_mongo_facets(
+        self,
+        tenant_id: str,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        station_id: Optional[str] = None
+    ) -> Dict:
+        """
+        Answer from the hourly rollups when the window is hour-aligned, otherwise
+        (or when the window has no rollups) from an index range scan over raw
+        trips. Trips loaded before rollups existed need a one-time
+        `process_trip_data.py --rebuild-rollups`, or windows spanning them are partial.
+        """
+        if is_hour_aligned(start) and is_hour_aligned(end):
+            facets = await self._run_facets(
+                self.db[ROLLUP_COLLECTION],
+                self.build_rollup_analytics_pipeline(tenant_id, start, end, station_id)
+            )
+            if facets.get("total"):
+                return facets
+
+        return await self._run_facets(
+            self.db.trips,
+            self.build_analytics_pipeline(tenant_id, start, end, station_id)
+        )
+
+    async def get_tenant_analytics(
+        self,
+        tenant_id: str,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        station_id: Optional[str] = None
+    ) -> Analytics:
+        """
+        Get analytics data for a specific tenant, optionally limited to [start, end)
+        and one station. Results are cached until the TTL or the next trip ingest.
+        """
+        start = to_naive_utc(start)
+        end = to_naive_utc(end)
 
-    async def get_tenant_analytics(self, tenant_id: str) -> Analytics:
-        """Get analytics data for a specific tenant"""
         try:
-            logger.info(f"📊 Generating analytics for tenant: {tenant_id}")
-            
-            trips_cursor = self.db.trips.find({"tenant_id": tenant_id})
-            trips = await trips_cursor.to_list(None)
-            
-            if not trips:
-                logger.warning(f"No trip data found for tenant: {tenant_id}")
-                return Analytics(
-                    top_stations=[],
-                    avg_trip_duration=0.0,
-                    peak_hour=0,
-                    total_trips=0
-                )
-            
-            top_stations = await self._calculate_top_stations(trips, tenant_id)
-            avg_duration = self._calculate_avg_duration(trips)
-            
-            peak_hour = self._calculate_peak_hour(trips)
-            
-            return Analytics(
-                top_stations=top_stations,
-                avg_trip_duration=avg_duration,
-                peak_hour=peak_hour,
-                total_trips=len(trips)
+            return await self.cache.get_or_compute(
+                (self.backend, tenant_id, start, end, station_id),
+                lambda: self.compute_analytics(tenant_id, start, end, station_id)
             )
-            
         except Exception as e:
             logger.error(f"Error generating analytics for {tenant_id}: {e}")
-            return Analytics(
-                top_stations=[],
-                avg_trip_duration=0.0,
-                peak_hour=0,
-                total_trips=0
+            return self._empty_analytics()
+
+    async def compute_analytics(
+        self,
+        tenant_id: str,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        station_id: Optional[str] = None
+    ) -> Analytics:
+        """Compute analytics without the cache (errors propagate so they are never cached)"""
+        logger.info(f"📊 Generating analytics for tenant: {tenant_id}")
+
+        if self.backend == "parquet":
+            facets = await self.parquet_store.compute_facets(
+                tenant_id, TOP_STATIONS_LIMIT, start, end, station_id
             )
+        else:
+            facets = await self.compute_mongo_facets(tenant_id, start, end, station_id)
+        total_trips = facets["total"][0]["count"] if facets.get("total") else 0
+
+        if not total_trips:
+            logger.warning(f"No trip data found for tenant: {tenant_id}")
+            return self._empty_analytics()
 
-    async def _calculate_top_stations(self, trips: List[Dict], tenant_id: str) -> List[TopStation]:
-        """Calculate top 5 stations by trip starts"""
+        top_stations = await self._resolve_top_stations(facets["top_stations"], tenant_id)
+        avg_duration = self._avg_duration_minutes(facets["avg_duration"])
+        peak_hour = facets["peak_hour"][0]["_id"] if facets["peak_hour"] else 0
+
+        return Analytics(
+            top_stations=top_stations,
+            avg_trip_duration=avg_duration,
+            peak_hour=peak_hour,
+            total_trips=total_trips
+        )
+
+    def _empty_analytics(self) -> Analytics:
+        return Analytics(
+            top_stations=[],
+            avg_trip_duration=0.0,
+            peak_hour=0,
+            total_trips=0
+        )
+
+    async def _resolve_top_stations(self, station_counts: List[Dict], tenant_id: str) -> List[TopStation]:
+        """Attach station names to the aggregated top station counts"""
         try:
-            station_counts = Counter()
-            for trip in trips:
-                if "start_station_id" in trip and trip["start_station_id"]:
-                    station_counts[trip["start_station_id"]] += 1
-            
-            top_station_ids = station_counts.most_common(5)
-            top_stations = []
-            
-            for station_id, count in top_station_ids:
-                station_doc = await self.db.stations.find_one({
-                    "station_id": station_id,
-                    "tenant_id": tenant_id
-                })
-                
-                station_name = station_doc["name"] if station_doc else f"Station {station_id}"
-                
-                top_stations.append(TopStation(
-                    station_id=station_id,
-                    name=station_name,
-                    trip_count=count
-                ))
-            
-            return top_stations
-            
+            names = await station_metadata.get_names(
+                self.db, [entry["_id"] for entry in station_counts], tenant_id
+            )
+            return [
+                TopStation(
+                    station_id=entry["_id"],
+                    name=names.get(entry["_id"], f"Station {entry['_id']}"),
+                    trip_count=entry["trip_count"]
+                )
+                for entry in station_counts
+            ]
+
         except Exception as e:
             logger.error(f"Error calculating top stations: {e}")
             return []
 
-    def _calculate_avg_duration(self, trips: List[Dict]) -> float:
-        """Calculate average trip duration in minutes"""
-        try:
-            durations = []
-            for trip in trips:
-                if "duration_seconds" in trip and trip["duration_seconds"]:
-                    duration_minutes = trip["duration_seconds"] / 60
-                    if 1 <= duration_minutes <= 1440:  # 1 minute to 24 hours
-                        durations.append(duration_minutes)
-            
-            if durations:
-                return round(sum(durations) / len(durations), 2)
-            return 0.0
-            
-        except Exception as e:
-            logger.error(f"Error calculating average duration: {e}")
-            return 0.0
-
-    def _calculate_peak_hour(self, trips: List[Dict]) -> int:
-        """Calculate peak usage hour (0-23)"""
-        try:
-            hours = []
-            for trip in trips:
-                if "started_at" in trip and trip["started_at"]:
-                    if isinstance(trip["started_at"], datetime):
-                        hours.append(trip["started_at"].hour)
-            
-            if hours:
-                hour_counts = Counter(hours)
-                return hour_counts.most_common(1)[0][0]
-            return 0
-            
-        except Exception as e:
-            logger.error(f"Error calculating peak hour: {e}")
-            return 0
+    def _avg_duration_minutes(self, avg_facet: List[Dict]) -> float:
+        """Convert the aggregated average duration to minutes"""
+        if avg_facet and avg_facet[0].get("avg_seconds") is not None:
+            return round(avg_facet[0]["avg_seconds"] / 60, 2)
+        return 0.0
 
-analytics_service = AnalyticsService()
\ No newline at end of file
+analytics_service = AnalyticsService()
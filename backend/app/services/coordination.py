@@ -0,0 +1,128 @@
+import asyncio
+import logging
+import os
+import socket
+import uuid
+from typing import Optional
+
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+LEASE_COLLECTION = "service_leases"
+VERSION_COLLECTION = "cache_versions"
+
+GBFS_POLLER_LEASE = "gbfs_poller"
+STATIONS_VERSION = "stations"
+TRIPS_VERSION = "trips"  # bumped by trip ingest; invalidates cached analytics and flows
+
+def worker_id() -> str:
+    """Identify this process in lease documents"""
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+
+class Lease:
+    """
+    Leader election through one lease document per role. The holder renews
+    it every ttl/3; any worker may take it over once it has expired. Expiry
+    is computed with the server's $$NOW so worker clock skew does not matter.
+    """
+
+    def __init__(self, name: str, ttl_seconds: Optional[int] = None, owner: Optional[str] = None):
+        self.name = name
+        self.ttl_seconds = ttl_seconds or settings.leader_lease_seconds
+        self.owner = owner or worker_id()
+        self.is_held = False
+        self._task: Optional[asyncio.Task] = None
+
+    async def acquire(self, db) -> bool:
+        """Take the lease if it is free or expired, or renew it if we hold it"""
+        # Upsert queries cannot use $expr, so the filter only names the lease and
+        # the ownership test runs inside the update pipeline against $$NOW
+        takeover = {"$or": [
+            {"$eq": ["$owner", self.owner]},
+            {"$lt": ["$expires_at", "$$NOW"]}  # also true for a new (missing) lease
+        ]}
+        try:
+            lease = await db[LEASE_COLLECTION].find_one_and_update(
+                {"_id": self.name},
+                [{"$set": {
+                    "owner": {"$cond": [takeover, self.owner, "$owner"]},
+                    "renewed_at": {"$cond": [takeover, "$$NOW", "$renewed_at"]},
+                    "expires_at": {"$cond": [
+                        takeover,
+                        {"$add": ["$$NOW", self.ttl_seconds * 1000]},
+                        "$expires_at"
+                    ]}
+                }}],
+                upsert=True,
+                projection={"owner": 1},
+                return_document=ReturnDocument.AFTER
+            )
+            held = lease is not None and lease.get("owner") == self.owner
+        except DuplicateKeyError:
+            # Another worker's upsert created the lease at the same moment
+            held = False
+        except Exception as e:
+            logger.error(f"❌ Lease {self.name} check failed: {e}")
+            held = False
+
+        if held != self.is_held:
+            logger.info(f"👑 {self.owner} {'acquired' if held else 'lost'} lease {self.name}")
+        self.is_held = held
+        return held
+
+    async def release(self, db):
+        """Give up the lease so another worker can take over immediately"""
+        if self.is_held:
+            try:
+                await db[LEASE_COLLECTION].delete_one({"_id": self.name, "owner": self.owner})
+            except Exception as e:
+                logger.warning(f"Failed to release lease {self.name}: {e}")
+        self.is_held = False
+
+    async def _keep_alive(self, db):
+        while True:
+            await self.acquire(db)
+            await asyncio.sleep(self.ttl_seconds / 3)
+
+    def start(self, db):
+        """Keep acquiring/renewing the lease in the background"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._keep_alive(db))
+
+    async def stop(self, db):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.release(db)
+
+async def bump_version(db, name: str) -> int:
+    """Increment a shared version stamp; readers reload when it changes"""
+    result = await db[VERSION_COLLECTION].find_one_and_update(
+        {"_id": name},
+        {"$inc": {"version": 1}, "$currentDate": {"updated_at": True}},
+        upsert=True,
+        return_document=ReturnDocument.AFTER
+    )
+    return result["version"]
+
+def bump_version_sync(db, name: str) -> int:
+    """bump_version for synchronous (pymongo) scripts such as trip ingest"""
+    result = db[VERSION_COLLECTION].find_one_and_update(
+        {"_id": name},
+        {"$inc": {"version": 1}, "$currentDate": {"updated_at": True}},
+        upsert=True,
+        return_document=ReturnDocument.AFTER
+    )
+    return result["version"]
+
+async def get_version(db, name: str) -> int:
+    document = await db[VERSION_COLLECTION].find_one({"_id": name}, {"version": 1})
+    return document["version"] if document else 0
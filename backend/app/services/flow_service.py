@@ -0,0 +1,297 @@
+import logging
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from app.core.config import settings
+from app.database.connection import get_database
+from app.models.schemas import FlowSummary, StationFlow, StationFlowBalance
+from app.services.analytics_service import build_range_filter, to_naive_utc
+from app.services.coordination import TRIPS_VERSION, get_version
+from app.services.parquet_store import ParquetTripStore
+from app.services.result_cache import ResultCache
+from app.services.station_metadata import station_metadata
+from app.services.trip_rollups import MIN_TRIP_SECONDS, MAX_TRIP_SECONDS
+
+logger = logging.getLogger(__name__)
+
+MISSING_STATION_IDS = [None, "", "nan"]
+
+@dataclass(frozen=True)
+class FlowMatrix:
+    """
+    Sparse (COO) origin x destination trip matrix for one tenant and window.
+    Row/column i is station_ids[i]; each nonzero pair k is
+    (origins[k], destinations[k]) with its trip count and duration totals.
+    """
+    station_ids: np.ndarray
+    origins: np.ndarray
+    destinations: np.ndarray
+    trip_counts: np.ndarray
+    duration_sums: np.ndarray  # seconds, valid durations only
+    duration_counts: np.ndarray
+    built_at: datetime
+
+    @classmethod
+    def from_pairs(cls, origin_ids, destination_ids, trip_counts, duration_sums, duration_counts) -> "FlowMatrix":
+        """Build from already-grouped (origin, destination) rows"""
+        origin_ids = np.asarray(origin_ids, dtype=object)
+        station_codes, station_ids = pd.factorize(
+            np.concatenate([origin_ids, np.asarray(destination_ids, dtype=object)])
+        )
+        return cls(
+            station_ids=np.asarray(station_ids, dtype=object),
+            origins=station_codes[:len(origin_ids)].astype(np.int32),
+            destinations=station_codes[len(origin_ids):].astype(np.int32),
+            trip_counts=np.asarray(trip_counts, dtype=np.int64),
+            duration_sums=np.asarray(duration_sums, dtype=np.float64),
+            duration_counts=np.asarray(duration_counts, dtype=np.int64),
+            built_at=datetime.utcnow()
+        )
+
+    @classmethod
+    def from_trips(cls, origin_ids, destination_ids, durations) -> "FlowMatrix":
+        """Vectorized group-by of raw trips into (origin, destination) pairs"""
+        origin_ids = np.asarray(origin_ids, dtype=object)
+        durations = np.asarray(durations, dtype=np.float64)
+        station_codes, station_ids = pd.factorize(
+            np.concatenate([origin_ids, np.asarray(destination_ids, dtype=object)])
+        )
+        station_count = max(len(station_ids), 1)
+        origins = station_codes[:len(origin_ids)].astype(np.int64)
+        destinations = station_codes[len(origin_ids):].astype(np.int64)
+
+        pair_index, pair_keys = pd.factorize(origins * station_count + destinations)
+        valid = (durations >= MIN_TRIP_SECONDS) & (durations <= MAX_TRIP_SECONDS)
+        pair_count = len(pair_keys)
+
+        return cls(
+            station_ids=np.asarray(station_ids, dtype=object),
+            origins=(pair_keys // station_count).astype(np.int32),
+            destinations=(pair_keys % station_count).astype(np.int32),
+            trip_counts=np.bincount(pair_index, minlength=pair_count).astype(np.int64),
+            duration_sums=np.bincount(pair_index, weights=np.where(valid, durations, 0.0), minlength=pair_count),
+            duration_counts=np.bincount(pair_index, weights=valid, minlength=pair_count).astype(np.int64),
+            built_at=datetime.utcnow()
+        )
+
+    @property
+    def total_trips(self) -> int:
+        return int(self.trip_counts.sum())
+
+    def _station_ranks(self) -> np.ndarray:
+        """Lexicographic rank of each station id, for deterministic tie-breaking"""
+        ranks = np.empty(len(self.station_ids), dtype=np.int64)
+        ranks[np.argsort(self.station_ids.astype(str), kind="stable")] = np.arange(len(self.station_ids))
+        return ranks
+
+    def top_flows(self, limit: int, include_self_loops: bool = True) -> List[StationFlow]:
+        """Largest pairs by trip count (ties broken by station ids)"""
+        candidates = np.arange(len(self.trip_counts))
+        if not include_self_loops:
+            candidates = candidates[self.origins != self.destinations]
+        if len(candidates) > limit:
+            # Only pairs at or above the k-th largest count (ties included) need ordering
+            counts = self.trip_counts[candidates]
+            threshold = np.partition(counts, len(counts) - limit)[len(counts) - limit]
+            candidates = candidates[counts >= threshold]
+
+        ranks = self._station_ranks()
+        order = np.lexsort((
+            ranks[self.destinations[candidates]],
+            ranks[self.origins[candidates]],
+            -self.trip_counts[candidates]
+        ))[:limit]
+
+        flows = []
+        for k in candidates[order]:
+            duration_count = self.duration_counts[k]
+            flows.append(StationFlow(
+                start_station_id=self.station_ids[self.origins[k]],
+                end_station_id=self.station_ids[self.destinations[k]],
+                trip_count=int(self.trip_counts[k]),
+                avg_duration_minutes=(
+                    round(self.duration_sums[k] / duration_count / 60, 2) if duration_count else None
+                )
+            ))
+        return flows
+
+    def station_balance(self, limit: Optional[int] = None) -> List[StationFlowBalance]:
+        """Per-station outflow/inflow (self-loops count both ways), largest imbalance first"""
+        station_count = len(self.station_ids)
+        outflow = np.bincount(self.origins, weights=self.trip_counts, minlength=station_count).astype(np.int64)
+        inflow = np.bincount(self.destinations, weights=self.trip_counts, minlength=station_count).astype(np.int64)
+        net_inflow = inflow - outflow
+
+        order = np.lexsort((self._station_ranks(), -np.abs(net_inflow)))
+        if limit is not None:
+            order = order[:limit]
+
+        return [
+            StationFlowBalance(
+                station_id=self.station_ids[i],
+                outflow=int(outflow[i]),
+                inflow=int(inflow[i]),
+                net_inflow=int(net_inflow[i])
+            )
+            for i in order
+        ]
+
+class FlowService:
+    """Origin-destination flow matrices per tenant and time window, cached in-process"""
+
+    def __init__(self):
+        self.backend = settings.analytics_backend
+        self.parquet_store = ParquetTripStore(settings.parquet_trip_path)
+        self.cache = ResultCache(
+            "flows",
+            max_entries=settings.flow_cache_size,
+            ttl_seconds=settings.flow_cache_ttl_seconds,
+            version_source=self._trips_version,
+            version_check_seconds=settings.cache_version_check_seconds
+        )
+        self.last_build_ms = 0.0
+
+    async def _trips_version(self) -> int:
+        return await get_version(self.db, TRIPS_VERSION)
+
+    @property
+    def db(self):
+        """Get database instance (lazy loading)"""
+        return get_database()
+
+    def build_flow_pipeline(
+        self,
+        tenant_id: str,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None
+    ) -> List[Dict]:
+        """Group trips into (start station, end station) pairs on the tenant_id + started_at index"""
+        match = {
+            "tenant_id": tenant_id,
+            "start_station_id": {"$nin": MISSING_STATION_IDS},
+            "end_station_id": {"$nin": MISSING_STATION_IDS}
+        }
+        if start is not None or end is not None:
+            match["started_at"] = build_range_filter(start, end)
+
+        valid_duration = {"$and": [
+            {"$gte": ["$duration_seconds", MIN_TRIP_SECONDS]},
+            {"$lte": ["$duration_seconds", MAX_TRIP_SECONDS]}
+        ]}
+        return [
+            {"$match": match},
+            {"$group": {
+                "_id": {"o": "$start_station_id", "d": "$end_station_id"},
+                "n": {"$sum": 1},
+                "s": {"$sum": {"$cond": [valid_duration, "$duration_seconds", 0]}},
+                "c": {"$sum": {"$cond": [valid_duration, 1, 0]}}
+            }}
+        ]
+
+    async def _build_mongo_matrix(self, tenant_id: str, start: Optional[datetime], end: Optional[datetime]) -> FlowMatrix:
+        cursor = self.db.trips.aggregate(
+            self.build_flow_pipeline(tenant_id, start, end),
+            allowDiskUse=True,
+            batchSize=10000
+        )
+        origins, destinations, counts, sums, valid_counts = [], [], [], [], []
+        async for pair in cursor:
+            origins.append(pair["_id"]["o"])
+            destinations.append(pair["_id"]["d"])
+            counts.append(pair["n"])
+            sums.append(pair["s"])
+            valid_counts.append(pair["c"])
+        return FlowMatrix.from_pairs(origins, destinations, counts, sums, valid_counts)
+
+    async def _build_parquet_matrix(self, tenant_id: str, start: Optional[datetime], end: Optional[datetime]) -> FlowMatrix:
+        trips = await self.parquet_store.read_od_columns(tenant_id, start, end)
+        if trips is None:
+            return FlowMatrix.from_pairs([], [], [], [], [])
+        trips = trips[
+            ~trips["start_station_id"].isin(MISSING_STATION_IDS)
+            & ~trips["end_station_id"].isin(MISSING_STATION_IDS)
+        ]
+        return FlowMatrix.from_trips(
+            trips["start_station_id"].to_numpy(dtype=object),
+            trips["end_station_id"].to_numpy(dtype=object),
+            trips["duration_seconds"].to_numpy(dtype=np.float64, na_value=np.nan)
+        )
+
+    async def get_flow_matrix(
+        self,
+        tenant_id: str,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None
+    ) -> FlowMatrix:
+        """Return the cached matrix for (tenant, window), building it on a miss, after the TTL or a new ingest"""
+        return await self.cache.get_or_compute(
+            (self.backend, tenant_id, start, end),
+            lambda: self.build_flow_matrix(tenant_id, start, end)
+        )
+
+    async def build_flow_matrix(
+        self,
+        tenant_id: str,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None
+    ) -> FlowMatrix:
+        started = time.perf_counter()
+        if self.backend == "parquet":
+            matrix = await self._build_parquet_matrix(tenant_id, start, end)
+        else:
+            matrix = await self._build_mongo_matrix(tenant_id, start, end)
+        self.last_build_ms = round((time.perf_counter() - started) * 1000, 1)
+        logger.info(
+            f"🔀 Flow matrix for {tenant_id}: {matrix.total_trips} trips, "
+            f"{len(matrix.trip_counts)} pairs in {self.last_build_ms}ms"
+        )
+        return matrix
+
+    def clear_cache(self):
+        self.cache.invalidate()
+
+    async def get_flow_summary(
+        self,
+        tenant_id: str,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        top_k: int = 20,
+        station_limit: Optional[int] = None,
+        include_self_loops: bool = True
+    ) -> FlowSummary:
+        """Top-K flows and per-station net inflow/outflow for a tenant window"""
+        start = to_naive_utc(start)
+        end = to_naive_utc(end)
+        matrix = await self.get_flow_matrix(tenant_id, start, end)
+        top_flows = matrix.top_flows(top_k, include_self_loops)
+        stations = matrix.station_balance(station_limit)
+
+        # One metadata lookup for every station in the response
+        station_ids = {station.station_id for station in stations}
+        for flow in top_flows:
+            station_ids.add(flow.start_station_id)
+            station_ids.add(flow.end_station_id)
+        names = await station_metadata.get_names(self.db, station_ids)
+        for flow in top_flows:
+            flow.start_station_name = names.get(flow.start_station_id)
+            flow.end_station_name = names.get(flow.end_station_id)
+        for station in stations:
+            station.name = names.get(station.station_id)
+
+        return FlowSummary(
+            tenant_id=tenant_id,
+            start=start,
+            end=end,
+            total_trips=matrix.total_trips,
+            station_count=len(matrix.station_ids),
+            pair_count=len(matrix.trip_counts),
+            top_flows=top_flows,
+            stations=stations
+        )
+
+flow_service = FlowService()
@@ -1,18 +1,67 @@
 import asyncio
 import logging
+import time
 from datetime import datetime
-from typing import Dict, List
+from typing import Dict, List, Optional, Set
 import httpx
+from pymongo import UpdateOne
 
+from app.core.config import settings
+from app.core.metrics import gbfs_cycles, gbfs_cycle_overrun, gbfs_phase_duration
+from app.core.serialization import decode_json
+from app.core.tenants import assign_tenant, classify_tenants
 from app.database.connection import get_database
+from app.services.station_cache import station_cache
+from app.services.station_metadata import station_metadata
+from app.services.station_stream import station_stream
+from app.services.station_locator import station_locator, geo_point
+from app.services.coordination import Lease, GBFS_POLLER_LEASE, STATIONS_VERSION, bump_version, get_version
+from app.services.alert_service import alert_engine
+from app.services.status_history_service import status_history_service
 
 logger = logging.getLogger(__name__)
 
+class FeedState:
+    """Conditional-request state and last payload for one GBFS feed"""
+
+    def __init__(self):
+        self.payload: Dict = {}
+        self.etag: Optional[str] = None
+        self.last_modified: Optional[str] = None
+        self.expires_at: float = 0.0  # epoch seconds: GBFS last_updated + ttl
+        self.changed = False
+        self.last_latency_ms = 0.0
+        self.last_bytes = 0
+        self.total_bytes = 0
+        self.fetches = 0
+        self.not_modified = 0
+        self.ttl_skips = 0
+
+    def stats(self) -> Dict:
+        return {
+            "changed": self.changed,
+            "latency_ms": self.last_latency_ms,
+            "bytes": self.last_bytes,
+            "total_bytes": self.total_bytes,
+            "fetches": self.fetches,
+            "not_modified": self.not_modified,
+            "ttl_skips": self.ttl_skips
+        }
+
 class GBFSService:
     def __init__(self):
-        self.info_url = "https://gbfs.citibikenyc.com/gbfs/en/station_information.json"
-        self.status_url = "https://gbfs.citibikenyc.com/gbfs/en/station_status.json"
+        self.info_url = settings.gbfs_info_url
+        self.status_url = settings.gbfs_status_url
+        self._client: Optional[httpx.AsyncClient] = None
+        self._feeds: Dict[str, FeedState] = {}
         self._running = False
+        self._last_cycle_ok = False
+        self._last_station_docs: Dict[str, Dict] = {}
+        self._station_keys: Dict[str, tuple] = {}
+        self._synced_version = -1
+        self._was_leader = False
+        self.lease = Lease(GBFS_POLLER_LEASE)
+        self.last_cycle_timings: Dict[str, float] = {}
 
     @property
     def db(self):
@@ -20,23 +69,82 @@ class GBFSService:
         return get_database()
 
     def assign_tenant_id(self, lat: float, lon: float) -> str:
+        """Assign tenant based on coordinates (shared with trip ingest)"""
+        return assign_tenant(lat, lon)
+
+    async def start(self):
+        """Open the shared, pooled HTTP client used for every GBFS fetch"""
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                timeout=30.0,
+                limits=httpx.Limits(max_connections=10, max_keepalive_connections=4),
+                headers={"Accept-Encoding": "gzip"}
+            )
+
+    @property
+    def is_leader(self) -> bool:
+        """Whether this worker currently holds the GBFS poller lease"""
+        return self.lease.is_held
+
+    async def close(self):
+        """Release the poller lease and close the shared HTTP client"""
+        if self.db is not None:
+            await self.lease.stop(self.db)
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def feed_stats(self) -> Dict[str, Dict]:
+        return {url: feed.stats() for url, feed in self._feeds.items()}
+
+    async def fetch_gbfs_data(self, url: str) -> Dict:
         """
-        Assign tenant based on coordinates
-        Manhattan: Everything north of ~40.769 latitude
-        Brooklyn: Everything south and east (simplified)
+        Fetch data from GBFS endpoint with error handling. Feeds still within
+        their GBFS ttl are not requested, and ETag/Last-Modified make the server
+        answer 304 for unchanged feeds; both return the cached payload with
+        the feed marked unchanged.
         """
-        if lat >= 40.769:
-            return "manhattan"
-        else:
-            return "brooklyn"
+        feed = self._feeds.setdefault(url, FeedState())
+        feed.changed = False
+
+        if feed.payload and time.time() < feed.expires_at:
+            feed.ttl_skips += 1
+            return feed.payload
+
+        if self._client is None:
+            await self.start()
+
+        headers = {}
+        if feed.payload:
+            if feed.etag:
+                headers["If-None-Match"] = feed.etag
+            if feed.last_modified:
+                headers["If-Modified-Since"] = feed.last_modified
 
-    async def fetch_gbfs_data(self, url: str) -> Dict:
-        """Fetch data from GBFS endpoint with error handling"""
         try:
-            async with httpx.AsyncClient(timeout=30.0) as client:
-                response = await client.get(url)
-                response.raise_for_status()
-                return response.json()
+            started = time.perf_counter()
+            response = await self._client.get(url, headers=headers)
+            feed.last_latency_ms = round((time.perf_counter() - started) * 1000, 1)
+            feed.last_bytes = response.num_bytes_downloaded
+            feed.total_bytes += feed.last_bytes
+            feed.fetches += 1
+
+            if response.status_code == 304:
+                feed.not_modified += 1
+                return feed.payload
+
+            response.raise_for_status()
+            payload = decode_json(response.content)
+
+            if feed.payload and payload.get("last_updated") == feed.payload.get("last_updated"):
+                return feed.payload
+
+            feed.payload = payload
+            feed.changed = True
+            feed.etag = response.headers.get("ETag")
+            feed.last_modified = response.headers.get("Last-Modified")
+            feed.expires_at = float(payload.get("last_updated", 0)) + float(payload.get("ttl", 0))
+            return payload
         except httpx.TimeoutException:
             logger.error(f"Timeout fetching {url}")
             return {}
@@ -47,6 +155,61 @@ class GBFSService:
             logger.error(f"Unexpected error fetching {url}: {e}")
             return {}
 
+    def diff_stations(self, stations_info: List[Dict], stations_status: List[Dict]):
+        """
+        Compare the feeds against the previous cycle's snapshot. A station is
+        changed when its status key (last_reported and counts/flags) or its
+        information key (name, coordinates, capacity) differs.
+        Returns the changed (info, status) pairs and the new key snapshot.
+        """
+        status_lookup = {
+            station["station_id"]: station 
+            for station in stations_status
+        }
+        
+        changed = []
+        station_keys = {}
+        for station_info in stations_info:
+            station_id = station_info["station_id"]
+            status_info = status_lookup.get(station_id)
+            if status_info is None:
+                continue
+            
+            key = (
+                status_info["last_reported"],
+                status_info["num_bikes_available"],
+                status_info["num_docks_available"],
+                status_info.get("is_installed", True),
+                status_info.get("is_renting", True),
+                station_info["name"],
+                station_info["lat"],
+                station_info["lon"],
+                station_info["capacity"]
+            )
+            station_keys[station_id] = key
+            if self._station_keys.get(station_id) != key:
+                changed.append((station_info, status_info))
+        
+        return changed, station_keys
+
+    def build_station_doc(self, station_info: Dict, status_info: Dict, tenant_id: str) -> Dict:
+        return {
+            "station_id": station_info["station_id"],
+            "tenant_id": tenant_id,
+            "name": station_info["name"],
+            "lat": station_info["lat"],
+            "lon": station_info["lon"],
+            "capacity": station_info["capacity"],
+            "location": geo_point(station_info["lat"], station_info["lon"]),
+            "current_status": {
+                "bikes_available": status_info["num_bikes_available"],
+                "docks_available": status_info["num_docks_available"],
+                "last_updated": datetime.fromtimestamp(status_info["last_reported"]),
+                "is_installed": status_info.get("is_installed", True),
+                "is_renting": status_info.get("is_renting", True)
+            }
+        }
+
     async def update_stations_data(self) -> bool:
         """Fetch and update station data from GBFS"""
         logger.info("Updating station data from GBFS...")
@@ -56,125 +219,261 @@ class GBFSService:
                 logger.error("Database not available")
                 return False
             
+            cycle_start = time.perf_counter()
+            
             info_data, status_data = await asyncio.gather(
                 self.fetch_gbfs_data(self.info_url),
                 self.fetch_gbfs_data(self.status_url)
             )
+            fetch_done = time.perf_counter()
             
             if not info_data or not status_data:
                 logger.error("Failed to fetch GBFS data")
+                gbfs_cycles.labels("fetch_failed").inc()
                 return False
             
+            info_feed = self._feeds[self.info_url]
+            status_feed = self._feeds[self.status_url]
+            if not info_feed.changed and not status_feed.changed and self._last_cycle_ok:
+                logger.info(
+                    f"GBFS feeds unchanged, skipping cycle "
+                    f"(fetch={round((fetch_done - cycle_start) * 1000, 1)}ms)"
+                )
+                gbfs_phase_duration.labels("fetch").observe(fetch_done - cycle_start)
+                gbfs_cycles.labels("unchanged").inc()
+                return True
+            self._last_cycle_ok = False
+            
             stations_info = info_data.get("data", {}).get("stations", [])
             stations_status = status_data.get("data", {}).get("stations", [])
             
-            status_lookup = {
-                station["station_id"]: station 
-                for station in stations_status
-            }
+            cpu_start = time.process_time()
+            changed, station_keys = self.diff_stations(stations_info, stations_status)
+            removed_ids = set(self._last_station_docs) - set(station_keys)
+            diff_cpu = time.process_time() - cpu_start
+            
+            tenant_ids = classify_tenants(
+                [station_info["lat"] for station_info, _ in changed],
+                [station_info["lon"] for station_info, _ in changed]
+            )
+            changed_docs = [
+                self.build_station_doc(station_info, status_info, tenant_id)
+                for (station_info, status_info), tenant_id in zip(changed, tenant_ids)
+            ]
+            transform_done = time.perf_counter()
+            transform_cpu = time.process_time() - cpu_start - diff_cpu
             
-            updated_count = 0
-            new_alerts = []
-            
-            for station_info in stations_info:
-                station_id = station_info["station_id"]
-                
-                if station_id not in status_lookup:
-                    continue
-                
-                status_info = status_lookup[station_id]
-                
-                station_doc = {
-                    "station_id": station_id,
-                    "tenant_id": self.assign_tenant_id(
-                        station_info["lat"], 
-                        station_info["lon"]
-                    ),
-                    "name": station_info["name"],
-                    "lat": station_info["lat"],
-                    "lon": station_info["lon"],
-                    "capacity": station_info["capacity"],
-                    "current_status": {
-                        "bikes_available": status_info["num_bikes_available"],
-                        "docks_available": status_info["num_docks_available"],
-                        "last_updated": datetime.fromtimestamp(status_info["last_reported"]),
-                        "is_installed": status_info.get("is_installed", True),
-                        "is_renting": status_info.get("is_renting", True)
-                    }
-                }
-                
-                await self.db.stations.update_one(
-                    {"station_id": station_id},
-                    {"$set": station_doc},
-                    upsert=True
+            station_docs = dict(self._last_station_docs)
+            changed_tenants = set()
+            removed_by_tenant: Dict[str, List[str]] = {}
+            for station_id in removed_ids:
+                tenant_id = station_docs.pop(station_id)["tenant_id"]
+                changed_tenants.add(tenant_id)
+                removed_by_tenant.setdefault(tenant_id, []).append(station_id)
+            for station_doc in changed_docs:
+                previous = station_docs.get(station_doc["station_id"])
+                if previous is not None:
+                    changed_tenants.add(previous["tenant_id"])
+                    if previous["tenant_id"] != station_doc["tenant_id"]:
+                        removed_by_tenant.setdefault(previous["tenant_id"], []).append(station_doc["station_id"])
+                changed_tenants.add(station_doc["tenant_id"])
+                station_docs[station_doc["station_id"]] = station_doc
+            
+            if changed_docs:
+                await self.db.stations.bulk_write([
+                    UpdateOne(
+                        {"station_id": station_doc["station_id"]},
+                        {"$set": station_doc, "$unset": {"removed_at": ""}},
+                        upsert=True
+                    )
+                    for station_doc in changed_docs
+                ], ordered=False)
+            if removed_ids:
+                # Kept for trip/analytics name lookups, but hidden from other workers' snapshots
+                await self.db.stations.update_many(
+                    {"station_id": {"$in": list(removed_ids)}},
+                    {"$set": {"removed_at": datetime.utcnow()}}
                 )
-                updated_count += 1
-                
-                alerts = await self.check_station_alerts(station_doc)
-                new_alerts.extend(alerts)
             
-            logger.info(f"Updated {updated_count} stations")
+            try:
+                await status_history_service.record_cycle(
+                    self.db, changed_docs, all_station_docs=station_docs.values()
+                )
+            except Exception as e:
+                logger.warning(f"Failed to record status history: {e}")
+            
+            await alert_engine.apply(self.db, changed_docs, removed_ids)
             
-            if new_alerts:
-                await self.db.alerts.insert_many(new_alerts)
-                logger.info(f"🚨 Created {len(new_alerts)} new alerts")
+            # Commit the snapshot only once everything downstream succeeded
+            self._last_station_docs = station_docs
+            self._station_keys = station_keys
+            self._refresh_local_state(station_docs, changed_docs, changed_tenants, removed_by_tenant)
+            
+            if changed_docs or removed_ids:
+                try:
+                    self._synced_version = await bump_version(self.db, STATIONS_VERSION)
+                except Exception as e:
+                    logger.warning(f"Failed to bump stations version: {e}")
+            write_done = time.perf_counter()
+            
+            unchanged = len(station_keys) - len(changed_docs)
+            per_station_cpu = transform_cpu / len(changed_docs) if changed_docs else 0.0
+            
+            self.last_cycle_timings = {
+                "fetch_ms": round((fetch_done - cycle_start) * 1000, 1),
+                "transform_ms": round((transform_done - fetch_done) * 1000, 1),
+                "write_ms": round((write_done - transform_done) * 1000, 1),
+                "total_ms": round((write_done - cycle_start) * 1000, 1),
+                "stations": len(station_keys),
+                "written": len(changed_docs),
+                "changed": len(changed_docs),
+                "unchanged": unchanged,
+                "removed": len(removed_ids),
+                "changed_ratio": round(len(changed_docs) / len(station_keys), 3) if station_keys else 0.0,
+                "diff_cpu_ms": round(diff_cpu * 1000, 2),
+                "transform_cpu_ms": round(transform_cpu * 1000, 2),
+                "cpu_saved_ms_est": round(per_station_cpu * unchanged * 1000, 2),
+                "info_bytes": info_feed.last_bytes,
+                "status_bytes": status_feed.last_bytes,
+                "info_fetch_ms": info_feed.last_latency_ms,
+                "status_fetch_ms": status_feed.last_latency_ms
+            }
+            gbfs_phase_duration.labels("fetch").observe(fetch_done - cycle_start)
+            gbfs_phase_duration.labels("transform").observe(transform_done - fetch_done)
+            gbfs_phase_duration.labels("write").observe(write_done - transform_done)
+            gbfs_phase_duration.labels("total").observe(write_done - cycle_start)
+            gbfs_cycles.labels("updated").inc()
+            logger.info(
+                f"Updated {len(changed_docs)} stations "
+                f"({unchanged} unchanged, {len(removed_ids)} removed)"
+            )
+            logger.info(
+                f"⏱️ GBFS cycle: fetch={self.last_cycle_timings['fetch_ms']}ms "
+                f"transform={self.last_cycle_timings['transform_ms']}ms "
+                f"write={self.last_cycle_timings['write_ms']}ms "
+                f"total={self.last_cycle_timings['total_ms']}ms "
+                f"changed={self.last_cycle_timings['changed_ratio']:.1%}"
+            )
             
+            self._last_cycle_ok = True
             return True
             
         except Exception as e:
             logger.error(f"Error updating stations: {e}")
+            gbfs_cycles.labels("error").inc()
             return False
 
-    async def check_station_alerts(self, station_doc: Dict) -> List[Dict]:
-        """Check station for alert conditions"""
-        alerts = []
-        status = station_doc["current_status"]
-        base_alert = {
-            "tenant_id": station_doc["tenant_id"],
-            "station_id": station_doc["station_id"],
-            "station_name": station_doc["name"],
-            "timestamp": datetime.utcnow(),
-            "resolved": False
-        }
-        
-        if status["bikes_available"] <= 3:
-            alerts.append({
-                **base_alert,
-                "type": "low_bikes",
-                "severity": "warning" if status["bikes_available"] > 0 else "critical"
-            })
-        
-        if status["docks_available"] <= 3:
-            alerts.append({
-                **base_alert,
-                "type": "full_station",
-                "severity": "warning" if status["docks_available"] > 0 else "critical"
-            })
-        
-        if not status["is_installed"] or not status["is_renting"]:
-            alerts.append({
-                **base_alert,
-                "type": "offline",
-                "severity": "critical"
-            })
-        
-        return alerts
+    def _refresh_local_state(
+        self,
+        station_docs: Dict[str, Dict],
+        changed_docs: List[Dict],
+        changed_tenants: Set[str],
+        removed_by_tenant: Dict[str, List[str]]
+    ):
+        """Bring this worker's snapshot cache, spatial index and stream subscribers up to date"""
+        if not station_cache.is_ready:
+            station_cache.update(station_docs.values())
+        elif changed_tenants:
+            station_cache.update(station_docs.values(), tenant_ids=changed_tenants)
+        if changed_docs or removed_by_tenant or not station_locator.is_ready:
+            station_locator.rebuild(station_docs.values())
+        station_metadata.update(changed_docs if station_metadata.is_ready else station_docs.values())
+        station_stream.publish_cycle(changed_docs, removed_by_tenant)
+
+    async def sync_from_database(self) -> bool:
+        """
+        Follower path: when the poller has bumped the stations version, reload
+        station documents and apply the difference to local state.
+        Returns True if anything was reloaded.
+        """
+        try:
+            if self.db is None:
+                return False
+            
+            version = await get_version(self.db, STATIONS_VERSION)
+            if version == self._synced_version and station_cache.is_ready:
+                return False
+            
+            cursor = self.db.stations.find({"removed_at": {"$exists": False}}, {"_id": 0})
+            station_docs = {station["station_id"]: station async for station in cursor}
+            
+            changed_docs = [
+                station for station_id, station in station_docs.items()
+                if self._last_station_docs.get(station_id) != station
+            ]
+            removed_by_tenant: Dict[str, List[str]] = {}
+            for station_id, previous in self._last_station_docs.items():
+                current = station_docs.get(station_id)
+                if current is None or current["tenant_id"] != previous["tenant_id"]:
+                    removed_by_tenant.setdefault(previous["tenant_id"], []).append(station_id)
+            changed_tenants = {station["tenant_id"] for station in changed_docs} | set(removed_by_tenant)
+            
+            self._last_station_docs = station_docs
+            self._synced_version = version
+            self._refresh_local_state(station_docs, changed_docs, changed_tenants, removed_by_tenant)
+            
+            logger.info(f"🔄 Synced stations version {version}: {len(changed_docs)} changed")
+            return True
+            
+        except Exception as e:
+            logger.error(f"Error syncing stations from database: {e}")
+            return False
+
+    def _take_over_polling(self):
+        """
+        Another worker may have written since this one last polled, so drop
+        per-process write-avoidance state and let the first cycle write everything
+        """
+        self._station_keys = {}
+        self._last_cycle_ok = False
+        alert_engine.invalidate()
+        status_history_service.reset()
+
+    async def initial_sync(self):
+        """Startup: poll GBFS if this worker wins the lease, otherwise load what the poller wrote"""
+        if await self.lease.acquire(self.db):
+            self._was_leader = True
+            logger.info("📡 Performing initial GBFS data fetch...")
+            await self.update_stations_data()
+        else:
+            logger.info("📥 Another worker polls GBFS; loading stations from the database...")
+            await self.sync_from_database()
 
     async def start_background_updates(self):
-        """Start background task for regular updates"""
+        """
+        Start background task for regular updates. Only the worker holding the
+        poller lease fetches GBFS; the others follow the stations version.
+        """
         self._running = True
-        logger.info("Starting background GBFS updates (every 60 seconds)")
+        self.lease.start(self.db)
+        logger.info(f"Starting background GBFS updates (every {settings.update_interval} seconds, worker {self.lease.owner})")
         
         while self._running:
             try:
-                await self.update_stations_data()
-                await asyncio.sleep(60)  # Wait 60 seconds
+                if self.is_leader:
+                    if not self._was_leader:
+                        self._take_over_polling()
+                    self._was_leader = True
+                    cycle_started = time.perf_counter()
+                    await self.update_stations_data()
+                    overrun = time.perf_counter() - cycle_started - settings.update_interval
+                    gbfs_cycle_overrun.observe(max(overrun, 0.0))
+                    if overrun > 0:
+                        logger.warning(
+                            f"GBFS cycle overran the {settings.update_interval} second poll interval "
+                            f"by {overrun * 1000:.0f}ms"
+                        )
+                    await asyncio.sleep(settings.update_interval)
+                else:
+                    self._was_leader = False
+                    await self.sync_from_database()
+                    await asyncio.sleep(settings.follower_sync_seconds)
             except asyncio.CancelledError:
                 logger.info("Background updates cancelled")
                 break
             except Exception as e:
                 logger.error(f"Background update error: {e}")
-                await asyncio.sleep(60)
+                await asyncio.sleep(settings.follower_sync_seconds)
 
     def stop_background_updates(self):
         """Stop background updates"""
@@ -0,0 +1,169 @@
+import logging
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from pymongo import UpdateOne
+
+from app.models.schemas import IncidentStats, StationIncidentStats
+from app.services.status_history_service import day_start
+
+logger = logging.getLogger(__name__)
+
+INCIDENT_STATS_COLLECTION = "alert_incident_stats"
+
+ALERT_TYPES = ("low_bikes", "full_station", "offline")
+SEVERITIES = ("warning", "critical")
+
+def split_by_day(start: datetime, end: datetime) -> List[Tuple[datetime, float]]:
+    """Seconds of [start, end) falling on each UTC day, as (midnight, seconds)"""
+    parts = []
+    while start < end:
+        date = day_start(start)
+        part_end = min(end, date + timedelta(days=1))
+        parts.append((date, (part_end - start).total_seconds()))
+        start = part_end
+    return parts
+
+class IncidentStatsService:
+    """
+    Per-station daily incident counters, maintained incrementally from alert
+    transitions so historical questions never scan the alerts collection.
+
+    Document: {station_id, date, tenant_id, station_name,
+               incidents: {type: n}, seconds: {type: {severity: s}}}
+
+    An alert's time is credited when it changes severity or resolves, split
+    across the UTC days it covered, starting from its updated_at (the time
+    of its previous transition). Time of still-open alerts is added at query
+    time, so totals are exact up to now.
+    """
+
+    def __init__(self):
+        self._pending: Dict[Tuple[str, datetime], Dict] = {}
+
+    def _entry(self, alert: Dict, date: datetime) -> Dict:
+        key = (alert["station_id"], date)
+        entry = self._pending.get(key)
+        if entry is None:
+            entry = self._pending[key] = {
+                "tenant_id": alert["tenant_id"],
+                "station_name": alert["station_name"],
+                "inc": {}
+            }
+        return entry
+
+    def record_opened(self, alert: Dict):
+        inc = self._entry(alert, day_start(alert["timestamp"]))["inc"]
+        path = f"incidents.{alert['type']}"
+        inc[path] = inc.get(path, 0) + 1
+
+    def record_elapsed(self, alert: Dict, until: datetime):
+        """Credit the alert's time since its last transition at its current severity"""
+        since = alert.get("updated_at") or alert["timestamp"]
+        path = f"seconds.{alert['type']}.{alert['severity']}"
+        for date, seconds in split_by_day(since, until):
+            inc = self._entry(alert, date)["inc"]
+            inc[path] = inc.get(path, 0) + seconds
+
+    def take_operations(self) -> List[UpdateOne]:
+        """$inc upserts for everything recorded since the last call"""
+        operations = [
+            UpdateOne(
+                {"station_id": station_id, "date": date},
+                {
+                    "$set": {"tenant_id": entry["tenant_id"], "station_name": entry["station_name"]},
+                    "$inc": entry["inc"]
+                },
+                upsert=True
+            )
+            for (station_id, date), entry in self._pending.items()
+        ]
+        self._pending = {}
+        return operations
+
+    def discard_pending(self):
+        self._pending = {}
+
+    async def get_stats(
+        self,
+        db,
+        tenant_id: str,
+        start: datetime,
+        end: datetime,
+        limit: int = 20,
+        sort_by: str = "critical_minutes",
+        alert_type: Optional[str] = None,
+        now: Optional[datetime] = None
+    ) -> IncidentStats:
+        """
+        Top offending stations over [start, end), rounded out to whole UTC
+        days. Reads one small document per station-day with incidents plus
+        the tenant's open alerts, never the alert history.
+        """
+        now = now or datetime.utcnow()
+        start = day_start(start)
+        end = day_start(end) + timedelta(days=1) if end != day_start(end) else end
+        types = (alert_type,) if alert_type else ALERT_TYPES
+
+        group = {"_id": "$station_id", "station_name": {"$last": "$station_name"}}
+        for type_name in types:
+            group[f"{type_name}_incidents"] = {"$sum": f"$incidents.{type_name}"}
+            for severity in SEVERITIES:
+                group[f"{type_name}_{severity}"] = {"$sum": f"$seconds.{type_name}.{severity}"}
+
+        totals: Dict[str, Dict] = {}
+        cursor = db[INCIDENT_STATS_COLLECTION].aggregate([
+            {"$match": {"tenant_id": tenant_id, "date": {"$gte": start, "$lt": end}}},
+            {"$group": group}
+        ])
+        async for row in cursor:
+            totals[row["_id"]] = row
+
+        # Time open alerts have accumulated since their last transition
+        open_alerts = db.alerts.find(
+            {"tenant_id": tenant_id, "resolved": False, "type": {"$in": list(types)}},
+            {"station_id": 1, "station_name": 1, "type": 1, "severity": 1, "timestamp": 1, "updated_at": 1}
+        )
+        async for alert in open_alerts:
+            since = max(alert.get("updated_at") or alert["timestamp"], start)
+            until = min(now, end)
+            if since >= until:
+                continue
+            row = totals.setdefault(alert["station_id"], {"station_name": alert["station_name"]})
+            key = f"{alert['type']}_{alert['severity']}"
+            row[key] = row.get(key, 0) + (until - since).total_seconds()
+
+        days = max(1, (min(end, day_start(now) + timedelta(days=1)) - start).days)
+        stations = []
+        for station_id, row in totals.items():
+            incidents_by_type = {type_name: row.get(f"{type_name}_incidents", 0) for type_name in types}
+            minutes_by_type = {
+                type_name: round(sum(row.get(f"{type_name}_{severity}", 0) for severity in SEVERITIES) / 60, 1)
+                for type_name in types
+            }
+            critical_minutes = round(sum(row.get(f"{type_name}_critical", 0) for type_name in types) / 60, 1)
+            stations.append(StationIncidentStats(
+                station_id=station_id,
+                name=row.get("station_name"),
+                incidents=sum(incidents_by_type.values()),
+                incidents_by_type=incidents_by_type,
+                critical_minutes=critical_minutes,
+                critical_minutes_per_day=round(critical_minutes / days, 1),
+                minutes_by_type=minutes_by_type
+            ))
+
+        if sort_by == "incidents":
+            stations.sort(key=lambda station: (station.incidents, station.critical_minutes), reverse=True)
+        else:
+            stations.sort(key=lambda station: (station.critical_minutes, station.incidents), reverse=True)
+
+        return IncidentStats(
+            tenant_id=tenant_id,
+            start=start,
+            end=end,
+            days=days,
+            station_count=len(stations),
+            stations=stations[:limit]
+        )
+
+incident_stats_service = IncidentStatsService()
@@ -0,0 +1,196 @@
+import asyncio
+import glob
+import logging
+import os
+from datetime import datetime
+from typing import Dict, Optional, Tuple
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.dataset as ds
+    import pyarrow.parquet as pq
+    from pyarrow import fs as pafs
+except ImportError:  # optional dependency, only needed for ANALYTICS_BACKEND=parquet
+    pa = None
+
+from app.services.trip_rollups import MIN_TRIP_SECONDS, MAX_TRIP_SECONDS
+
+logger = logging.getLogger(__name__)
+
+PARQUET_COLUMNS = ["started_at", "ended_at", "start_station_id", "end_station_id", "duration_seconds"]
+
+def _require_pyarrow():
+    if pa is None:
+        raise RuntimeError("pyarrow is required for the Parquet trip store (pip install pyarrow)")
+
+def _trip_schema():
+    return pa.schema([
+        ("started_at", pa.timestamp("us")),
+        ("ended_at", pa.timestamp("us")),
+        ("start_station_id", pa.string()),
+        ("end_station_id", pa.string()),
+        ("duration_seconds", pa.int64()),
+    ])
+
+class TripParquetWriter:
+    """
+    Writes one source CSV into tenant/month Hive partitions:
+    {root}/tenant_id=<tenant>/month=<YYYY-MM>/<source stem>.parquet
+    Each chunk is appended as row groups; reloading a file rewrites its partitions.
+    """
+
+    def __init__(self, root: str, source_file: str):
+        _require_pyarrow()
+        self.root = root
+        self.stem = os.path.splitext(os.path.basename(source_file))[0]
+        self._schema = _trip_schema()
+        self._writers: Dict[Tuple[str, str], "pq.ParquetWriter"] = {}
+
+        for path in glob.glob(os.path.join(root, "tenant_id=*", "month=*", f"{self.stem}.parquet")):
+            os.remove(path)
+
+    def write(self, df):
+        """Append a cleaned, tenant-assigned trips chunk"""
+        if df.empty:
+            return
+
+        started_at = df["started_at"]
+        months = started_at.dt.year * 100 + started_at.dt.month
+        for (tenant_id, month), group in df.groupby([df["tenant_id"], months], sort=False):
+            key = (tenant_id, f"{month // 100:04d}-{month % 100:02d}")
+            writer = self._writers.get(key)
+            if writer is None:
+                directory = os.path.join(self.root, f"tenant_id={key[0]}", f"month={key[1]}")
+                os.makedirs(directory, exist_ok=True)
+                writer = pq.ParquetWriter(
+                    os.path.join(directory, f"{self.stem}.parquet"),
+                    self._schema,
+                    compression="zstd"
+                )
+                self._writers[key] = writer
+
+            table = pa.Table.from_pandas(group[PARQUET_COLUMNS], schema=self._schema, preserve_index=False)
+            writer.write_table(table)
+
+    def close(self):
+        for writer in self._writers.values():
+            writer.close()
+        self._writers = {}
+
+class ParquetTripStore:
+    """Analytics over tenant/month-partitioned Parquet trips using memory-mapped Arrow scans"""
+
+    def __init__(self, root: str):
+        self.root = root
+
+    def _dataset(self):
+        _require_pyarrow()
+        return ds.dataset(
+            self.root,
+            format="parquet",
+            partitioning="hive",
+            filesystem=pafs.LocalFileSystem(use_mmap=True)
+        )
+
+    def _build_filter(
+        self,
+        tenant_id: str,
+        start: Optional[datetime],
+        end: Optional[datetime],
+        station_id: Optional[str]
+    ):
+        """Partition filters prune tenant/month directories; the rest use row-group statistics"""
+        expression = ds.field("tenant_id") == tenant_id
+        if start is not None:
+            expression &= ds.field("month") >= start.strftime("%Y-%m")
+            expression &= ds.field("started_at") >= pa.scalar(start, type=pa.timestamp("us"))
+        if end is not None:
+            expression &= ds.field("month") <= end.strftime("%Y-%m")
+            expression &= ds.field("started_at") < pa.scalar(end, type=pa.timestamp("us"))
+        if station_id:
+            expression &= ds.field("start_station_id") == station_id
+        return expression
+
+    def _compute_facets(
+        self,
+        tenant_id: str,
+        top_limit: int,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        station_id: Optional[str] = None
+    ) -> Dict:
+        if not os.path.isdir(self.root):
+            return {}
+
+        # Only the three columns the metrics need are read, and only the matching partitions
+        table = self._dataset().to_table(
+            columns=["start_station_id", "started_at", "duration_seconds"],
+            filter=self._build_filter(tenant_id, start, end, station_id)
+        )
+        total = table.num_rows
+        if not total:
+            return {}
+
+        station_ids = pc.drop_null(table["start_station_id"])
+        station_counts = pc.value_counts(station_ids).to_pylist()
+        station_counts.sort(key=lambda item: (-item["counts"], item["values"]))
+        top_stations = [
+            {"_id": item["values"], "trip_count": item["counts"]}
+            for item in station_counts
+            if item["values"]
+        ][:top_limit]
+
+        durations = table["duration_seconds"]
+        valid = pc.and_(
+            pc.greater_equal(durations, MIN_TRIP_SECONDS),
+            pc.less_equal(durations, MAX_TRIP_SECONDS)
+        )
+        avg_seconds = pc.mean(pc.filter(durations, valid)).as_py()
+
+        hour_counts = pc.value_counts(pc.hour(pc.drop_null(table["started_at"]))).to_pylist()
+        hour_counts.sort(key=lambda item: (-item["counts"], item["values"]))
+        peak_hour = [{"_id": hour_counts[0]["values"]}] if hour_counts else []
+
+        return {
+            "top_stations": top_stations,
+            "avg_duration": [{"avg_seconds": avg_seconds}] if avg_seconds is not None else [],
+            "peak_hour": peak_hour,
+            "total": [{"count": total}]
+        }
+
+    async def compute_facets(
+        self,
+        tenant_id: str,
+        top_limit: int,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        station_id: Optional[str] = None
+    ) -> Dict:
+        """Compute analytics in the same shape as the MongoDB $facet output, off the event loop"""
+        return await asyncio.to_thread(
+            self._compute_facets, tenant_id, top_limit, start, end, station_id
+        )
+
+    def _read_od_columns(
+        self,
+        tenant_id: str,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None
+    ):
+        if not os.path.isdir(self.root):
+            return None
+        table = self._dataset().to_table(
+            columns=["start_station_id", "end_station_id", "duration_seconds"],
+            filter=self._build_filter(tenant_id, start, end, None)
+        )
+        return table.to_pandas()
+
+    async def read_od_columns(
+        self,
+        tenant_id: str,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None
+    ):
+        """Origin, destination and duration columns for a tenant window as a DataFrame (None without data)"""
+        return await asyncio.to_thread(self._read_od_columns, tenant_id, start, end)
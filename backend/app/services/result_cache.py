@@ -0,0 +1,151 @@
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Every ResultCache registers here so stats can be reported in one place
+caches: Dict[str, "ResultCache"] = {}
+
+class ResultCache:
+    """
+    Keyed async result cache with LRU eviction and a TTL. Entries are also
+    dropped when the version returned by version_source changes (checked at
+    most every version_check_seconds), and concurrent misses for the same key
+    share one computation (single-flight). Failed computations are not cached.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        max_entries: int,
+        ttl_seconds: float,
+        version_source: Optional[Callable[[], Awaitable[Any]]] = None,
+        version_check_seconds: float = 5.0
+    ):
+        self.name = name
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.version_check_seconds = version_check_seconds
+        self._version_source = version_source
+        self._version: Any = None
+        self._version_checked_at = float("-inf")
+        self._entries: "OrderedDict[Hashable, Tuple[float, Any, Any]]" = OrderedDict()
+        self._inflight: Dict[Hashable, asyncio.Task] = {}
+        self._generation = 0  # bumped by invalidate(); results started under an older one are not stored
+
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self.errors = 0
+        self.compute_count = 0
+        self.compute_seconds = 0.0
+        self.last_compute_ms = 0.0
+
+        caches[name] = self
+
+    async def _current_version(self) -> Any:
+        if self._version_source is None:
+            return None
+
+        now = time.monotonic()
+        if now - self._version_checked_at >= self.version_check_seconds:
+            self._version_checked_at = now
+            try:
+                version = await self._version_source()
+            except Exception as e:
+                logger.warning(f"Cache {self.name}: version check failed: {e}")
+                return self._version
+            if version != self._version:
+                if self._entries or self._inflight:
+                    logger.info(f"♻️ Cache {self.name}: version {self._version} -> {version}, dropping {len(self._entries)} entries")
+                    self.invalidate()
+                self._version = version
+        return self._version
+
+    def invalidate(self):
+        """
+        Drop every entry. Computations already running still answer the
+        callers waiting on them but are not stored, and later lookups start
+        a fresh computation instead of joining a stale one.
+        """
+        self._entries.clear()
+        self._inflight.clear()
+        self._generation += 1
+        self.invalidations += 1
+
+    async def get_or_compute(self, key: Hashable, compute: Callable[[], Awaitable[Any]]) -> Any:
+        version = await self._current_version()
+
+        entry = self._entries.get(key)
+        if entry is not None:
+            stored_at, entry_version, value = entry
+            if time.monotonic() - stored_at < self.ttl_seconds and entry_version == version:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return value
+            del self._entries[key]
+
+        task = self._inflight.get(key)
+        if task is not None:
+            self.coalesced += 1
+        else:
+            self.misses += 1
+            # A separate task, so a cancelled request does not cancel the computation others wait on
+            task = asyncio.ensure_future(self._compute_and_store(key, compute, version, self._generation))
+            task.add_done_callback(lambda done: done.cancelled() or done.exception())
+            self._inflight[key] = task
+        return await asyncio.shield(task)
+
+    async def _compute_and_store(
+        self,
+        key: Hashable,
+        compute: Callable[[], Awaitable[Any]],
+        version: Any,
+        generation: int
+    ) -> Any:
+        started = time.perf_counter()
+        try:
+            value = await compute()
+        except Exception:
+            self.errors += 1
+            raise
+        finally:
+            # After an invalidation the key may already belong to a newer computation
+            if self._inflight.get(key) is asyncio.current_task():
+                del self._inflight[key]
+
+        elapsed = time.perf_counter() - started
+        self.compute_count += 1
+        self.compute_seconds += elapsed
+        self.last_compute_ms = round(elapsed * 1000, 2)
+
+        if version == self._version and generation == self._generation:
+            self._entries[key] = (time.monotonic(), version, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        return value
+
+    def stats(self) -> Dict:
+        lookups = self.hits + self.misses + self.coalesced
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+            "version": self._version,
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "hit_ratio": round((self.hits + self.coalesced) / lookups, 3) if lookups else 0.0,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+            "errors": self.errors,
+            "avg_compute_ms": round(self.compute_seconds / self.compute_count * 1000, 2) if self.compute_count else 0.0,
+            "last_compute_ms": self.last_compute_ms
+        }
@@ -0,0 +1,182 @@
+import hashlib
+import logging
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Dict, FrozenSet, Iterable, List, Optional, Sequence, Set, Tuple
+
+from app.core.serialization import station_list_adapter, encode_model
+from app.models.schemas import StationResponse
+
+logger = logging.getLogger(__name__)
+
+STATION_FIELDS = tuple(StationResponse.model_fields)
+MAX_SNAPSHOT_VIEWS = 32  # filtered/projected bodies kept per snapshot
+
+# Station document fields each response field is derived from
+STATION_FIELD_PATHS = {
+    "station_id": ["station_id"],
+    "name": ["name"],
+    "lat": ["lat"],
+    "lon": ["lon"],
+    "capacity": ["capacity"],
+    "bikes_available": ["current_status.bikes_available"],
+    "docks_available": ["current_status.docks_available"],
+    "last_updated": ["current_status.last_updated"],
+    "status_color": ["current_status.bikes_available", "current_status.docks_available"]
+}
+
+def station_status_color(bikes_available: int, docks_available: int) -> str:
+    """Map availability to the map marker color"""
+    if bikes_available <= 3 or docks_available <= 3:
+        return "red" if bikes_available == 0 or docks_available == 0 else "yellow"
+    return "green"
+
+def build_station_response(station: Dict) -> StationResponse:
+    """Build the API representation of a station document"""
+    status = station["current_status"]
+    return StationResponse(
+        station_id=station["station_id"],
+        name=station["name"],
+        lat=station["lat"],
+        lon=station["lon"],
+        capacity=station["capacity"],
+        bikes_available=status["bikes_available"],
+        docks_available=status["docks_available"],
+        last_updated=status["last_updated"],
+        status_color=station_status_color(
+            status["bikes_available"],
+            status["docks_available"]
+        )
+    )
+
+def build_station_fields(station: Dict, fields: Sequence[str]) -> Dict:
+    """Only the requested response fields of a (projected) station document"""
+    status = station.get("current_status", {})
+    row = {}
+    for name in fields:
+        if name == "status_color":
+            row[name] = station_status_color(status["bikes_available"], status["docks_available"])
+        elif name in ("bikes_available", "docks_available", "last_updated"):
+            row[name] = status[name]
+        else:
+            row[name] = station[name]
+    return row
+
+def station_projection(fields: Sequence[str]) -> Dict:
+    """MongoDB projection reading only what the requested response fields need"""
+    projection = {"_id": 0}
+    for name in fields:
+        for path in STATION_FIELD_PATHS[name]:
+            projection[path] = 1
+    return projection
+
+def station_status_query(status_colors: Iterable[str]) -> Dict:
+    """station_status_color evaluated in MongoDB"""
+    bikes = "current_status.bikes_available"
+    docks = "current_status.docks_available"
+    clauses = {
+        "red": {"$or": [{bikes: 0}, {docks: 0}]},
+        "yellow": {"$and": [
+            {bikes: {"$gt": 0}},
+            {docks: {"$gt": 0}},
+            {"$or": [{bikes: {"$lte": 3}}, {docks: {"$lte": 3}}]}
+        ]},
+        "green": {bikes: {"$gt": 3}, docks: {"$gt": 3}}
+    }
+    return {"$or": [clauses[color] for color in sorted(status_colors)]}
+
+@dataclass(frozen=True)
+class StationSnapshot:
+    """Pre-serialized station list for one tenant"""
+    body: bytes
+    etag: str
+    station_count: int
+    built_at: datetime
+    stations: Tuple[StationResponse, ...] = ()
+    views: Dict = field(default_factory=dict, compare=False, repr=False)
+
+    def view(
+        self,
+        fields: Optional[Tuple[str, ...]] = None,
+        status_colors: Optional[FrozenSet[str]] = None
+    ) -> "StationSnapshot":
+        """
+        This snapshot filtered by status color and/or projected to some fields,
+        serialized on first request and reused until the next rebuild
+        """
+        if fields is None and status_colors is None:
+            return self
+
+        key = (fields, status_colors)
+        view = self.views.get(key)
+        if view is None:
+            stations = [
+                station for station in self.stations
+                if status_colors is None or station.status_color in status_colors
+            ]
+            view = _make_snapshot(stations, fields)
+            if len(self.views) < MAX_SNAPSHOT_VIEWS:
+                self.views[key] = view
+        return view
+
+def _make_snapshot(stations: List[StationResponse], fields: Optional[Sequence[str]] = None) -> StationSnapshot:
+    if fields is None:
+        body = encode_model(station_list_adapter, stations)
+    else:
+        body = station_list_adapter.dump_json(stations, by_alias=True, include={"__all__": set(fields)})
+    etag = f'"{hashlib.blake2b(body, digest_size=16).hexdigest()}"'
+    return StationSnapshot(
+        body=body,
+        etag=etag,
+        station_count=len(stations),
+        built_at=datetime.utcnow(),
+        stations=tuple(stations)
+    )
+
+class StationSnapshotCache:
+    """
+    In-process cache of the /stations response body per tenant.
+    Rebuilt once per GBFS cycle and swapped in a single assignment,
+    so readers always see a complete snapshot.
+    """
+
+    def __init__(self):
+        self._snapshots: Optional[Dict[str, StationSnapshot]] = None
+        self._empty = _make_snapshot([])
+
+    @property
+    def is_ready(self) -> bool:
+        return self._snapshots is not None
+
+    def update(self, station_docs: Iterable[Dict], tenant_ids: Optional[Set[str]] = None):
+        """
+        Rebuild tenant snapshots from the latest station documents. With
+        tenant_ids, only those tenants are re-serialized and the rest are kept.
+        """
+        by_tenant: Dict[str, List[StationResponse]] = {}
+        for station in station_docs:
+            if tenant_ids is not None and station["tenant_id"] not in tenant_ids:
+                continue
+            by_tenant.setdefault(station["tenant_id"], []).append(
+                build_station_response(station)
+            )
+
+        snapshots = dict(self._snapshots or {}) if tenant_ids is not None else {}
+        for tenant_id in (tenant_ids or ()):
+            snapshots.pop(tenant_id, None)
+        for tenant_id, stations in by_tenant.items():
+            # Stable order so every worker builds the same body (and ETag) from the same data
+            stations.sort(key=lambda station: station.station_id)
+            snapshots[tenant_id] = _make_snapshot(stations)
+
+        self._snapshots = snapshots
+        logger.info(f"📦 Station snapshot rebuilt for {len(by_tenant)} tenants")
+
+    def get(self, tenant_id: str) -> Optional[StationSnapshot]:
+        """Get the current snapshot for a tenant, or None before the first build"""
+        snapshots = self._snapshots
+        if snapshots is None:
+            return None
+        return snapshots.get(tenant_id, self._empty)
+
+station_cache = StationSnapshotCache()
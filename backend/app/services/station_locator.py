@@ -0,0 +1,198 @@
+import heapq
+import logging
+import math
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from app.models.schemas import NearbyStation
+from app.services.station_cache import build_station_response
+
+logger = logging.getLogger(__name__)
+
+EARTH_RADIUS_M = 6371008.8
+DEFAULT_CELL_DEGREES = 0.005  # ~550 m of latitude per grid cell
+
+def haversine_m(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """Great-circle distance in meters"""
+    phi1 = math.radians(lat1)
+    phi2 = math.radians(lat2)
+    dphi = phi2 - phi1
+    dlambda = math.radians(lon2 - lon1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlambda / 2) ** 2
+    return 2 * EARTH_RADIUS_M * math.asin(math.sqrt(a))
+
+def geo_point(lat: float, lon: float) -> Dict:
+    """GeoJSON point as stored in stations.location (2dsphere)"""
+    return {"type": "Point", "coordinates": [lon, lat]}
+
+class _Entry:
+    __slots__ = ("station_id", "tenant_id", "lat", "lon", "bikes", "docks", "active", "fields")
+
+    def __init__(self, station: Dict):
+        status = station["current_status"]
+        self.station_id = station["station_id"]
+        self.tenant_id = station["tenant_id"]
+        self.lat = station["lat"]
+        self.lon = station["lon"]
+        self.bikes = status["bikes_available"]
+        self.docks = status["docks_available"]
+        self.active = status.get("is_installed", True) and status.get("is_renting", True)
+        self.fields = build_station_response(station).model_dump()
+
+class StationLocator:
+    """
+    In-memory uniform grid over station coordinates for nearest-station
+    queries. Rebuilt from the station snapshot after each GBFS cycle and
+    swapped in a single assignment, like the station cache.
+    """
+
+    def __init__(self, cell_degrees: float = DEFAULT_CELL_DEGREES):
+        self.cell_degrees = cell_degrees
+        self._grid: Optional[Dict[Tuple[int, int], List[_Entry]]] = None
+        self._bounds: Tuple[int, int, int, int] = (0, 0, 0, 0)
+        self.station_count = 0
+        self.last_build_ms = 0.0
+
+    @property
+    def is_ready(self) -> bool:
+        return self._grid is not None
+
+    def _cell(self, lat: float, lon: float) -> Tuple[int, int]:
+        return (math.floor(lat / self.cell_degrees), math.floor(lon / self.cell_degrees))
+
+    def rebuild(self, station_docs: Iterable[Dict]):
+        """Rebuild the grid from the latest station documents"""
+        started = time.perf_counter()
+        grid: Dict[Tuple[int, int], List[_Entry]] = {}
+        for station in station_docs:
+            if station.get("lat") is None or station.get("lon") is None:
+                continue
+            entry = _Entry(station)
+            grid.setdefault(self._cell(entry.lat, entry.lon), []).append(entry)
+
+        rows = [cell[0] for cell in grid] or [0]
+        cols = [cell[1] for cell in grid] or [0]
+        self._bounds = (min(rows), max(rows), min(cols), max(cols))
+        self.station_count = sum(len(entries) for entries in grid.values())
+        self._grid = grid
+        self.last_build_ms = round((time.perf_counter() - started) * 1000, 2)
+        logger.info(f"🧭 Station locator rebuilt: {self.station_count} stations in {len(grid)} cells ({self.last_build_ms}ms)")
+
+    def _ring(self, row: int, col: int, radius: int):
+        """Cells at Chebyshev distance `radius` from (row, col)"""
+        if radius == 0:
+            yield (row, col)
+            return
+        for c in range(col - radius, col + radius + 1):
+            yield (row - radius, c)
+            yield (row + radius, c)
+        for r in range(row - radius + 1, row + radius):
+            yield (r, col - radius)
+            yield (r, col + radius)
+
+    def nearest(
+        self,
+        lat: float,
+        lon: float,
+        limit: int = 10,
+        min_bikes: int = 0,
+        min_docks: int = 0,
+        max_distance_m: Optional[float] = None,
+        tenant_id: Optional[str] = None,
+        include_inactive: bool = False
+    ) -> List[NearbyStation]:
+        """
+        Nearest stations matching the availability filters, closest first.
+        Rings of cells are scanned outward until the k-th best distance is
+        closer than anything an unscanned ring could contain.
+        """
+        grid = self._grid
+        if not grid:
+            return []
+
+        best: List[Tuple[float, str, _Entry]] = []  # max-heap of (-distance, id, entry)
+
+        def consider(entries: Iterable[_Entry]):
+            for entry in entries:
+                if entry.bikes < min_bikes or entry.docks < min_docks:
+                    continue
+                if tenant_id is not None and entry.tenant_id != tenant_id:
+                    continue
+                if not include_inactive and not entry.active:
+                    continue
+                distance = haversine_m(lat, lon, entry.lat, entry.lon)
+                if max_distance_m is not None and distance > max_distance_m:
+                    continue
+                item = (-distance, entry.station_id, entry)
+                if len(best) < limit:
+                    heapq.heappush(best, item)
+                elif item > best[0]:
+                    heapq.heapreplace(best, item)
+
+        row, col = self._cell(lat, lon)
+        min_row, max_row, min_col, max_col = self._bounds
+        max_radius = max(abs(row - min_row), abs(row - max_row), abs(col - min_col), abs(col - max_col))
+
+        # Smallest cell extent in meters over the scanned area (longitude shrinks with latitude)
+        far_lat = min(89.9, abs(lat) + self.cell_degrees * (max_radius + 1))
+        cell_m = math.radians(self.cell_degrees) * EARTH_RADIUS_M * math.cos(math.radians(far_lat))
+
+        for radius in range(max_radius + 1):
+            # Every station in this ring or beyond is at least this far away
+            ring_floor = max(0, radius - 1) * cell_m
+            if len(best) >= limit and -best[0][0] <= ring_floor:
+                break
+            if max_distance_m is not None and ring_floor > max_distance_m:
+                break
+            if (2 * radius + 1) ** 2 > 4 * len(grid):
+                # Far outside the station area: scanning empty cells would cost more than all stations
+                best.clear()
+                consider(entry for entries in grid.values() for entry in entries)
+                break
+
+            for cell in self._ring(row, col, radius):
+                consider(grid.get(cell, ()))
+
+        return [
+            NearbyStation.model_construct(**entry.fields, distance_m=round(-neg_distance, 1))
+            for neg_distance, _, entry in sorted(best, reverse=True)
+        ]
+
+    async def nearest_from_db(
+        self,
+        db,
+        lat: float,
+        lon: float,
+        limit: int = 10,
+        min_bikes: int = 0,
+        min_docks: int = 0,
+        max_distance_m: Optional[float] = None,
+        tenant_id: Optional[str] = None,
+        include_inactive: bool = False
+    ) -> List[NearbyStation]:
+        """Same query against the stations 2dsphere index, used until the grid is built"""
+        near = {"$geometry": geo_point(lat, lon)}
+        if max_distance_m is not None:
+            near["$maxDistance"] = max_distance_m
+
+        query = {"location": {"$nearSphere": near}}
+        if min_bikes:
+            query["current_status.bikes_available"] = {"$gte": min_bikes}
+        if min_docks:
+            query["current_status.docks_available"] = {"$gte": min_docks}
+        if tenant_id is not None:
+            query["tenant_id"] = tenant_id
+        if not include_inactive:
+            query["current_status.is_installed"] = True
+            query["current_status.is_renting"] = True
+
+        stations = await db.stations.find(query).limit(limit).to_list(limit)
+        return [
+            NearbyStation(
+                **build_station_response(station).model_dump(),
+                distance_m=round(haversine_m(lat, lon, station["lat"], station["lon"]), 1)
+            )
+            for station in stations
+        ]
+
+station_locator = StationLocator()
@@ -0,0 +1,96 @@
+import logging
+from dataclasses import dataclass
+from typing import Dict, Iterable, Optional
+
+logger = logging.getLogger(__name__)
+
+METADATA_PROJECTION = {"_id": 0, "station_id": 1, "name": 1, "tenant_id": 1, "lat": 1, "lon": 1, "capacity": 1}
+
+@dataclass(frozen=True)
+class StationMetadata:
+    """Slow-changing station fields used to label analytics, alerts and flows"""
+    station_id: str
+    name: str
+    tenant_id: str
+    lat: float
+    lon: float
+    capacity: int
+
+    @classmethod
+    def from_doc(cls, station: Dict) -> "StationMetadata":
+        return cls(
+            station_id=station["station_id"],
+            name=station["name"],
+            tenant_id=station["tenant_id"],
+            lat=station["lat"],
+            lon=station["lon"],
+            capacity=station["capacity"]
+        )
+
+class StationMetadataCache:
+    """
+    station_id -> metadata, filled from every GBFS cycle (or follower sync).
+    Ids it has not seen, e.g. stations that left the feed but still appear in
+    trips, are resolved in one $in query per call and kept afterwards.
+    """
+
+    def __init__(self):
+        self._stations: Dict[str, StationMetadata] = {}
+        self.hits = 0
+        self.misses = 0
+        self.db_queries = 0
+
+    @property
+    def is_ready(self) -> bool:
+        return bool(self._stations)
+
+    def update(self, station_docs: Iterable[Dict]):
+        """Add or refresh stations; ones that left the feed keep their last metadata"""
+        for station in station_docs:
+            self._stations[station["station_id"]] = StationMetadata.from_doc(station)
+
+    def get(self, station_id: str) -> Optional[StationMetadata]:
+        return self._stations.get(station_id)
+
+    async def get_many(self, db, station_ids: Iterable[str]) -> Dict[str, StationMetadata]:
+        """Metadata for the given ids (unknown ids are left out), with at most one database round-trip"""
+        found: Dict[str, StationMetadata] = {}
+        missing = []
+        for station_id in set(station_ids):
+            metadata = self._stations.get(station_id)
+            if metadata is not None:
+                found[station_id] = metadata
+            else:
+                missing.append(station_id)
+        self.hits += len(found)
+        self.misses += len(missing)
+
+        if missing and db is not None:
+            self.db_queries += 1
+            try:
+                cursor = db.stations.find({"station_id": {"$in": missing}}, METADATA_PROJECTION)
+                async for station in cursor:
+                    metadata = StationMetadata.from_doc(station)
+                    self._stations[metadata.station_id] = metadata
+                    found[metadata.station_id] = metadata
+            except Exception as e:
+                logger.warning(f"Station metadata lookup for {len(missing)} ids failed: {e}")
+        return found
+
+    async def get_names(self, db, station_ids: Iterable[str], tenant_id: Optional[str] = None) -> Dict[str, str]:
+        """station_id -> name, optionally only for stations in tenant_id"""
+        return {
+            station_id: metadata.name
+            for station_id, metadata in (await self.get_many(db, station_ids)).items()
+            if tenant_id is None or metadata.tenant_id == tenant_id
+        }
+
+    def stats(self) -> Dict:
+        return {
+            "stations": len(self._stations),
+            "hits": self.hits,
+            "misses": self.misses,
+            "db_queries": self.db_queries
+        }
+
+station_metadata = StationMetadataCache()
@@ -0,0 +1,211 @@
+import asyncio
+import logging
+import time
+from datetime import datetime
+from typing import AsyncIterator, Dict, Iterable, List, Optional, Set
+
+from app.core.config import settings
+from app.core.serialization import station_update_adapter, encode_model
+from app.models.schemas import StationUpdate
+from app.services.station_cache import station_cache, build_station_response
+
+logger = logging.getLogger(__name__)
+
+HEARTBEAT_FRAME = b": keep-alive\n\n"
+RESYNC = None  # queued in place of a slow subscriber's dropped backlog
+CLOSED = object()  # queued on shutdown so every open stream returns
+
+def sse_frame(event: str, data: bytes, event_id: Optional[int] = None) -> bytes:
+    """Format one Server-Sent Events frame (data must be single-line JSON)"""
+    head = f"id: {event_id}\n" if event_id is not None else ""
+    return f"{head}event: {event}\ndata: ".encode() + data + b"\n\n"
+
+class Subscription:
+    """One connected client: a bounded queue of pre-serialized frames"""
+
+    def __init__(self, tenant_id: str, queue_size: int):
+        self.tenant_id = tenant_id
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.resyncs = 0
+
+    def offer(self, frame: bytes) -> bool:
+        """
+        Enqueue without waiting. A full queue means the client is not keeping
+        up, so its backlog is replaced by a single resync marker and it catches
+        up from the next snapshot instead of holding frames in memory.
+        """
+        try:
+            self.queue.put_nowait(frame)
+            return True
+        except asyncio.QueueFull:
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(RESYNC)
+            self.resyncs += 1
+            return False
+
+class StationStreamBroker:
+    """
+    In-process pub/sub for live station updates. Each GBFS cycle publishes the
+    changed stations once per tenant; the frame is serialized once and fanned
+    out to every subscriber of that tenant.
+    """
+
+    def __init__(self, queue_size: Optional[int] = None):
+        self.queue_size = queue_size or settings.stream_queue_size
+        self._subscribers: Dict[str, Set[Subscription]] = {}
+        self._sequence: Dict[str, int] = {}
+        self.published = 0
+        self.delivered = 0
+        self.resyncs = 0
+        self.last_fanout_ms = 0.0
+        self._heartbeat_task: Optional[asyncio.Task] = None
+        self._closed = False
+
+    def subscribe(self, tenant_id: str) -> Subscription:
+        subscription = Subscription(tenant_id, self.queue_size)
+        self._subscribers.setdefault(tenant_id, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        subscribers = self._subscribers.get(subscription.tenant_id)
+        if subscribers is not None:
+            subscribers.discard(subscription)
+            if not subscribers:
+                del self._subscribers[subscription.tenant_id]
+
+    def subscriber_count(self, tenant_id: Optional[str] = None) -> int:
+        if tenant_id is not None:
+            return len(self._subscribers.get(tenant_id, ()))
+        return sum(len(subscribers) for subscribers in self._subscribers.values())
+
+    def publish(self, tenant_id: str, station_docs: List[Dict], removed: List[str]) -> int:
+        """Fan out one tenant's changes; returns the number of subscribers reached"""
+        subscribers = self._subscribers.get(tenant_id)
+        if not subscribers:
+            return 0
+
+        started = time.perf_counter()
+        sequence = self._sequence.get(tenant_id, 0) + 1
+        self._sequence[tenant_id] = sequence
+
+        update = StationUpdate(
+            tenant_id=tenant_id,
+            sequence=sequence,
+            published_at=datetime.utcnow(),
+            stations=[build_station_response(station) for station in station_docs],
+            removed=removed
+        )
+        frame = sse_frame("update", encode_model(station_update_adapter, update), sequence)
+
+        delivered = 0
+        for subscription in list(subscribers):
+            if subscription.offer(frame):
+                delivered += 1
+            else:
+                self.resyncs += 1
+
+        self.published += 1
+        self.delivered += delivered
+        self.last_fanout_ms = round((time.perf_counter() - started) * 1000, 2)
+        return len(subscribers)
+
+    def publish_cycle(self, changed_docs: Iterable[Dict], removed: Dict[str, List[str]]):
+        """Publish a GBFS cycle's changed and removed stations, grouped by tenant"""
+        by_tenant: Dict[str, List[Dict]] = {}
+        for station_doc in changed_docs:
+            by_tenant.setdefault(station_doc["tenant_id"], []).append(station_doc)
+
+        for tenant_id in set(by_tenant) | set(removed):
+            self.publish(tenant_id, by_tenant.get(tenant_id, []), removed.get(tenant_id, []))
+
+    def snapshot_frame(self, tenant_id: str) -> Optional[bytes]:
+        snapshot = station_cache.get(tenant_id)
+        if snapshot is None:
+            return None
+        return sse_frame("snapshot", snapshot.body, self._sequence.get(tenant_id, 0))
+
+    async def stream(self, tenant_id: str) -> AsyncIterator[bytes]:
+        """SSE body for one client: the current snapshot, then frames as they are published"""
+        if self._closed:
+            return
+        subscription = self.subscribe(tenant_id)
+        logger.info(f"📡 Stream subscriber joined {tenant_id} ({self.subscriber_count(tenant_id)} connected)")
+        try:
+            frame = self.snapshot_frame(tenant_id)
+            if frame is not None:
+                yield frame
+
+            while True:
+                frame = await subscription.queue.get()
+                if frame is CLOSED:
+                    return
+                if frame is RESYNC:
+                    frame = self.snapshot_frame(tenant_id)
+                    if frame is None:
+                        continue
+                yield frame
+        finally:
+            self.unsubscribe(subscription)
+            logger.info(f"📡 Stream subscriber left {tenant_id} ({self.subscriber_count(tenant_id)} connected)")
+
+    def heartbeat(self):
+        """Queue a keep-alive comment for idle subscribers so proxies keep the connection open"""
+        for subscribers in self._subscribers.values():
+            for subscription in subscribers:
+                if subscription.queue.empty():
+                    subscription.queue.put_nowait(HEARTBEAT_FRAME)
+
+    async def _heartbeat_loop(self, interval: float):
+        while True:
+            await asyncio.sleep(interval)
+            self.heartbeat()
+
+    def start(self, heartbeat_seconds: Optional[float] = None):
+        """Start the shared heartbeat task (one timer for all subscribers)"""
+        if self._heartbeat_task is None:
+            self._heartbeat_task = asyncio.create_task(
+                self._heartbeat_loop(heartbeat_seconds or settings.stream_heartbeat_seconds)
+            )
+
+    def end_streams(self):
+        """
+        Wake every open stream with CLOSED so its response finishes, and refuse
+        new ones. Call from the event loop thread.
+        """
+        if self._closed:
+            return
+        self._closed = True
+        count = 0
+        for subscribers in self._subscribers.values():
+            for subscription in subscribers:
+                while not subscription.queue.empty():
+                    subscription.queue.get_nowait()
+                subscription.queue.put_nowait(CLOSED)
+                count += 1
+        if count:
+            logger.info(f"📡 Closing {count} station stream(s)")
+
+    async def close(self):
+        self.end_streams()
+        if self._heartbeat_task is not None:
+            self._heartbeat_task.cancel()
+            try:
+                await self._heartbeat_task
+            except asyncio.CancelledError:
+                pass
+            self._heartbeat_task = None
+
+    def stats(self) -> Dict:
+        return {
+            "subscribers": {
+                tenant_id: len(subscribers)
+                for tenant_id, subscribers in self._subscribers.items()
+            },
+            "published": self.published,
+            "delivered": self.delivered,
+            "resyncs": self.resyncs,
+            "last_fanout_ms": self.last_fanout_ms
+        }
+
+station_stream = StationStreamBroker()
@@ -0,0 +1,213 @@
+import logging
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from pymongo import UpdateOne
+
+from app.models.schemas import (
+    AvailabilityPoint,
+    TenantAvailabilityPoint,
+    StationAvailabilityHistory,
+    AvailabilityHistory
+)
+
+logger = logging.getLogger(__name__)
+
+HISTORY_COLLECTION = "station_status_history"
+
+FLAG_INSTALLED = 1
+FLAG_RENTING = 2
+
+Sample = Tuple[int, int, int]  # (bikes, docks, flags)
+
+def encode_sample(status: Dict) -> Sample:
+    flags = 0
+    if status["is_installed"]:
+        flags |= FLAG_INSTALLED
+    if status["is_renting"]:
+        flags |= FLAG_RENTING
+    return (status["bikes_available"], status["docks_available"], flags)
+
+def day_start(value: datetime) -> datetime:
+    return value.replace(hour=0, minute=0, second=0, microsecond=0)
+
+class StatusHistoryService:
+    """
+    Station availability history stored as one bucket document per
+    station-day. A sample is appended only when a station's
+    (bikes, docks, flags) differs from the last recorded sample, and the
+    first sample of each day is always written so buckets stand alone.
+
+    Bucket: {station_id, tenant_id, date, n, s: [[t, bikes, docks, flags], ...]}
+    where t is seconds since the bucket's midnight (UTC).
+    """
+
+    def __init__(self):
+        self._last_recorded: Dict[str, Tuple[datetime, Sample]] = {}
+        self._pending: Dict[str, Tuple[datetime, Sample]] = {}
+        self._keyframe_date: Optional[datetime] = None
+
+    def reset(self):
+        """Forget what was last recorded, so the next cycle writes every station's current sample"""
+        self._last_recorded = {}
+        self._pending = {}
+        self._keyframe_date = None
+
+    def build_operations(self, station_docs: Iterable[Dict], observed_at: datetime) -> List[UpdateOne]:
+        """Return $push upserts for stations whose availability changed"""
+        date = day_start(observed_at)
+        offset = int((observed_at - date).total_seconds())
+        operations = []
+        recorded = {}
+
+        for station_doc in station_docs:
+            station_id = station_doc["station_id"]
+            sample = encode_sample(station_doc["current_status"])
+
+            if self._last_recorded.get(station_id) == (date, sample):
+                continue
+
+            operations.append(UpdateOne(
+                {"station_id": station_id, "date": date},
+                {
+                    "$setOnInsert": {"tenant_id": station_doc["tenant_id"]},
+                    "$push": {"s": [offset, *sample]},
+                    "$inc": {"n": 1}
+                },
+                upsert=True
+            ))
+            recorded[station_id] = (date, sample)
+
+        self._pending = recorded
+        return operations
+
+    async def record_cycle(
+        self,
+        db,
+        station_docs: Iterable[Dict],
+        observed_at: Optional[datetime] = None,
+        all_station_docs: Optional[Iterable[Dict]] = None
+    ) -> int:
+        """
+        Append this poll's changed stations to their day buckets. On the first
+        cycle of a new day, all_station_docs (when given) are evaluated instead
+        so every station gets that day's opening sample.
+        """
+        observed_at = observed_at or datetime.utcnow()
+        date = day_start(observed_at)
+        if all_station_docs is not None and date != self._keyframe_date:
+            station_docs = all_station_docs
+        operations = self.build_operations(station_docs, observed_at)
+
+        if operations:
+            await db[HISTORY_COLLECTION].bulk_write(operations, ordered=False)
+            self._last_recorded.update(self._pending)
+        self._pending = {}
+        if all_station_docs is not None:
+            self._keyframe_date = date
+
+        return len(operations)
+
+    async def get_history(
+        self,
+        db,
+        tenant_id: str,
+        start: datetime,
+        end: datetime,
+        interval_minutes: int,
+        station_id: Optional[str] = None,
+        include_stations: bool = False
+    ) -> AvailabilityHistory:
+        """
+        Downsample availability to one point per interval (value in effect at the
+        interval start) per station, plus a tenant-wide curve summed over stations
+        """
+        query = {
+            "tenant_id": tenant_id,
+            # The previous day's bucket supplies the state in effect at `start`
+            "date": {"$gte": day_start(start) - timedelta(days=1), "$lt": end}
+        }
+        if station_id:
+            query["station_id"] = station_id
+
+        samples_by_station: Dict[str, List[Tuple[datetime, Sample]]] = {}
+        cursor = db[HISTORY_COLLECTION].find(query, {"_id": 0, "station_id": 1, "date": 1, "s": 1})
+        async for bucket in cursor:
+            series = samples_by_station.setdefault(bucket["station_id"], [])
+            for offset, bikes, docks, flags in bucket["s"]:
+                series.append((bucket["date"] + timedelta(seconds=offset), (bikes, docks, flags)))
+
+        step = timedelta(minutes=interval_minutes)
+        timestamps = []
+        current = start
+        while current < end:
+            timestamps.append(current)
+            current += step
+
+        tenant_bikes = [0] * len(timestamps)
+        tenant_docks = [0] * len(timestamps)
+        reporting = [0] * len(timestamps)
+        empty = [0] * len(timestamps)
+        stations = []
+
+        for sid, series in sorted(samples_by_station.items()):
+            series.sort(key=lambda item: item[0])
+            points = []
+            index = -1
+            for i, timestamp in enumerate(timestamps):
+                while index + 1 < len(series) and series[index + 1][0] <= timestamp:
+                    index += 1
+                if index < 0:
+                    continue
+
+                bikes, docks, flags = series[index][1]
+                tenant_bikes[i] += bikes
+                tenant_docks[i] += docks
+                reporting[i] += 1
+                if bikes == 0:
+                    empty[i] += 1
+                points.append(AvailabilityPoint(
+                    timestamp=timestamp,
+                    bikes_available=bikes,
+                    docks_available=docks,
+                    is_installed=bool(flags & FLAG_INSTALLED),
+                    is_renting=bool(flags & FLAG_RENTING)
+                ))
+
+            if station_id or include_stations:
+                stations.append(StationAvailabilityHistory(station_id=sid, points=points))
+
+        tenant_curve = [
+            TenantAvailabilityPoint(
+                timestamp=timestamp,
+                bikes_available=tenant_bikes[i],
+                docks_available=tenant_docks[i],
+                stations_reporting=reporting[i],
+                empty_stations=empty[i]
+            )
+            for i, timestamp in enumerate(timestamps)
+        ]
+
+        return AvailabilityHistory(
+            tenant_id=tenant_id,
+            interval_minutes=interval_minutes,
+            tenant=tenant_curve,
+            stations=stations
+        )
+
+    async def storage_stats(self, db) -> Dict[str, float]:
+        """Average BSON bytes and samples per station-day bucket"""
+        cursor = db[HISTORY_COLLECTION].aggregate([
+            {"$group": {
+                "_id": None,
+                "buckets": {"$sum": 1},
+                "avg_bytes": {"$avg": {"$bsonSize": "$$ROOT"}},
+                "avg_samples": {"$avg": "$n"}
+            }}
+        ])
+        results = await cursor.to_list(1)
+        if not results:
+            return {"buckets": 0, "avg_bytes": 0.0, "avg_samples": 0.0}
+        return {key: results[0][key] for key in ("buckets", "avg_bytes", "avg_samples")}
+
+status_history_service = StatusHistoryService()
@@ -0,0 +1,121 @@
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+ROLLUP_COLLECTION = "trip_rollups"
+ROLLUP_KEY = [("tenant_id", 1), ("station_id", 1), ("date", 1), ("hour", 1)]
+ROLLUP_RANGE_INDEXES = [
+    [("tenant_id", 1), ("hour_start", 1)],
+    [("tenant_id", 1), ("station_id", 1), ("hour_start", 1)],
+]
+
+MIN_TRIP_SECONDS = 60  # 1 minute
+MAX_TRIP_SECONDS = 86400  # 24 hours
+
+# Upper bounds (minutes) of the duration histogram buckets; the last bucket is open-ended
+DURATION_BUCKET_EDGES = [5, 10, 15, 20, 30, 45, 60, 120]
+
+def _valid_duration_expr() -> Dict:
+    return {"$and": [
+        {"$gte": ["$duration_seconds", MIN_TRIP_SECONDS]},
+        {"$lte": ["$duration_seconds", MAX_TRIP_SECONDS]}
+    ]}
+
+def _histogram_fields() -> Dict:
+    """One $sum accumulator per duration bucket"""
+    fields = {}
+    lower = 0
+    for i, upper in enumerate(DURATION_BUCKET_EDGES + [None]):
+        conditions = [
+            _valid_duration_expr(),
+            {"$gte": ["$duration_seconds", lower * 60]}
+        ]
+        if upper is not None:
+            conditions.append({"$lt": ["$duration_seconds", upper * 60]})
+            lower = upper
+        fields[f"bucket_{i}"] = {"$sum": {"$cond": [{"$and": conditions}, 1, 0]}}
+    return fields
+
+def build_rollup_pipeline(start: datetime, end: datetime) -> List[Dict]:
+    """
+    Build the pipeline that recomputes tenant x station x day x hour rollups
+    for trips started in [start, end) and merges them into the rollup collection
+    """
+    histogram = _histogram_fields()
+
+    return [
+        {"$match": {"started_at": {"$gte": start, "$lt": end}}},
+        {"$group": {
+            "_id": {
+                "tenant_id": "$tenant_id",
+                "station_id": "$start_station_id",
+                "date": {"$dateTrunc": {"date": "$started_at", "unit": "day"}},
+                "hour": {"$hour": "$started_at"}
+            },
+            "trip_count": {"$sum": 1},
+            "duration_sum": {"$sum": {"$cond": [_valid_duration_expr(), "$duration_seconds", 0]}},
+            "duration_count": {"$sum": {"$cond": [_valid_duration_expr(), 1, 0]}},
+            **histogram
+        }},
+        {"$project": {
+            "_id": 0,
+            "tenant_id": "$_id.tenant_id",
+            "station_id": "$_id.station_id",
+            "date": "$_id.date",
+            "hour": "$_id.hour",
+            "hour_start": {"$dateAdd": {"startDate": "$_id.date", "unit": "hour", "amount": "$_id.hour"}},
+            "trip_count": 1,
+            "duration_sum": 1,
+            "duration_count": 1,
+            "duration_histogram": [f"${name}" for name in histogram]
+        }},
+        {"$merge": {
+            "into": ROLLUP_COLLECTION,
+            "on": ["tenant_id", "station_id", "date", "hour"],
+            "whenMatched": "replace",
+            "whenNotMatched": "insert"
+        }}
+    ]
+
+def rebuild_rollups(db, start: datetime, end: datetime) -> int:
+    """
+    Synchronously rebuild rollups for the day range [start, end).
+    Only the affected days are touched, so loading a new month leaves
+    previously computed rollups in place.
+    """
+    db[ROLLUP_COLLECTION].create_index(ROLLUP_KEY, unique=True)
+    for index in ROLLUP_RANGE_INDEXES:
+        db[ROLLUP_COLLECTION].create_index(index)
+    db[ROLLUP_COLLECTION].delete_many({"date": {"$gte": start, "$lt": end}})
+    db.trips.aggregate(build_rollup_pipeline(start, end), allowDiskUse=True)
+    return db[ROLLUP_COLLECTION].count_documents({"date": {"$gte": start, "$lt": end}})
+
+def trip_day_range(db) -> Optional[Tuple[datetime, datetime]]:
+    """[first day, day after the last) covered by the trips collection, or None when empty"""
+    first = db.trips.find_one({}, {"started_at": 1}, sort=[("started_at", 1)])
+    last = db.trips.find_one({}, {"started_at": 1}, sort=[("started_at", -1)])
+    if first is None or last is None:
+        return None
+    start = first["started_at"].replace(hour=0, minute=0, second=0, microsecond=0)
+    end = last["started_at"].replace(hour=0, minute=0, second=0, microsecond=0) + timedelta(days=1)
+    return start, end
+
+def backfill_rollups(db, batch_days: int = 31, progress=print) -> int:
+    """
+    Rebuild rollups over every existing trip, batch_days at a time. Needed
+    once for trips loaded before rollups existed: analytics only fall back
+    to raw trips when a window has no rollups at all, so partly covered
+    windows would otherwise return partial totals.
+    """
+    day_range = trip_day_range(db)
+    if day_range is None:
+        return 0
+
+    start, end = day_range
+    total = 0
+    while start < end:
+        batch_end = min(start + timedelta(days=batch_days), end)
+        count = rebuild_rollups(db, start, batch_end)
+        progress(f"Rebuilt {count} station-hour rollups for {start:%Y-%m-%d} to {batch_end:%Y-%m-%d}")
+        total += count
+        start = batch_end
+    return total
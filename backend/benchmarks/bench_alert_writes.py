@@ -0,0 +1,78 @@
+"""
+Simulate GBFS polls and compare alert write volume of insert-per-poll
+against the AlertEngine lifecycle transitions. Runs fully in-process.
+
+Usage (from backend/):
+    python -m benchmarks.bench_alert_writes --stations 2000 --cycles 60
+"""
+import argparse
+import random
+import time
+from datetime import datetime
+
+from app.services.alert_service import AlertEngine, detect_alert_conditions
+
+def make_stations(count: int, rng: random.Random):
+    stations = []
+    for i in range(count):
+        capacity = rng.randint(15, 45)
+        bikes = rng.randint(0, capacity)
+        stations.append({
+            "station_id": str(i),
+            "tenant_id": "manhattan" if i % 2 else "brooklyn",
+            "name": f"Station {i}",
+            "capacity": capacity,
+            "current_status": {
+                "bikes_available": bikes,
+                "docks_available": capacity - bikes,
+                "last_updated": datetime.utcnow(),
+                "is_installed": True,
+                "is_renting": True
+            }
+        })
+    return stations
+
+def step(stations, rng: random.Random, churn: float):
+    """Random-walk a fraction of stations by a few bikes"""
+    for station in stations:
+        if rng.random() > churn:
+            continue
+        status = station["current_status"]
+        bikes = min(station["capacity"], max(0, status["bikes_available"] + rng.randint(-3, 3)))
+        status["bikes_available"] = bikes
+        status["docks_available"] = station["capacity"] - bikes
+        status["is_renting"] = rng.random() > 0.002
+
+def main(station_count: int, cycles: int, churn: float, seed: int):
+    rng = random.Random(seed)
+    stations = make_stations(station_count, rng)
+    engine = AlertEngine()
+    engine._loaded = True  # no database in the simulation
+
+    legacy_writes = 0
+    engine_writes = 0
+    engine_seconds = 0.0
+
+    for _ in range(cycles):
+        step(stations, rng, churn)
+        legacy_writes += sum(len(detect_alert_conditions(s)) for s in stations)
+
+        started = time.perf_counter()
+        engine_writes += len(engine.evaluate(stations))
+        engine_seconds += time.perf_counter() - started
+
+    reduction = 100 * (1 - engine_writes / legacy_writes) if legacy_writes else 0.0
+    print(f"stations={station_count} cycles={cycles} churn={churn}")
+    print(f"insert-per-poll writes: {legacy_writes}")
+    print(f"lifecycle writes:       {engine_writes} ({reduction:.1f}% fewer)")
+    print(f"open alerts at end:     {engine.open_alert_count}")
+    print(f"evaluate cost:          {engine_seconds / cycles * 1000:.2f} ms/cycle")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--stations", type=int, default=2000)
+    parser.add_argument("--cycles", type=int, default=60)
+    parser.add_argument("--churn", type=float, default=0.2)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+    main(args.stations, args.cycles, args.churn, args.seed)
@@ -0,0 +1,80 @@
+"""
+Compare analytics backends on the same dataset: the previous in-Python
+path, the $facet pipeline over raw trips, the rollup pipeline, and the
+Parquet store (when PARQUET_TRIP_PATH has been populated by ingest).
+
+Usage (from backend/):
+    python -m benchmarks.bench_analytics manhattan --runs 5
+"""
+import argparse
+import asyncio
+import time
+import tracemalloc
+from collections import Counter
+from statistics import median
+
+from app.core.config import settings
+from app.database.connection import connect_to_mongo, close_mongo_connection, get_database
+from app.services.analytics_service import analytics_service, TOP_STATIONS_LIMIT
+from app.services.parquet_store import ParquetTripStore
+
+async def legacy_analytics(tenant_id: str) -> dict:
+    """Previous implementation: load every trip and count in Python"""
+    db = get_database()
+    trips = await db.trips.find({"tenant_id": tenant_id}).to_list(None)
+
+    station_counts = Counter(t["start_station_id"] for t in trips if t.get("start_station_id"))
+    durations = [
+        t["duration_seconds"] / 60 for t in trips
+        if t.get("duration_seconds") and 1 <= t["duration_seconds"] / 60 <= 1440
+    ]
+    hours = Counter(t["started_at"].hour for t in trips if t.get("started_at"))
+
+    return {
+        "top_stations": station_counts.most_common(5),
+        "avg_trip_duration": round(sum(durations) / len(durations), 2) if durations else 0.0,
+        "peak_hour": hours.most_common(1)[0][0] if hours else 0,
+        "total_trips": len(trips)
+    }
+
+async def measure(label: str, func, runs: int):
+    timings = []
+    peak_bytes = 0
+    for _ in range(runs):
+        tracemalloc.start()
+        started = time.perf_counter()
+        await func()
+        timings.append(time.perf_counter() - started)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        peak_bytes = max(peak_bytes, peak)
+
+    print(
+        f"{label:<12} median={median(timings) * 1000:9.1f} ms  "
+        f"max={max(timings) * 1000:9.1f} ms  peak_alloc={peak_bytes / 1024 / 1024:8.1f} MiB"
+    )
+
+async def main(tenant_id: str, runs: int):
+    await connect_to_mongo()
+    try:
+        db = get_database()
+        parquet_store = ParquetTripStore(settings.parquet_trip_path)
+
+        await measure("legacy", lambda: legacy_analytics(tenant_id), runs)
+        await measure("trips", lambda: analytics_service._run_facets(
+            db.trips, analytics_service.build_analytics_pipeline(tenant_id)
+        ), runs)
+        await measure("rollups", lambda: analytics_service.compute_mongo_facets(tenant_id), runs)
+        try:
+            await measure("parquet", lambda: parquet_store.compute_facets(tenant_id, TOP_STATIONS_LIMIT), runs)
+        except RuntimeError as e:
+            print(f"parquet      skipped: {e}")
+    finally:
+        await close_mongo_connection()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("tenant_id")
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+    asyncio.run(main(args.tenant_id, args.runs))
@@ -0,0 +1,65 @@
+"""
+Build origin-destination flow matrices from synthetic trips with the
+vectorized FlowMatrix group-by and check them against a pandas groupby.
+Station popularity is Zipf-skewed so the matrix is sparse like real data.
+
+Usage (from backend/):
+    python -m benchmarks.bench_flows --trips 5000000 --stations 2000
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from app.services.flow_service import FlowMatrix
+
+def make_trips(trip_count: int, station_count: int, seed: int):
+    rng = np.random.default_rng(seed)
+    weights = 1.0 / np.arange(1, station_count + 1) ** 0.8
+    weights /= weights.sum()
+    station_ids = np.array([str(1000 + i) for i in range(station_count)], dtype=object)
+    origins = station_ids[rng.choice(station_count, size=trip_count, p=weights)]
+    destinations = station_ids[rng.choice(station_count, size=trip_count, p=weights)]
+    durations = rng.lognormal(mean=6.5, sigma=0.7, size=trip_count)
+    return origins, destinations, durations
+
+def main(trip_count: int, station_count: int, top_k: int, seed: int):
+    origins, destinations, durations = make_trips(trip_count, station_count, seed)
+
+    started = time.perf_counter()
+    matrix = FlowMatrix.from_trips(origins, destinations, durations)
+    build_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    top_flows = matrix.top_flows(top_k)
+    balance = matrix.station_balance()
+    query_seconds = time.perf_counter() - started
+
+    print(
+        f"{trip_count:,} trips -> {len(matrix.trip_counts):,} pairs over {len(matrix.station_ids):,} stations: "
+        f"build {build_seconds:.2f}s ({trip_count / build_seconds:,.0f} trips/s), "
+        f"top-{top_k} + balance {query_seconds * 1000:.1f}ms"
+    )
+
+    started = time.perf_counter()
+    frame = pd.DataFrame({"o": origins, "d": destinations})
+    expected = frame.groupby(["o", "d"]).size().sort_values(ascending=False)
+    print(f"pandas groupby reference: {time.perf_counter() - started:.2f}s")
+
+    assert matrix.total_trips == trip_count
+    assert len(matrix.trip_counts) == len(expected)
+    assert [flow.trip_count for flow in top_flows] == expected.iloc[:top_k].tolist()
+    for flow in top_flows:
+        assert expected[(flow.start_station_id, flow.end_station_id)] == flow.trip_count
+    assert sum(station.net_inflow for station in balance) == 0
+    print("results match")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--trips", type=int, default=5_000_000)
+    parser.add_argument("--stations", type=int, default=2000)
+    parser.add_argument("--top-k", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+    main(args.trips, args.stations, args.top_k, args.seed)
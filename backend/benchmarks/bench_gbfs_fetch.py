@@ -0,0 +1,44 @@
+"""
+Poll a local stub GBFS server through GBFSService.fetch_gbfs_data and
+report per-feed latency, bytes transferred and skipped fetches.
+
+Usage (from backend/):
+    python -m benchmarks.bench_gbfs_fetch --stations 2000 --polls 30 --interval 1
+"""
+import argparse
+import asyncio
+import json
+
+from app.services.gbfs_service import GBFSService
+from benchmarks.stub_gbfs_server import serve
+
+async def main(station_count: int, polls: int, interval: float, port: int):
+    server = serve(station_count, port, update_seconds=interval * 3, churn=0.2, seed=42)
+    service = GBFSService()
+    service.info_url = f"http://127.0.0.1:{port}/station_information.json"
+    service.status_url = f"http://127.0.0.1:{port}/station_status.json"
+
+    await service.start()
+    try:
+        changed = {service.info_url: 0, service.status_url: 0}
+        for _ in range(polls):
+            for url in changed:
+                await service.fetch_gbfs_data(url)
+                changed[url] += service._feeds[url].changed
+            await asyncio.sleep(interval)
+
+        for url, stats in service.feed_stats().items():
+            stats["changed_polls"] = changed[url]
+            print(url.rsplit("/", 1)[-1], json.dumps(stats))
+    finally:
+        await service.close()
+        server.shutdown()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--stations", type=int, default=2000)
+    parser.add_argument("--polls", type=int, default=30)
+    parser.add_argument("--interval", type=float, default=1.0)
+    parser.add_argument("--port", type=int, default=8081)
+    args = parser.parse_args()
+    asyncio.run(main(args.stations, args.polls, args.interval, args.port))
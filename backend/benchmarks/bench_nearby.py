@@ -0,0 +1,88 @@
+"""
+Nearest-station query latency: the in-memory grid (StationLocator) against a
+brute-force scan over all stations, with results checked to be identical.
+Runs fully in-process on synthetic GBFS stations.
+
+Usage (from backend/):
+    python -m benchmarks.bench_nearby --stations 2000 --queries 5000
+"""
+import argparse
+import random
+import time
+
+from app.core.tenants import classify_tenants
+from app.services.gbfs_service import GBFSService
+from app.services.station_locator import StationLocator, haversine_m
+from benchmarks.stub_gbfs_server import make_station_information, make_station_status
+
+def make_station_docs(station_count: int, rng: random.Random):
+    information = make_station_information(station_count, rng)
+    status = make_station_status(information, rng)
+    service = GBFSService()
+    status_lookup = {station["station_id"]: station for station in status["data"]["stations"]}
+    infos = information["data"]["stations"]
+    tenant_ids = classify_tenants([info["lat"] for info in infos], [info["lon"] for info in infos])
+    return [
+        service.build_station_doc(info, status_lookup[info["station_id"]], tenant_id)
+        for info, tenant_id in zip(infos, tenant_ids)
+    ]
+
+def brute_force(station_docs, lat, lon, limit, min_bikes, max_distance_m):
+    matches = []
+    for station in station_docs:
+        status = station["current_status"]
+        if status["bikes_available"] < min_bikes or not (status["is_installed"] and status["is_renting"]):
+            continue
+        distance = haversine_m(lat, lon, station["lat"], station["lon"])
+        if max_distance_m is not None and distance > max_distance_m:
+            continue
+        matches.append((distance, station["station_id"]))
+    matches.sort()
+    return [station_id for _, station_id in matches[:limit]]
+
+def summarize(label: str, samples):
+    ordered = sorted(samples)
+    pick = lambda q: ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1000
+    print(f"{label:<12} p50={pick(0.5):.3f}ms p95={pick(0.95):.3f}ms p99={pick(0.99):.3f}ms")
+
+def main(station_count: int, queries: int, limit: int, seed: int):
+    rng = random.Random(seed)
+    station_docs = make_station_docs(station_count, rng)
+    locator = StationLocator()
+    locator.rebuild(station_docs)
+    print(f"{locator.station_count} stations indexed in {locator.last_build_ms}ms")
+
+    grid_times, brute_times = [], []
+    mismatches = 0
+    for i in range(queries):
+        if i % 20 == 0:
+            # Occasionally query far from every station to exercise the fallback scan
+            lat, lon = rng.uniform(-60, 60), rng.uniform(-150, 150)
+        else:
+            lat, lon = rng.uniform(40.60, 40.84), rng.uniform(-74.04, -73.88)
+        min_bikes = rng.choice([0, 1, 5, 15])
+        max_distance_m = rng.choice([None, 500.0, 2000.0])
+
+        started = time.perf_counter()
+        nearby = locator.nearest(lat, lon, limit=limit, min_bikes=min_bikes, max_distance_m=max_distance_m)
+        grid_times.append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        expected = brute_force(station_docs, lat, lon, limit, min_bikes, max_distance_m)
+        brute_times.append(time.perf_counter() - started)
+
+        if [station.station_id for station in nearby] != expected:
+            mismatches += 1
+
+    summarize("grid", grid_times)
+    summarize("brute force", brute_times)
+    print(f"mismatches: {mismatches}/{queries}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--stations", type=int, default=2000)
+    parser.add_argument("--queries", type=int, default=5000)
+    parser.add_argument("--limit", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+    main(args.stations, args.queries, args.limit, args.seed)
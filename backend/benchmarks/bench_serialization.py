@@ -0,0 +1,149 @@
+"""
+Microbenchmarks for per-route serialization cost: FastAPI's default
+response_model path (validate + serialize + json.dumps) against the
+pydantic-core fast path in app.core.serialization, plus GBFS feed
+decoding with json vs orjson. Each pair is checked for byte-identical output.
+
+Usage (from backend/):
+    python -m benchmarks.bench_serialization --stations 2000 --alerts 100
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+from datetime import datetime, timedelta
+from typing import List
+
+from bson import ObjectId
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+
+from app.core.serialization import (
+    decode_json,
+    encode_model,
+    alert_list_adapter,
+    analytics_adapter,
+    history_adapter,
+    station_list_adapter
+)
+from app.models.schemas import (
+    Alert,
+    Analytics,
+    AvailabilityHistory,
+    StationResponse,
+    TenantAvailabilityPoint,
+    TopStation
+)
+from app.services.station_cache import build_station_response
+from benchmarks.stub_gbfs_server import make_station_information, make_station_status
+
+def make_payloads(station_count: int, alert_count: int, rng: random.Random):
+    now = datetime(2024, 1, 15, 8, 30, 12, 345000)
+    stations = [
+        build_station_response({
+            "station_id": str(1000 + i),
+            "name": f"W {i} St & Ave {'é' if i % 7 == 0 else 'A'}",
+            "lat": 40.7 + rng.random() / 10,
+            "lon": -73.9 - rng.random() / 10,
+            "capacity": 30,
+            "current_status": {
+                "bikes_available": (b := rng.randint(0, 30)),
+                "docks_available": 30 - b,
+                "last_updated": now - timedelta(seconds=rng.randint(0, 600))
+            }
+        })
+        for i in range(station_count)
+    ]
+    alerts = [
+        Alert(
+            _id=ObjectId(),
+            tenant_id="manhattan",
+            station_id=str(1000 + i),
+            station_name=f"Station {i}",
+            type="low_bikes",
+            severity="warning",
+            timestamp=now
+        )
+        for i in range(alert_count)
+    ]
+    analytics = Analytics(
+        top_stations=[TopStation(station_id=str(i), name=f"Station {i}", trip_count=1000 - i) for i in range(5)],
+        avg_trip_duration=13.37,
+        peak_hour=17,
+        total_trips=2398234
+    )
+    history = AvailabilityHistory(
+        tenant_id="manhattan",
+        interval_minutes=15,
+        tenant=[
+            TenantAvailabilityPoint(
+                timestamp=now + timedelta(minutes=15 * i),
+                bikes_available=rng.randint(10000, 20000),
+                docks_available=rng.randint(10000, 20000),
+                stations_reporting=station_count,
+                empty_stations=rng.randint(0, 200)
+            )
+            for i in range(96)
+        ]
+    )
+    return {
+        "/stations/{tenant_id}": (List[StationResponse], station_list_adapter, stations),
+        "/alerts/{tenant_id}": (List[Alert], alert_list_adapter, alerts),
+        "/analytics/{tenant_id}": (Analytics, analytics_adapter, analytics),
+        "/stations/{tenant_id}/history": (AvailabilityHistory, history_adapter, history),
+    }
+
+async def fastapi_default(field, value) -> bytes:
+    """What FastAPI does for a route returning models with response_model set"""
+    content = await serialize_response(field=field, response_content=value)
+    return JSONResponse(content).body
+
+def timeit(func, repeat: int) -> float:
+    started = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - started) / repeat * 1000
+
+async def main(station_count: int, alert_count: int, repeat: int, seed: int):
+    rng = random.Random(seed)
+    print(f"{'route':<32} {'default ms':>11} {'fast ms':>9} {'speedup':>8} {'bytes':>9}  identical")
+
+    for route, (response_type, adapter, value) in make_payloads(station_count, alert_count, rng).items():
+        field = create_response_field(name="Response", type_=response_type)
+        default_body = await fastapi_default(field, value)
+        fast_body = encode_model(adapter, value)
+
+        started = time.perf_counter()
+        for _ in range(repeat):
+            await fastapi_default(field, value)
+        default_ms = (time.perf_counter() - started) / repeat * 1000
+        fast_ms = timeit(lambda: encode_model(adapter, value), repeat)
+
+        print(
+            f"{route:<32} {default_ms:11.3f} {fast_ms:9.3f} {default_ms / fast_ms:7.1f}x "
+            f"{len(fast_body):9d}  {default_body == fast_body}"
+        )
+
+    information = make_station_information(station_count, rng)
+    for name, payload in (
+        ("station_information.json", information),
+        ("station_status.json", make_station_status(information, rng)),
+    ):
+        body = json.dumps(payload).encode()
+        json_ms = timeit(lambda: json.loads(body), repeat)
+        orjson_ms = timeit(lambda: decode_json(body), repeat)
+        print(
+            f"decode {name:<25} {json_ms:11.3f} {orjson_ms:9.3f} {json_ms / orjson_ms:7.1f}x "
+            f"{len(body):9d}  {json.loads(body) == decode_json(body)}"
+        )
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--stations", type=int, default=2000)
+    parser.add_argument("--alerts", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+    asyncio.run(main(args.stations, args.alerts, args.repeat, args.seed))
@@ -0,0 +1,59 @@
+"""
+Simulate a day of GBFS polls and measure status history storage per
+station-day for the delta-encoded bucket layout. Runs fully in-process.
+
+Usage (from backend/):
+    python -m benchmarks.bench_status_history --stations 2000 --poll-seconds 60
+"""
+import argparse
+import random
+from datetime import datetime, timedelta
+
+import bson
+
+from app.services.status_history_service import StatusHistoryService
+from benchmarks.bench_alert_writes import make_stations, step
+
+def main(station_count: int, poll_seconds: int, churn: float, seed: int):
+    rng = random.Random(seed)
+    stations = make_stations(station_count, rng)
+    service = StatusHistoryService()
+
+    day = datetime(2024, 1, 15)
+    polls = 86400 // poll_seconds
+    buckets = {}
+
+    for poll in range(polls):
+        step(stations, rng, churn)
+        observed_at = day + timedelta(seconds=poll * poll_seconds)
+        for operation in service.build_operations(stations, observed_at):
+            station_id = operation._filter["station_id"]
+            bucket = buckets.setdefault(station_id, {
+                "_id": bson.ObjectId(),
+                "station_id": station_id,
+                "date": day,
+                "tenant_id": "manhattan",
+                "n": 0,
+                "s": []
+            })
+            bucket["s"].append(operation._doc["$push"]["s"])
+            bucket["n"] += 1
+        service._last_recorded.update(service._pending)
+
+    samples = sum(bucket["n"] for bucket in buckets.values())
+    total_bytes = sum(len(bson.encode(bucket)) for bucket in buckets.values())
+    snapshot_samples = polls * station_count
+
+    print(f"stations={station_count} polls={polls} churn={churn}")
+    print(f"samples written:     {samples} of {snapshot_samples} ({100 * samples / snapshot_samples:.1f}% of full snapshots)")
+    print(f"bytes/station-day:   {total_bytes / len(buckets):,.0f}")
+    print(f"total for the day:   {total_bytes / 1024 / 1024:.2f} MiB")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--stations", type=int, default=2000)
+    parser.add_argument("--poll-seconds", type=int, default=60)
+    parser.add_argument("--churn", type=float, default=0.2)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+    main(args.stations, args.poll_seconds, args.churn, args.seed)
@@ -0,0 +1,71 @@
+"""
+Compare grid-indexed polygon tenant classification against the original
+row-by-row lat/lon threshold rules (which the bundled tenant polygons
+reproduce, so mismatches should be 0) on a synthetic trip frame.
+
+Usage (from backend/):
+    python -m benchmarks.bench_tenant_classifier --rows 10000000 --apply-rows 1000000
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from app.core.tenants import classify_tenants
+
+def assign_tenant_from_coordinates(lat, lon):
+    """Previous per-row implementation from process_trip_data.py"""
+    if pd.isna(lat) or pd.isna(lon):
+        return "manhattan"
+    if lat < 40.68:
+        return "brooklyn"
+    elif lat < 40.72 and lon > -73.98:
+        return "brooklyn"
+    elif lat < 40.71 and lon > -73.95:
+        return "brooklyn"
+    return "manhattan"
+
+def make_frame(rows: int, seed: int) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        "start_station_latitude": rng.uniform(40.57, 40.88, rows),
+        "start_station_longitude": rng.uniform(-74.05, -73.85, rows)
+    })
+
+def main(rows: int, apply_rows: int, seed: int):
+    df = make_frame(rows, seed)
+
+    started = time.perf_counter()
+    vectorized = classify_tenants(
+        df["start_station_latitude"].to_numpy(),
+        df["start_station_longitude"].to_numpy()
+    )
+    vectorized_seconds = time.perf_counter() - started
+
+    sample = df.head(apply_rows)
+    started = time.perf_counter()
+    applied = sample.apply(
+        lambda row: assign_tenant_from_coordinates(
+            row["start_station_latitude"],
+            row["start_station_longitude"]
+        ), axis=1
+    )
+    apply_seconds = time.perf_counter() - started
+    apply_estimate = apply_seconds * rows / len(sample)
+
+    mismatches = int((applied.to_numpy() != vectorized[:len(sample)]).sum())
+
+    print(f"rows={rows:,}")
+    print(f"vectorized: {vectorized_seconds:8.2f} s  ({rows / vectorized_seconds:,.0f} rows/sec)")
+    print(f"apply:      {apply_estimate:8.2f} s  (extrapolated from {len(sample):,} rows)")
+    print(f"speedup:    {apply_estimate / vectorized_seconds:8.1f}x")
+    print(f"mismatches: {mismatches}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=10_000_000)
+    parser.add_argument("--apply-rows", type=int, default=1_000_000)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+    main(args.rows, args.apply_rows, args.seed)
@@ -0,0 +1,141 @@
+"""
+Multi-worker check against a local mongod: runs the API under
+`uvicorn --workers N` with the stub GBFS server and verifies that
+
+  * exactly one worker holds the GBFS poller lease and polls the feed
+    (feed requests match one poller, not N),
+  * no (station, type) has more than one open alert,
+  * every worker serves the same station snapshot (same ETag),
+  * after the leader is killed another worker takes the lease over and
+    polling continues.
+
+A throwaway database is used and dropped afterwards.
+
+Usage (from backend/, with mongod listening on localhost:27017):
+    python -m benchmarks.check_multiworker --workers 4
+"""
+import argparse
+import os
+import signal
+import subprocess
+import sys
+import time
+
+import httpx
+from pymongo import MongoClient
+
+from app.services.coordination import LEASE_COLLECTION, GBFS_POLLER_LEASE
+from benchmarks.stub_gbfs_server import serve
+
+def wait_for(predicate, timeout: float, interval: float = 0.5):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        result = predicate()
+        if result:
+            return result
+        time.sleep(interval)
+    return None
+
+def lease_owner(db):
+    lease = db[LEASE_COLLECTION].find_one({"_id": GBFS_POLLER_LEASE})
+    return lease["owner"] if lease else None
+
+def check(label: str, ok: bool, detail: str = "") -> bool:
+    print(f"{'PASS' if ok else 'FAIL'}  {label}{f' ({detail})' if detail else ''}")
+    return ok
+
+def main(mongodb_url: str, workers: int, api_port: int, gbfs_port: int, interval: int, window: int):
+    database_name = f"bikescope_multiworker_check_{os.getpid()}"
+    db = MongoClient(mongodb_url)[database_name]
+    gbfs = serve(station_count=500, port=gbfs_port, update_seconds=interval, churn=0.3, seed=7)
+    lease_seconds = 3
+
+    env = dict(
+        os.environ,
+        MONGODB_URL=mongodb_url,
+        DB_PASSWORD=os.environ.get("DB_PASSWORD", "unused"),
+        DATABASE_NAME=database_name,
+        GBFS_INFO_URL=f"http://127.0.0.1:{gbfs_port}/station_information.json",
+        GBFS_STATUS_URL=f"http://127.0.0.1:{gbfs_port}/station_status.json",
+        UPDATE_INTERVAL=str(interval),
+        FOLLOWER_SYNC_SECONDS="1",
+        LEADER_LEASE_SECONDS=str(lease_seconds)
+    )
+    api = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(api_port),
+         "--workers", str(workers), "--log-level", "warning", "--timeout-graceful-shutdown", "5"],
+        env=env,
+        start_new_session=True
+    )
+    base_url = f"http://127.0.0.1:{api_port}/api/v1"
+    results = []
+
+    try:
+        owner = wait_for(lambda: lease_owner(db), timeout=30)
+        results.append(check("a worker acquired the poller lease", owner is not None, owner or ""))
+        wait_for(lambda: db.stations.count_documents({}) >= 500, timeout=30)
+
+        status_path = "/station_status.json"
+        before = gbfs.store.requests.get(status_path, 0)
+        time.sleep(window)
+        polls = gbfs.store.requests.get(status_path, 0) - before
+        expected = window / interval
+        results.append(check(
+            f"status feed polled by one worker with {workers} running",
+            polls <= expected + 2,
+            f"{polls} requests in {window}s, one poller ≈ {expected:.0f}"
+        ))
+
+        duplicates = list(db.alerts.aggregate([
+            {"$match": {"resolved": False}},
+            {"$group": {"_id": {"station_id": "$station_id", "type": "$type"}, "n": {"$sum": 1}}},
+            {"$match": {"n": {"$gt": 1}}}
+        ]))
+        results.append(check("no duplicate open alerts", not duplicates, f"{len(duplicates)} duplicated keys"))
+
+        def converged_etags():
+            etags = set()
+            with httpx.Client() as client:
+                for _ in range(workers * 6):
+                    # New connections spread requests across worker processes
+                    response = client.get(f"{base_url}/stations/manhattan", headers={"Connection": "close"})
+                    etags.add(response.headers.get("ETag"))
+            return etags if len(etags) == 1 else None
+
+        time.sleep(2)
+        results.append(check("all workers serve the same station snapshot", converged_etags() is not None))
+
+        leader_pid = int(owner.split(":")[1])
+        os.kill(leader_pid, signal.SIGKILL)
+        new_owner = wait_for(
+            lambda: (lease_owner(db) if lease_owner(db) != owner else None),
+            timeout=lease_seconds * 3
+        )
+        results.append(check(
+            "lease taken over after the leader was killed",
+            new_owner is not None,
+            f"{owner} -> {new_owner}"
+        ))
+
+        before = gbfs.store.requests.get(status_path, 0)
+        polled_again = wait_for(lambda: gbfs.store.requests.get(status_path, 0) > before, timeout=interval * 3)
+        results.append(check("polling continues on the new leader", bool(polled_again)))
+
+    finally:
+        os.killpg(api.pid, signal.SIGTERM)
+        api.wait(timeout=30)
+        gbfs.shutdown()
+        db.client.drop_database(database_name)
+
+    sys.exit(0 if all(results) else 1)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mongodb-url", default=os.environ.get("CHECK_MONGODB_URL", "mongodb://localhost:27017"))
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--api-port", type=int, default=8010)
+    parser.add_argument("--gbfs-port", type=int, default=8091)
+    parser.add_argument("--interval", type=int, default=6, help="UPDATE_INTERVAL for the workers (above the stub's 5s status ttl)")
+    parser.add_argument("--window", type=int, default=30)
+    args = parser.parse_args()
+    main(args.mongodb_url, args.workers, args.api_port, args.gbfs_port, args.interval, args.window)
@@ -0,0 +1,176 @@
+"""
+Load test for the live station stream. Thousands of subscribers are attached
+to the in-process broker, GBFS-like cycles are published, and fan-out latency
+(publish to frame dequeued by each subscriber) is reported. A share of
+subscribers can be made deliberately slow to show that backpressure resyncs
+them without delaying everyone else.
+
+With --url, real SSE connections are opened against a running API instead
+and latency is measured from each update's published_at.
+
+Usage (from backend/):
+    python -m benchmarks.load_station_stream --subscribers 5000 --cycles 20
+    python -m benchmarks.load_station_stream --url http://127.0.0.1:8000/api/v1 --subscribers 500 --duration 180
+"""
+import argparse
+import asyncio
+import random
+import statistics
+import time
+from datetime import datetime
+
+import httpx
+import orjson
+
+from app.services.station_stream import StationStreamBroker
+from benchmarks.bench_alert_writes import make_stations
+
+TENANTS = ["manhattan", "brooklyn"]
+
+def percentiles(samples):
+    if not samples:
+        return {"p50": 0.0, "p95": 0.0, "p99": 0.0, "max": 0.0}
+    ordered = sorted(samples)
+    pick = lambda q: ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+    return {"p50": pick(0.50), "p95": pick(0.95), "p99": pick(0.99), "max": ordered[-1]}
+
+def print_latency(label: str, samples):
+    stats = percentiles(samples)
+    print(
+        f"{label:<14} n={len(samples):<8} p50={stats['p50']:.2f}ms p95={stats['p95']:.2f}ms "
+        f"p99={stats['p99']:.2f}ms max={stats['max']:.2f}ms"
+    )
+
+def parse_frame(frame: bytes):
+    """Return (event, id, data) of one SSE frame"""
+    event, event_id, data = None, None, b""
+    head, _, body = frame.partition(b"data: ")
+    if body:
+        data = body.rstrip(b"\n")
+    for line in head.split(b"\n"):
+        if line.startswith(b"event: "):
+            event = line[7:].decode()
+        elif line.startswith(b"id: "):
+            event_id = int(line[4:])
+    return event, event_id, data
+
+async def consume(broker, tenant_id, published, latencies, delay: float):
+    async for frame in broker.stream(tenant_id):
+        received = time.perf_counter()
+        event, sequence, _ = parse_frame(frame)
+        if event == "update":
+            latencies.append((received - published[(tenant_id, sequence)]) * 1000)
+        if delay:
+            await asyncio.sleep(delay)
+
+async def run_in_process(subscribers: int, cycles: int, station_count: int, churn: float,
+                         interval: float, slow_ratio: float, queue_size: int, seed: int):
+    rng = random.Random(seed)
+    stations = make_stations(station_count, rng)
+    for station in stations:
+        station["lat"] = 40.7 + rng.random() / 10
+        station["lon"] = -73.95 - rng.random() / 20
+
+    broker = StationStreamBroker(queue_size=queue_size)
+    published = {}
+    fast_latencies, slow_latencies = [], []
+    slow_count = int(subscribers * slow_ratio)
+
+    tasks = []
+    for i in range(subscribers):
+        slow = i < slow_count
+        tasks.append(asyncio.create_task(consume(
+            broker,
+            TENANTS[i % len(TENANTS)],
+            published,
+            slow_latencies if slow else fast_latencies,
+            interval * 4 if slow else 0.0
+        )))
+    await asyncio.sleep(0.1)
+    print(f"{broker.subscriber_count()} subscribers connected ({slow_count} slow), queue size {queue_size}")
+
+    fanout_ms = []
+    for _ in range(cycles):
+        changed = rng.sample(stations, int(len(stations) * churn))
+        for station in changed:
+            status = station["current_status"]
+            bikes = min(station["capacity"], max(0, status["bikes_available"] + rng.randint(-3, 3)))
+            status["bikes_available"] = bikes
+            status["docks_available"] = station["capacity"] - bikes
+            status["last_updated"] = datetime.utcnow()
+
+        started = time.perf_counter()
+        for tenant_id in TENANTS:
+            published[(tenant_id, broker._sequence.get(tenant_id, 0) + 1)] = started
+        broker.publish_cycle(changed, {})
+        fanout_ms.append((time.perf_counter() - started) * 1000)
+        await asyncio.sleep(interval)
+
+    await asyncio.sleep(interval)
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+    print(f"publish+enqueue per cycle: mean={statistics.mean(fanout_ms):.2f}ms max={max(fanout_ms):.2f}ms")
+    print_latency("fast clients", fast_latencies)
+    print_latency("slow clients", slow_latencies)
+    stats = broker.stats()
+    print(f"frames delivered={stats['delivered']} resyncs={stats['resyncs']}")
+
+async def run_http(url: str, subscribers: int, duration: float):
+    latencies = []
+    errors = 0
+
+    async def subscriber(client, tenant_id):
+        nonlocal errors
+        try:
+            async with client.stream("GET", f"{url}/stations/{tenant_id}/stream") as response:
+                buffer = b""
+                async for chunk in response.aiter_bytes():
+                    buffer += chunk
+                    while b"\n\n" in buffer:
+                        frame, buffer = buffer.split(b"\n\n", 1)
+                        event, _, data = parse_frame(frame)
+                        if event == "update":
+                            published_at = datetime.fromisoformat(orjson.loads(data)["published_at"])
+                            latencies.append((datetime.utcnow() - published_at).total_seconds() * 1000)
+        except (httpx.HTTPError, asyncio.CancelledError) as e:
+            if not isinstance(e, asyncio.CancelledError):
+                errors += 1
+
+    limits = httpx.Limits(max_connections=subscribers + 10)
+    async with httpx.AsyncClient(timeout=None, limits=limits) as client:
+        tasks = [
+            asyncio.create_task(subscriber(client, TENANTS[i % len(TENANTS)]))
+            for i in range(subscribers)
+        ]
+        print(f"{subscribers} SSE connections open, collecting for {duration:.0f}s...")
+        await asyncio.sleep(duration)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    print_latency("updates", latencies)
+    print(f"connection errors={errors}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--subscribers", type=int, default=5000)
+    parser.add_argument("--cycles", type=int, default=20)
+    parser.add_argument("--stations", type=int, default=2000)
+    parser.add_argument("--churn", type=float, default=0.2)
+    parser.add_argument("--interval", type=float, default=0.5, help="seconds between simulated cycles")
+    parser.add_argument("--slow-ratio", type=float, default=0.05)
+    parser.add_argument("--queue-size", type=int, default=4)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--url", help="API base URL for the HTTP mode, e.g. http://127.0.0.1:8000/api/v1")
+    parser.add_argument("--duration", type=float, default=180.0)
+    args = parser.parse_args()
+
+    if args.url:
+        asyncio.run(run_http(args.url.rstrip("/"), args.subscribers, args.duration))
+    else:
+        asyncio.run(run_in_process(
+            args.subscribers, args.cycles, args.stations, args.churn,
+            args.interval, args.slow_ratio, args.queue_size, args.seed
+        ))
@@ -0,0 +1,150 @@
+"""
+In-process stand-in for MongoDB used by the benchmark suite when no mongod
+is available. Writes are counted and discarded and reads return nothing, so
+scenarios run against it measure the application's own CPU and memory cost
+without database latency. It is not a MongoDB emulator.
+"""
+from collections import Counter
+from typing import Dict
+
+class _Result:
+    def __init__(self, **fields):
+        self.__dict__.update(fields)
+
+class NullCursor:
+    def sort(self, *args, **kwargs):
+        return self
+
+    def limit(self, *args, **kwargs):
+        return self
+
+    def __iter__(self):
+        return iter(())
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        raise StopAsyncIteration
+
+    async def to_list(self, length=None):
+        return []
+
+class NullSyncCollection:
+    """pymongo-style collection: counts operations and documents written"""
+
+    def __init__(self, name: str, database: "NullSyncDatabase"):
+        self.name = name
+        self._database = database
+
+    def _count(self, operation: str, amount: int = 1):
+        self._database.operations[(self.name, operation)] += amount
+
+    def find(self, *args, **kwargs) -> NullCursor:
+        self._count("find")
+        return NullCursor()
+
+    def aggregate(self, *args, **kwargs) -> NullCursor:
+        self._count("aggregate")
+        return NullCursor()
+
+    def find_one(self, *args, **kwargs):
+        self._count("find_one")
+        return None
+
+    def find_one_and_update(self, filter: Dict, update, **kwargs):
+        self._count("find_one_and_update")
+        if isinstance(update, dict) and "$inc" in update:
+            # Version stamps still advance so cache invalidation paths run
+            versions = self._database.versions
+            versions[filter["_id"]] = versions.get(filter["_id"], 0) + 1
+            return {"_id": filter["_id"], "version": versions[filter["_id"]]}
+        return {"_id": filter.get("_id")}
+
+    def insert_many(self, documents, **kwargs):
+        documents = list(documents)
+        self._count("insert", len(documents))
+        return _Result(inserted_ids=[None] * len(documents))
+
+    def bulk_write(self, operations, **kwargs):
+        operations = list(operations)
+        self._count("bulk_write_ops", len(operations))
+        return _Result(bulk_api_result={})
+
+    def update_many(self, *args, **kwargs):
+        self._count("update_many")
+        return _Result(matched_count=0, modified_count=0)
+
+    def delete_many(self, *args, **kwargs):
+        self._count("delete_many")
+        return _Result(deleted_count=0)
+
+    def delete_one(self, *args, **kwargs):
+        self._count("delete_one")
+        return _Result(deleted_count=0)
+
+    def count_documents(self, *args, **kwargs) -> int:
+        self._count("count_documents")
+        return 0
+
+    def create_index(self, keys, **kwargs) -> str:
+        return "null_index"
+
+class NullCollection(NullSyncCollection):
+    """Motor-style collection: the same operations, awaitable where Motor's are"""
+
+    async def find_one(self, *args, **kwargs):
+        return super().find_one(*args, **kwargs)
+
+    async def find_one_and_update(self, *args, **kwargs):
+        return super().find_one_and_update(*args, **kwargs)
+
+    async def insert_many(self, *args, **kwargs):
+        return super().insert_many(*args, **kwargs)
+
+    async def bulk_write(self, *args, **kwargs):
+        return super().bulk_write(*args, **kwargs)
+
+    async def update_many(self, *args, **kwargs):
+        return super().update_many(*args, **kwargs)
+
+    async def delete_many(self, *args, **kwargs):
+        return super().delete_many(*args, **kwargs)
+
+    async def delete_one(self, *args, **kwargs):
+        return super().delete_one(*args, **kwargs)
+
+    async def count_documents(self, *args, **kwargs) -> int:
+        return super().count_documents(*args, **kwargs)
+
+    async def create_index(self, *args, **kwargs) -> str:
+        return super().create_index(*args, **kwargs)
+
+class NullSyncDatabase:
+    collection_class = NullSyncCollection
+
+    def __init__(self):
+        self.operations: Counter = Counter()
+        self.versions: Dict[str, int] = {}
+        self._collections: Dict[str, NullSyncCollection] = {}
+
+    def __getitem__(self, name: str):
+        collection = self._collections.get(name)
+        if collection is None:
+            collection = self._collections[name] = self.collection_class(name, self)
+        return collection
+
+    def __getattr__(self, name: str):
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return self[name]
+
+    def writes(self) -> int:
+        """Documents/operations written so far"""
+        return sum(
+            count for (_, operation), count in self.operations.items()
+            if operation in ("insert", "bulk_write_ops", "update_many", "delete_many", "delete_one")
+        )
+
+class NullDatabase(NullSyncDatabase):
+    collection_class = NullCollection
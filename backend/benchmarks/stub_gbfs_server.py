@@ -0,0 +1,148 @@
+"""
+Local stub GBFS server serving synthetic station_information and
+station_status feeds with ttl, ETag and Last-Modified support.
+
+Usage (from backend/):
+    python -m benchmarks.stub_gbfs_server --stations 2000 --port 8081
+
+Then point the API at it:
+    GBFS_INFO_URL=http://127.0.0.1:8081/station_information.json
+    GBFS_STATUS_URL=http://127.0.0.1:8081/station_status.json
+"""
+import argparse
+import hashlib
+import json
+import random
+import threading
+import time
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+def make_station_information(station_count: int, rng: random.Random) -> dict:
+    stations = []
+    for i in range(station_count):
+        stations.append({
+            "station_id": str(1000 + i),
+            "name": f"Synthetic St & {i} Ave",
+            "lat": round(rng.uniform(40.62, 40.82), 6),
+            "lon": round(rng.uniform(-74.02, -73.90), 6),
+            "capacity": rng.randint(15, 45)
+        })
+    return {"last_updated": int(time.time()), "ttl": 60, "data": {"stations": stations}}
+
+def make_station_status(information: dict, rng: random.Random, previous: dict = None, churn: float = 0.2) -> dict:
+    """Build a status feed, random-walking `churn` of the stations from `previous`"""
+    now = int(time.time())
+    previous_lookup = {
+        station["station_id"]: station
+        for station in (previous or {}).get("data", {}).get("stations", [])
+    }
+    stations = []
+    for info in information["data"]["stations"]:
+        capacity = info["capacity"]
+        old = previous_lookup.get(info["station_id"])
+        if old is None:
+            bikes = rng.randint(0, capacity)
+            last_reported = now
+        elif rng.random() < churn:
+            bikes = min(capacity, max(0, old["num_bikes_available"] + rng.randint(-3, 3)))
+            last_reported = now
+        else:
+            bikes = old["num_bikes_available"]
+            last_reported = old["last_reported"]
+        stations.append({
+            "station_id": info["station_id"],
+            "num_bikes_available": bikes,
+            "num_docks_available": capacity - bikes,
+            "is_installed": True,
+            "is_renting": rng.random() > 0.002,
+            "last_reported": last_reported
+        })
+    return {"last_updated": now, "ttl": 5, "data": {"stations": stations}}
+
+class FeedStore:
+    """Serialized feeds with validators, swapped under a lock"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._feeds = {}
+        self.requests = {}
+
+    def set(self, path: str, payload: dict):
+        body = json.dumps(payload).encode()
+        entry = (body, f'"{hashlib.md5(body).hexdigest()}"', formatdate(payload["last_updated"], usegmt=True))
+        with self._lock:
+            self._feeds[path] = entry
+
+    def get(self, path: str):
+        with self._lock:
+            self.requests[path] = self.requests.get(path, 0) + 1
+            return self._feeds.get(path)
+
+def make_handler(store: FeedStore):
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            entry = store.get(self.path)
+            if entry is None:
+                self.send_error(404)
+                return
+
+            body, etag, last_modified = entry
+            if self.headers.get("If-None-Match") == etag or self.headers.get("If-Modified-Since") == last_modified:
+                self.send_response(304)
+                self.send_header("ETag", etag)
+                self.end_headers()
+                return
+
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.send_header("ETag", etag)
+            self.send_header("Last-Modified", last_modified)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+def serve(station_count: int, port: int, update_seconds: float, churn: float, seed: int) -> ThreadingHTTPServer:
+    """Start the stub server in a background thread and return it"""
+    rng = random.Random(seed)
+    store = FeedStore()
+    information = make_station_information(station_count, rng)
+    status = make_station_status(information, rng)
+    store.set("/station_information.json", information)
+    store.set("/station_status.json", status)
+
+    def refresh():
+        nonlocal status
+        while True:
+            time.sleep(update_seconds)
+            status = make_station_status(information, rng, status, churn)
+            store.set("/station_status.json", status)
+
+    threading.Thread(target=refresh, daemon=True).start()
+    server = ThreadingHTTPServer(("127.0.0.1", port), make_handler(store))
+    server.store = store
+    server.information = information
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--stations", type=int, default=2000)
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--update-seconds", type=float, default=10.0)
+    parser.add_argument("--churn", type=float, default=0.2)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    serve(args.stations, args.port, args.update_seconds, args.churn, args.seed)
+    print(f"Serving {args.stations} synthetic stations on http://127.0.0.1:{args.port}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        pass
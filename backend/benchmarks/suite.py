@@ -0,0 +1,327 @@
+"""
+Reproducible benchmark suite. Scenarios:
+
+  gbfs_cycle   update_stations_data cycle time against the stub GBFS server
+               (first full write, then warm cycles with --churn of stations changing)
+  trip_ingest  process_trip_data throughput and peak RSS on synthetic trip CSVs
+               (run in a fresh process so RSS is not inflated by the suite)
+  routes       latency percentiles and throughput per GET route in api/routes.py
+               under --concurrency concurrent clients; the SSE stream and
+               POST /stations/refresh are covered by load_station_stream and
+               gbfs_cycle instead
+
+By default everything runs in-process against benchmarks.null_mongo, which
+discards writes and returns empty reads, so numbers reflect application cost
+only. With --mongodb-url, a throwaway database on that mongod is populated by
+the scenarios (stations/alerts by gbfs_cycle, trips by trip_ingest) and
+dropped afterwards. With --url, the routes scenario targets a running API.
+
+Results are written as JSON (--output) with one entry per metric; --compare
+diffs them against an earlier run and exits non-zero on regressions.
+
+Usage (from backend/):
+    python -m benchmarks.suite --output bench.json
+    python -m benchmarks.suite --mongodb-url mongodb://localhost:27017 --output bench.json
+    python -m benchmarks.suite --scenarios routes --url http://127.0.0.1:8000 --output bench.json
+    python -m benchmarks.suite --output new.json --compare bench.json --threshold 10
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import logging
+import multiprocessing
+import os
+import platform
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+SCENARIOS = ["gbfs_cycle", "trip_ingest", "routes"]
+PROCESS_TRIP_DATA = Path(__file__).resolve().parents[2] / "data" / "scripts" / "process_trip_data.py"
+
+ROUTES = [
+    "/api/v1/health",
+    "/api/v1/stations/manhattan",
+    "/api/v1/stations/nearby?lat=40.75&lon=-73.98&limit=10",
+    "/api/v1/stations/manhattan/history",
+    "/api/v1/alerts/manhattan",
+    "/api/v1/analytics/manhattan",
+    "/api/v1/flows/manhattan",
+    "/api/v1/cache/stats",
+    "/metrics"
+]
+
+class Results:
+    """Flat scenario.metric -> value records, so runs diff cleanly"""
+
+    def __init__(self):
+        self.metrics: Dict[str, Dict] = {}
+
+    def add(self, scenario: str, metric: str, value: float, unit: str, better: str = "lower"):
+        self.metrics[f"{scenario}.{metric}"] = {"value": round(float(value), 3), "unit": unit, "better": better}
+        print(f"  {scenario}.{metric:<40} {value:>12.2f} {unit}")
+
+    def add_latency(self, scenario: str, prefix: str, samples_ms: List[float]):
+        from benchmarks.load_station_stream import percentiles
+        for name, value in percentiles(samples_ms).items():
+            # A single max sample is too noisy to gate on
+            self.add(scenario, f"{prefix}.{name}_ms", value, "ms", better="none" if name == "max" else "lower")
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except Exception:
+        return None
+
+async def use_database(mongodb_url: Optional[str]):
+    """Point the app at the throwaway database, or at a null database"""
+    from app.database import connection
+    if connection.get_database() is not None:
+        return connection.get_database()
+    if mongodb_url:
+        await connection.connect_to_mongo()
+    else:
+        from benchmarks.null_mongo import NullDatabase
+        connection.database.database = NullDatabase()
+    return connection.get_database()
+
+def start_stub_gbfs(station_count: int, port: int, seed: int):
+    from benchmarks.stub_gbfs_server import serve
+    # Statuses are published by the scenario itself, one per cycle
+    server = serve(station_count, port, update_seconds=10**9, churn=0.0, seed=seed)
+    os.environ["GBFS_INFO_URL"] = f"http://127.0.0.1:{port}/station_information.json"
+    os.environ["GBFS_STATUS_URL"] = f"http://127.0.0.1:{port}/station_status.json"
+    return server
+
+async def run_gbfs_cycle(results: Results, args, server) -> None:
+    from app.services.gbfs_service import GBFSService
+    from benchmarks.null_mongo import NullDatabase
+    from benchmarks.stub_gbfs_server import make_station_status
+
+    db = await use_database(args.mongodb_url)
+    count_writes = db.writes if isinstance(db, NullDatabase) else (lambda: 0)
+    service = GBFSService()
+    service.info_url = os.environ["GBFS_INFO_URL"]
+    service.status_url = os.environ["GBFS_STATUS_URL"]
+    await service.start()
+    rng = random.Random(args.seed)
+    status = None
+    timings = []
+    # Distinct, already-expired last_updated values: every cycle fetches and sees a new feed
+    first_updated = int(time.time()) - args.cycles - 1
+    try:
+        for cycle in range(args.cycles + 1):
+            status = make_station_status(server.information, rng, status, args.churn)
+            status["last_updated"] = first_updated + cycle
+            status["ttl"] = 0
+            server.store.set("/station_status.json", status)
+            writes_before = count_writes()
+            if not await service.update_stations_data():
+                raise RuntimeError("GBFS cycle failed; see log output")
+            timings.append(dict(service.last_cycle_timings, db_writes=count_writes() - writes_before))
+    finally:
+        await service.close()
+
+    cold, warm = timings[0], timings[1:]
+    results.add("gbfs_cycle", "cold.total_ms", cold["total_ms"], "ms")
+    results.add("gbfs_cycle", "cold.write_ms", cold["write_ms"], "ms")
+    for phase in ("fetch", "transform", "write", "total"):
+        results.add_latency("gbfs_cycle", f"warm.{phase}", [timing[f"{phase}_ms"] for timing in warm])
+    results.add("gbfs_cycle", "warm.changed_ratio", sum(t["changed_ratio"] for t in warm) / len(warm), "ratio", better="none")
+    if not args.mongodb_url:
+        results.add("gbfs_cycle", "warm.db_writes", sum(t["db_writes"] for t in warm) / len(warm), "ops/cycle")
+
+def ingest_child(paths: List[str], chunksize: int, workers: int, use_null_db: bool, queue) -> None:
+    """Runs in a spawned interpreter: load the trips and report time and peak RSS"""
+    # On sys.path so the script's own spawned ingest workers can import it too
+    sys.path.insert(0, str(PROCESS_TRIP_DATA.parent))
+    import process_trip_data as module
+    if use_null_db:
+        from benchmarks.null_mongo import NullSyncDatabase
+        module._db = NullSyncDatabase()
+
+    started = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        module.process_trip_data(paths, chunksize=chunksize, workers=workers)
+    seconds = time.perf_counter() - started
+    peak_rss_kib = max(
+        resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    )
+    queue.put({"seconds": seconds, "peak_rss_mb": peak_rss_kib / 1024})
+
+def run_trip_ingest(results: Results, args, workdir: str) -> None:
+    from benchmarks.synthetic import write_trip_csvs
+
+    started = time.perf_counter()
+    paths = write_trip_csvs(os.path.join(workdir, "trips"), args.trips, args.months, args.stations, args.seed)
+    print(f"  generated {args.trips:,} trips in {len(paths)} CSV(s) in {time.perf_counter() - started:.1f}s")
+
+    # Spawned ingest workers would open real connections, so the null database loads in-process
+    workers = args.ingest_workers if args.mongodb_url else 1
+    context = multiprocessing.get_context("spawn")
+    queue = context.Queue()
+    child = context.Process(
+        target=ingest_child,
+        args=(paths, args.chunksize, workers, not args.mongodb_url, queue)
+    )
+    child.start()
+    child.join()
+    if child.exitcode != 0:
+        raise RuntimeError(f"trip ingest process exited with code {child.exitcode}")
+    outcome = queue.get()
+
+    results.add("trip_ingest", "seconds", outcome["seconds"], "s")
+    results.add("trip_ingest", "rows_per_sec", args.trips / outcome["seconds"], "rows/s", better="higher")
+    results.add("trip_ingest", "peak_rss_mb", outcome["peak_rss_mb"], "MiB")
+    results.add("trip_ingest", "workers", workers, "processes", better="none")
+
+async def load_route(client, path: str, requests: int, concurrency: int):
+    latencies, errors = [], 0
+    remaining = iter(range(requests))
+
+    async def worker():
+        nonlocal errors
+        for _ in remaining:
+            started = time.perf_counter()
+            response = await client.get(path)
+            latencies.append((time.perf_counter() - started) * 1000)
+            errors += response.status_code >= 400
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return latencies, errors, time.perf_counter() - started
+
+async def run_routes(results: Results, args, server) -> None:
+    import httpx
+
+    if args.url:
+        transport = None
+        base_url = args.url.rstrip("/")
+    else:
+        from app.main import app
+        from app.services.station_cache import station_cache
+        await use_database(args.mongodb_url)
+        if not station_cache.is_ready:
+            from app.services.gbfs_service import gbfs_service
+            gbfs_service.info_url = os.environ["GBFS_INFO_URL"]
+            gbfs_service.status_url = os.environ["GBFS_STATUS_URL"]
+            await gbfs_service.start()
+            await gbfs_service.update_stations_data()
+        transport = httpx.ASGITransport(app=app)
+        base_url = "http://bench"
+
+    limits = httpx.Limits(max_connections=args.concurrency)
+    async with httpx.AsyncClient(transport=transport, base_url=base_url, limits=limits, timeout=60) as client:
+        for path in ROUTES:
+            await client.get(path)  # warm caches; steady-state latency is what is compared
+            latencies, errors, seconds = await load_route(client, path, args.requests, args.concurrency)
+            label = path.split("?")[0].replace("/api/v1", "").strip("/").replace("/", "_") or "root"
+            results.add_latency("routes", label, latencies)
+            results.add("routes", f"{label}.rps", len(latencies) / seconds, "req/s", better="higher")
+            if errors:
+                results.add("routes", f"{label}.errors", errors, "requests")
+
+def compare(current: Dict, baseline_path: str, threshold: float) -> bool:
+    """Print per-metric changes against a baseline; return True if any metric regressed"""
+    with open(baseline_path) as handle:
+        baseline = json.load(handle)
+    print(f"\nComparison with {baseline_path} (commit {baseline.get('git_commit')}):")
+    for key in ("database", "parameters", "cpu_count"):
+        if baseline.get(key) != current.get(key):
+            print(f"  note: {key} differs from the baseline, so changes may not be comparable")
+    regressed = False
+    for name, metric in current["metrics"].items():
+        previous = baseline["metrics"].get(name)
+        if previous is None or not previous["value"]:
+            continue
+        change = (metric["value"] - previous["value"]) / previous["value"] * 100
+        worse = change if metric["better"] == "lower" else -change if metric["better"] == "higher" else 0
+        flag = "REGRESSED" if worse > threshold else "improved" if worse < -threshold else ""
+        regressed |= flag == "REGRESSED"
+        print(f"  {name:<50} {previous['value']:>12.2f} -> {metric['value']:>12.2f} {metric['unit']:<8} {change:+7.1f}% {flag}")
+    return regressed
+
+async def run(args) -> Dict:
+    results = Results()
+    server = start_stub_gbfs(args.stations, args.gbfs_port, args.seed)
+    try:
+        with tempfile.TemporaryDirectory(prefix="bikescope-bench-") as workdir:
+            for scenario in args.scenarios:
+                print(f"▶ {scenario}")
+                if scenario == "gbfs_cycle":
+                    await run_gbfs_cycle(results, args, server)
+                elif scenario == "trip_ingest":
+                    run_trip_ingest(results, args, workdir)
+                elif scenario == "routes":
+                    await run_routes(results, args, server)
+    finally:
+        server.shutdown()
+        if args.mongodb_url and not args.keep_database:
+            from pymongo import MongoClient
+            MongoClient(args.mongodb_url).drop_database(os.environ["DATABASE_NAME"])
+
+    return {
+        "suite": "bikescope",
+        "created_at": datetime.utcnow().isoformat() + "Z",
+        "git_commit": git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "database": "mongod" if args.mongodb_url else "null",
+        "parameters": {
+            key: value for key, value in vars(args).items()
+            if key not in ("output", "compare", "mongodb_url")
+        },
+        "metrics": results.metrics
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=SCENARIOS)
+    parser.add_argument("--mongodb-url", default=None, help="Run against a throwaway database on this mongod")
+    parser.add_argument("--keep-database", action="store_true")
+    parser.add_argument("--url", default=None, help="Base URL of a running API for the routes scenario")
+    parser.add_argument("--stations", type=int, default=2000)
+    parser.add_argument("--cycles", type=int, default=20)
+    parser.add_argument("--churn", type=float, default=0.2)
+    parser.add_argument("--trips", type=int, default=500_000)
+    parser.add_argument("--months", type=int, default=2)
+    parser.add_argument("--chunksize", type=int, default=100_000)
+    parser.add_argument("--ingest-workers", type=int, default=2)
+    parser.add_argument("--requests", type=int, default=500, help="Requests per route")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--gbfs-port", type=int, default=8092)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", default=None, help="Write results JSON here")
+    parser.add_argument("--compare", default=None, help="Baseline results JSON to diff against")
+    parser.add_argument("--threshold", type=float, default=10.0, help="Percent change counted as a regression")
+    args = parser.parse_args()
+
+    # Settings are read at import time, so configure the app before importing it
+    os.environ.setdefault("DB_PASSWORD", "unused")
+    os.environ["MONGODB_URL"] = args.mongodb_url or "mongodb://unused:27017"
+    os.environ["DATABASE_NAME"] = f"bikescope_bench_{os.getpid()}"
+    os.environ.setdefault("ANALYTICS_BACKEND", "mongo")
+
+    logging.basicConfig(level=logging.WARNING, format="%(name)s - %(levelname)s - %(message)s")
+    report = asyncio.run(run(args))
+    if args.output:
+        with open(args.output, "w") as handle:
+            json.dump(report, handle, indent=2, sort_keys=True)
+        print(f"\nResults written to {args.output}")
+    if args.compare and compare(report, args.compare, args.threshold):
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Synthetic trip CSVs in the current Citi Bike export format, one file per
+month, with start/end stations taken from the stub GBFS station set (same
+seed, so trips reference stations the API knows). Station popularity is
+Zipf-skewed and about 1% of rows are invalid to exercise cleaning.
+Synthetic GBFS feeds come from benchmarks.stub_gbfs_server.
+
+Usage (from backend/):
+    python -m benchmarks.synthetic --rows 1000000 --months 3 --out /tmp/bikescope-trips
+"""
+import argparse
+import os
+import random
+import time
+from typing import List
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.stub_gbfs_server import make_station_information
+
+def write_trip_csvs(directory: str, rows: int, months: int, station_count: int = 2000,
+                    seed: int = 42, first_month: str = "2024-01") -> List[str]:
+    """Write `rows` trips spread over `months` monthly CSVs and return their paths"""
+    os.makedirs(directory, exist_ok=True)
+    stations = make_station_information(station_count, random.Random(seed))["data"]["stations"]
+    station_ids = np.array([station["station_id"] for station in stations], dtype=object)
+    names = np.array([station["name"] for station in stations], dtype=object)
+    lats = np.array([station["lat"] for station in stations])
+    lons = np.array([station["lon"] for station in stations])
+
+    rng = np.random.default_rng(seed)
+    weights = 1.0 / np.arange(1, station_count + 1) ** 0.8
+    weights /= weights.sum()
+
+    paths = []
+    month_starts = pd.date_range(first_month, periods=months + 1, freq="MS")
+    for month, (month_start, month_end) in enumerate(zip(month_starts[:-1], month_starts[1:])):
+        count = rows // months + (1 if month < rows % months else 0)
+        origins = rng.choice(station_count, size=count, p=weights)
+        destinations = rng.choice(station_count, size=count, p=weights)
+        offsets = rng.uniform(0, (month_end - month_start).total_seconds(), size=count)
+        started_at = month_start + pd.to_timedelta(np.sort(offsets), unit="s")
+        durations = rng.lognormal(mean=6.5, sigma=0.7, size=count)
+        ended_at = started_at + pd.to_timedelta(durations, unit="s")
+
+        start_station_ids = station_ids[origins].copy()
+        start_station_ids[rng.random(count) < 0.01] = None
+
+        frame = pd.DataFrame({
+            "ride_id": [f"{month:02d}{i:010d}" for i in range(count)],
+            "rideable_type": np.where(rng.random(count) < 0.3, "electric_bike", "classic_bike"),
+            "started_at": started_at.strftime("%Y-%m-%d %H:%M:%S"),
+            "ended_at": ended_at.strftime("%Y-%m-%d %H:%M:%S"),
+            "start_station_name": names[origins],
+            "start_station_id": start_station_ids,
+            "end_station_name": names[destinations],
+            "end_station_id": station_ids[destinations],
+            "start_lat": lats[origins],
+            "start_lng": lons[origins],
+            "end_lat": lats[destinations],
+            "end_lng": lons[destinations],
+            "member_casual": np.where(rng.random(count) < 0.75, "member", "casual")
+        })
+        path = os.path.join(directory, f"{month_start:%Y%m}-synthetic-tripdata.csv")
+        frame.to_csv(path, index=False)
+        paths.append(path)
+    return paths
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--months", type=int, default=3)
+    parser.add_argument("--stations", type=int, default=2000)
+    parser.add_argument("--first-month", default="2024-01")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--out", required=True)
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    paths = write_trip_csvs(args.out, args.rows, args.months, args.stations, args.seed, args.first_month)
+    print(f"Wrote {args.rows:,} trips to {len(paths)} file(s) in {time.perf_counter() - started:.1f}s")
+    for path in paths:
+        print(f"  {path}")
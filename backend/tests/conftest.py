@@ -0,0 +1,18 @@
+import os
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+# Settings are read at import time; the routes under test never reach MongoDB
+os.environ.setdefault("DB_PASSWORD", "test")
+os.environ.setdefault("MONGODB_URL", "mongodb://localhost:27017")
+os.environ.setdefault("DATABASE_NAME", "bikescope_test")
+
+@pytest.fixture
+def client():
+    from app.api.routes import router
+
+    app = FastAPI()
+    app.include_router(router, prefix="/api/v1")
+    return TestClient(app)
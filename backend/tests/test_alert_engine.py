@@ -0,0 +1,38 @@
+from app.services.alert_service import AlertEngine
+from app.services.incident_stats import incident_stats_service
+
+def station(station_id, bikes=0, docks=10):
+    return {
+        "station_id": station_id,
+        "tenant_id": "manhattan",
+        "name": f"Station {station_id}",
+        "current_status": {
+            "bikes_available": bikes,
+            "docks_available": docks,
+            "is_installed": True,
+            "is_renting": True
+        }
+    }
+
+def test_alerts_of_removed_stations_are_resolved():
+    engine = AlertEngine()
+    engine.evaluate([station("A"), station("B")])
+    incident_stats_service.take_operations()
+    assert engine.open_alert_count == 2
+
+    operations = engine.evaluate([], removed_ids={"A"})
+
+    assert engine.last_cycle_counts["resolved"] == 1
+    assert engine.open_alert_count == 1
+    assert [operation._doc["$set"]["resolved"] for operation in operations] == [True]
+    # The removed station's open time is credited to its incident stats
+    stats = incident_stats_service.take_operations()
+    assert [operation._filter["station_id"] for operation in stats] == ["A"]
+
+def test_stations_not_passed_in_keep_their_alerts():
+    engine = AlertEngine()
+    engine.evaluate([station("A")])
+    incident_stats_service.take_operations()
+
+    assert engine.evaluate([]) == []
+    assert engine.open_alert_count == 1
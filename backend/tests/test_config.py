@@ -0,0 +1,22 @@
+from pathlib import Path
+
+import pytest
+from pydantic import ValidationError
+
+from app.core import config
+from app.core.config import REPO_ROOT, Settings
+
+def test_relative_parquet_path_resolves_from_repo_root(monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)
+    settings = Settings(parquet_trip_path="data/parquet/trips")
+    assert Path(settings.parquet_trip_path) == REPO_ROOT / "data" / "parquet" / "trips"
+    assert (REPO_ROOT / "backend" / "app").is_dir()
+
+def test_absolute_parquet_path_is_kept(tmp_path):
+    assert Settings(parquet_trip_path=str(tmp_path)).parquet_trip_path == str(tmp_path)
+
+def test_parquet_backend_requires_pyarrow(monkeypatch):
+    monkeypatch.setattr(config, "find_spec", lambda name: None)
+    with pytest.raises(ValidationError, match="requires pyarrow"):
+        Settings(analytics_backend="parquet")
+    assert Settings(analytics_backend="mongo").analytics_backend == "mongo"
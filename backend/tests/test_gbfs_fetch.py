@@ -0,0 +1,105 @@
+import asyncio
+import time
+
+import pytest
+
+from app.services.gbfs_service import GBFSService
+from benchmarks.stub_gbfs_server import serve
+
+INFO_PATH = "/station_information.json"
+
+@pytest.fixture
+def stub_server():
+    # Port 0 picks a free port; feeds are only replaced by the tests themselves
+    server = serve(station_count=20, port=0, update_seconds=3600, churn=0.2, seed=7)
+    yield server
+    server.shutdown()
+
+def fetch_sequence(server, steps):
+    """Run steps (callables taking the service and feed URL) on one service instance"""
+    async def run():
+        service = GBFSService()
+        url = f"http://127.0.0.1:{server.server_port}{INFO_PATH}"
+        await service.start()
+        try:
+            for step in steps:
+                await step(service, url)
+        finally:
+            if service._client is not None:
+                await service._client.aclose()
+
+    asyncio.run(run())
+
+def expire(service, url, keep_validators=True):
+    feed = service._feeds[url]
+    feed.expires_at = 0.0
+    if not keep_validators:
+        feed.etag = None
+        feed.last_modified = None
+
+def test_feed_within_ttl_is_not_requested(stub_server):
+    async def first(service, url):
+        payload = await service.fetch_gbfs_data(url)
+        assert payload["data"]["stations"]
+        assert service._feeds[url].changed
+        assert stub_server.store.requests[INFO_PATH] == 1
+
+    async def second(service, url):
+        payload = await service.fetch_gbfs_data(url)
+        feed = service._feeds[url]
+        assert payload is feed.payload
+        assert not feed.changed
+        assert feed.ttl_skips == 1
+        assert stub_server.store.requests[INFO_PATH] == 1
+
+    fetch_sequence(stub_server, [first, second])
+
+def test_not_modified_keeps_cached_payload(stub_server):
+    cached = {}
+
+    async def first(service, url):
+        cached["payload"] = await service.fetch_gbfs_data(url)
+        expire(service, url)
+
+    async def revalidate(service, url):
+        payload = await service.fetch_gbfs_data(url)
+        feed = service._feeds[url]
+        assert stub_server.store.requests[INFO_PATH] == 2
+        assert feed.not_modified == 1
+        assert not feed.changed
+        assert payload is cached["payload"]
+        assert feed.payload is cached["payload"]
+
+    fetch_sequence(stub_server, [first, revalidate])
+
+def test_unchanged_body_is_not_marked_changed(stub_server):
+    async def first(service, url):
+        await service.fetch_gbfs_data(url)
+        # Without validators the server answers 200 with the same body
+        expire(service, url, keep_validators=False)
+
+    async def refetch(service, url):
+        await service.fetch_gbfs_data(url)
+        feed = service._feeds[url]
+        assert feed.fetches == 2
+        assert feed.not_modified == 0
+        assert not feed.changed
+
+    fetch_sequence(stub_server, [first, refetch])
+
+def test_changed_body_is_marked_changed(stub_server):
+    async def first(service, url):
+        await service.fetch_gbfs_data(url)
+        updated = dict(stub_server.information, last_updated=int(time.time()) + 1)
+        updated["data"] = {"stations": stub_server.information["data"]["stations"][:5]}
+        stub_server.store.set(INFO_PATH, updated)
+        expire(service, url)
+
+    async def refetch(service, url):
+        payload = await service.fetch_gbfs_data(url)
+        feed = service._feeds[url]
+        assert feed.changed
+        assert feed.not_modified == 0
+        assert len(payload["data"]["stations"]) == 5
+
+    fetch_sequence(stub_server, [first, refetch])
@@ -0,0 +1,62 @@
+import asyncio
+
+from app.services.result_cache import ResultCache
+
+def test_invalidate_discards_in_flight_result():
+    async def run():
+        cache = ResultCache("test_invalidate_in_flight", max_entries=8, ttl_seconds=60)
+        release = asyncio.Event()
+        calls = []
+
+        async def compute():
+            calls.append(len(calls))
+            if len(calls) == 1:
+                await release.wait()
+                return "stale"
+            return "fresh"
+
+        stale = asyncio.ensure_future(cache.get_or_compute("key", compute))
+        await asyncio.sleep(0)
+        cache.invalidate()
+
+        # A lookup after the invalidation does not join the stale computation
+        assert await cache.get_or_compute("key", compute) == "fresh"
+
+        release.set()
+        assert await stale == "stale"
+        assert await cache.get_or_compute("key", compute) == "fresh"
+        assert len(calls) == 2
+
+    asyncio.run(run())
+
+def test_version_bump_discards_in_flight_result():
+    async def run():
+        version = {"value": 1}
+
+        async def version_source():
+            return version["value"]
+
+        cache = ResultCache(
+            "test_version_in_flight", max_entries=8, ttl_seconds=60,
+            version_source=version_source, version_check_seconds=0
+        )
+        release = asyncio.Event()
+        results = iter(["stale", "fresh"])
+
+        async def compute():
+            value = next(results)
+            if value == "stale":
+                await release.wait()
+            return value
+
+        stale = asyncio.ensure_future(cache.get_or_compute("key", compute))
+        await asyncio.sleep(0)
+        version["value"] = 2
+        assert await cache.get_or_compute("key", compute) == "fresh"
+
+        release.set()
+        await stale
+        assert await cache.get_or_compute("key", compute) == "fresh"
+        assert cache.stats()["entries"] == 1
+
+    asyncio.run(run())
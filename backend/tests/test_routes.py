@@ -0,0 +1,35 @@
+from datetime import datetime
+
+from app.models.schemas import Analytics
+from app.services.analytics_service import analytics_service
+
+def test_analytics_rejects_inverted_mixed_timezone_range(client):
+    response = client.get(
+        "/api/v1/analytics/manhattan",
+        params={"start": "2024-01-02T00:00:00Z", "end": "2024-01-01T00:00:00"}
+    )
+    assert response.status_code == 400
+    assert response.json()["detail"] == "start must be before end"
+
+def test_analytics_normalizes_mixed_timezone_bounds(client, monkeypatch):
+    calls = []
+
+    async def fake_analytics(tenant_id, start=None, end=None, station_id=None):
+        calls.append((start, end))
+        return Analytics(top_stations=[], avg_trip_duration=0, peak_hour=0, total_trips=0)
+
+    monkeypatch.setattr(analytics_service, "get_tenant_analytics", fake_analytics)
+    response = client.get(
+        "/api/v1/analytics/manhattan",
+        params={"start": "2024-01-01T05:00:00+05:00", "end": "2024-01-02T00:00:00"}
+    )
+    assert response.status_code == 200
+    assert calls == [(datetime(2024, 1, 1, 0, 0), datetime(2024, 1, 2, 0, 0))]
+
+def test_flows_rejects_inverted_mixed_timezone_range(client):
+    response = client.get(
+        "/api/v1/flows/manhattan",
+        params={"start": "2024-01-02T00:00:00Z", "end": "2024-01-01T00:00:00"}
+    )
+    assert response.status_code == 400
+    assert response.json()["detail"] == "start must be before end"
@@ -0,0 +1,24 @@
+import asyncio
+
+from app.services.station_stream import StationStreamBroker
+
+def test_end_streams_finishes_open_streams():
+    async def run():
+        broker = StationStreamBroker(queue_size=4)
+        stream = broker.stream("manhattan")
+        reader = asyncio.ensure_future(stream.__anext__())
+        await asyncio.sleep(0)
+        assert broker.subscriber_count("manhattan") == 1
+
+        await broker.close()
+        try:
+            await asyncio.wait_for(reader, timeout=1)
+            raise AssertionError("stream yielded after close")
+        except StopAsyncIteration:
+            pass
+        assert broker.subscriber_count() == 0
+
+        # Streams opened after shutdown end immediately
+        assert [frame async for frame in broker.stream("manhattan")] == []
+
+    asyncio.run(run())
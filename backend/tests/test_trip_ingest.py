@@ -0,0 +1,69 @@
+import os
+import sys
+from datetime import datetime
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "..", "data", "scripts"))
+import process_trip_data
+
+HEADER = "started_at,ended_at,start_station_id,end_station_id,start_lat,start_lng\n"
+VALID_ROW = "2024-01-02 08:00:00,2024-01-02 08:10:00,S1,S2,40.75,-73.99\n"
+# Shorter than the 60 second minimum, so clean_chunk drops it
+INVALID_ROW = "2024-01-03 08:00:00,2024-01-03 08:00:30,S1,S2,40.75,-73.99\n"
+
+class FakeTrips:
+    """Trips collection holding one previous load of the file"""
+
+    def __init__(self, previous_range=None):
+        self.previous_range = previous_range
+        self.deleted = []
+        self.inserted = []
+
+    def aggregate(self, pipeline):
+        if self.previous_range is None:
+            return []
+        return [{"_id": None, "start": self.previous_range[0], "end": self.previous_range[1]}]
+
+    def delete_many(self, query):
+        self.deleted.append(query)
+        return type("DeleteResult", (), {"deleted_count": 3})()
+
+    def insert_many(self, documents, ordered=True):
+        self.inserted.extend(documents)
+
+@pytest.fixture
+def trips(monkeypatch):
+    collection = FakeTrips(previous_range=(datetime(2023, 12, 30, 9), datetime(2023, 12, 31, 18)))
+    monkeypatch.setattr(process_trip_data, "_db", type("FakeDb", (), {"trips": collection})())
+    return collection
+
+def write_csv(tmp_path, rows):
+    path = tmp_path / "trips.csv"
+    path.write_text(HEADER + "".join(rows))
+    return str(path)
+
+def test_all_invalid_file_still_replaces_previous_load(tmp_path, trips):
+    stats = process_trip_data.process_trip_file(write_csv(tmp_path, [INVALID_ROW, INVALID_ROW]), chunksize=1)
+
+    assert stats["error"] is None
+    assert stats["rows_read"] == 2
+    assert stats["rows_loaded"] == 0
+    assert trips.deleted == [{"source_file": "trips.csv"}]
+    assert trips.inserted == []
+    # The removed trips' days still need their rollups rebuilt
+    assert stats["rows_deleted"] == 3
+    assert stats["range_start"] == datetime(2023, 12, 30)
+    assert stats["range_end"] == datetime(2024, 1, 1)
+
+def test_invalid_chunk_between_valid_chunks(tmp_path, trips):
+    stats = process_trip_data.process_trip_file(
+        write_csv(tmp_path, [INVALID_ROW, VALID_ROW, INVALID_ROW]), chunksize=1
+    )
+
+    assert stats["error"] is None
+    assert stats["rows_loaded"] == 1
+    assert len(trips.deleted) == 1
+    assert [trip["start_station_id"] for trip in trips.inserted] == ["S1"]
+    assert stats["range_start"] == datetime(2023, 12, 30)
+    assert stats["range_end"] == datetime(2024, 1, 3)
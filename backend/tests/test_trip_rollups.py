@@ -0,0 +1,25 @@
+from datetime import datetime
+
+from app.services import trip_rollups
+
+class FakeTrips:
+    def __init__(self, started):
+        self.started = started
+
+    def find_one(self, query, projection, sort):
+        (_, direction), = sort
+        started = min(self.started) if direction == 1 else max(self.started)
+        return {"started_at": started}
+
+def test_backfill_covers_every_trip_day_in_batches(monkeypatch):
+    db = type("FakeDb", (), {"trips": FakeTrips([datetime(2024, 1, 31, 23, 59), datetime(2024, 3, 5, 8, 30)])})()
+    rebuilt = []
+    monkeypatch.setattr(trip_rollups, "rebuild_rollups", lambda db, start, end: rebuilt.append((start, end)) or 1)
+
+    total = trip_rollups.backfill_rollups(db, batch_days=20, progress=lambda message: None)
+
+    assert rebuilt == [
+        (datetime(2024, 1, 31), datetime(2024, 2, 20)),
+        (datetime(2024, 2, 20), datetime(2024, 3, 6)),
+    ]
+    assert total == 2
@@ -1,90 +1,69 @@
 import pandas as pd
 import sys
 import os
+import argparse
+import glob
+import multiprocessing
+import resource
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
 from datetime import datetime
 import pymongo
 from dotenv import load_dotenv
 
+load_dotenv()
+
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..', 'backend'))
-from app.database.connection import trips_collection, stations_collection
+from app.database.connection import get_sync_database
+from app.core.config import settings
+from app.core.tenants import classify_tenants, get_tenant_index
+from app.services.coordination import TRIPS_VERSION, bump_version_sync
+from app.services.parquet_store import TripParquetWriter
+from app.services.trip_rollups import backfill_rollups, rebuild_rollups
 
-load_dotenv()
+_db = None
 
-def assign_tenant_from_coordinates(lat, lon):
-    """Assign tenant based on station coordinates - Manhattan vs Brooklyn only"""
-    if pd.isna(lat) or pd.isna(lon):
-        return "manhattan"  # default
-    
-    if lat < 40.68:  # South Brooklyn (Coney Island, Bay Ridge area)
-        return "brooklyn"
-    elif lat < 40.72 and lon > -73.98:  # Central/North Brooklyn (Williamsburg, DUMBO, Brooklyn Heights)
-        return "brooklyn"
-    elif lat < 40.71 and lon > -73.95:  # Eastern Brooklyn areas
-        return "brooklyn"
-    else:
-        # Everything else (Manhattan, Bronx, Staten Island, etc.) goes to Manhattan
-        return "manhattan"
+def get_db():
+    """Open the MongoDB connection lazily, once per process (clients are not fork-safe)"""
+    global _db
+    if _db is None:
+        _db = get_sync_database()
+    return _db
 
-def process_trip_data(csv_file_path):
-    """Process historical trip data and load into MongoDB"""
-    
-    print(f"Loading trip data from: {csv_file_path}")
-    
+DEFAULT_CHUNKSIZE = 100_000
+
+COLUMN_MAPPING = {
+    'starttime': 'started_at',
+    'stoptime': 'ended_at',
+    'start time': 'started_at',
+    'stop time': 'ended_at',
+    'start station id': 'start_station_id',
+    'end station id': 'end_station_id',
+    'start station latitude': 'start_station_latitude',
+    'start station longitude': 'start_station_longitude',
+    'tripduration': 'duration_seconds',
+    'start_lat': 'start_station_latitude',
+    'start_lng': 'start_station_longitude'
+}
+
+REQUIRED_COLUMNS = ['started_at', 'ended_at', 'start_station_id']
+
+TRIP_FIELDS = ['tenant_id', 'started_at', 'ended_at', 'start_station_id', 'end_station_id', 'duration_seconds']
+
+def load_station_lookup():
+    """Load station_id -> tenant_id for files without coordinates"""
     try:
-        df = pd.read_csv(csv_file_path, low_memory=False)
-        print(f"Loaded {len(df)} trip records")
+        stations_cursor = get_db().stations.find({}, {"station_id": 1, "tenant_id": 1})
+        station_lookup = {str(station["station_id"]): station["tenant_id"] for station in stations_cursor}
+        print(f"Loaded {len(station_lookup)} stations for tenant lookup")
+        return station_lookup
     except Exception as e:
-        print(f"Error loading CSV: {e}")
-        return
-    
-    df.columns = df.columns.str.strip()
-    
-    print("Available columns:", df.columns.tolist())
-    
-    column_mapping = {
-        'starttime': 'started_at',
-        'stoptime': 'ended_at',
-        'start time': 'started_at',
-        'stop time': 'ended_at',
-        'start station id': 'start_station_id',
-        'end station id': 'end_station_id',
-        'start station latitude': 'start_station_latitude',
-        'start station longitude': 'start_station_longitude',
-        'tripduration': 'duration_seconds',
-        'start_lat': 'start_station_latitude',
-        'start_lng': 'start_station_longitude'
-    }
-    
-    df = df.rename(columns=column_mapping)
-    
-    required_cols = ['started_at', 'ended_at', 'start_station_id']
-    
-    has_coordinates = 'start_station_latitude' in df.columns and 'start_station_longitude' in df.columns
-    
-    if not has_coordinates:
-        print("No coordinate data found in CSV. Will use station lookup for tenant assignment.")
-        try:
-            stations_cursor = stations_collection.find({}, {"station_id": 1, "tenant_id": 1})
-            station_lookup = {str(station["station_id"]): station["tenant_id"] for station in stations_cursor}
-            print(f"Loaded {len(station_lookup)} stations for tenant lookup")
-        except Exception as e:
-            print(f"Error loading stations from database: {e}")
-            print("Using coordinate-based assignment as fallback")
-            station_lookup = {}
-            if 'start_lat' in df.columns and 'start_lng' in df.columns:
-                has_coordinates = True
-                df['start_station_latitude'] = df['start_lat']
-                df['start_station_longitude'] = df['start_lng']
-    
-    missing_cols = [col for col in required_cols if col not in df.columns]
-    if missing_cols:
-        print(f"Missing required columns: {missing_cols}")
-        return
-    
-    print("Cleaning data...")
-    initial_count = len(df)
-    
-    df = df.dropna(subset=required_cols)
+        print(f"Error loading stations from database: {e}")
+        return {}
+
+def clean_chunk(df):
+    """Normalize, validate and derive durations for one chunk of raw trips"""
+    df = df.dropna(subset=REQUIRED_COLUMNS)
     
     df['started_at'] = pd.to_datetime(df['started_at'])
     df['ended_at'] = pd.to_datetime(df['ended_at'])
@@ -98,78 +77,311 @@ def process_trip_data(csv_file_path):
     df = df.dropna(subset=['duration_seconds'])
     
     df = df[(df['duration_seconds'] >= 60) & (df['duration_seconds'] <= 86400)]
-    
-    print(f"After cleaning: {len(df)} records (removed {initial_count - len(df)} invalid records)")
-    
-    print("Assigning tenants...")
+    return df
+
+def assign_tenants(df, has_coordinates, station_lookup):
     if has_coordinates:
-        print("Using coordinate-based tenant assignment")
-        df['tenant_id'] = df.apply(
-            lambda row: assign_tenant_from_coordinates(
-                row['start_station_latitude'], 
-                row['start_station_longitude']
-            ), axis=1
+        df['tenant_id'] = classify_tenants(
+            pd.to_numeric(df['start_station_latitude'], errors='coerce').to_numpy(),
+            pd.to_numeric(df['start_station_longitude'], errors='coerce').to_numpy()
         )
     else:
-        print("Using station lookup for tenant assignment")
-        df['tenant_id'] = df['start_station_id'].map(station_lookup).fillna('manhattan')
+        df['tenant_id'] = df['start_station_id'].map(station_lookup).fillna(get_tenant_index().default_tenant)
+    return df
+
+def chunk_to_documents(df, source_file):
+    """Convert a cleaned chunk to trip documents column-wise, without iterrows"""
+    df = df[TRIP_FIELDS].copy()
+    df['duration_seconds'] = df['duration_seconds'].astype('int64')
+    df['source_file'] = source_file
+    return df.to_dict('records')
+
+def previous_load_range(trips_collection, source_file):
+    """(first, last) started_at of a file's previous load, or None if it was never loaded"""
+    rows = list(trips_collection.aggregate([
+        {"$match": {"source_file": source_file}},
+        {"$group": {"_id": None, "start": {"$min": "$started_at"}, "end": {"$max": "$started_at"}}}
+    ]))
+    if not rows or rows[0]["start"] is None:
+        return None
+    return rows[0]["start"], rows[0]["end"]
+
+def write_chunk(documents, source_file, replace_existing):
+    """
+    Insert a chunk; the first chunk of a file first removes that file's previous load.
+    Returns the number of trips removed and the range they covered, whose rollups
+    must be rebuilt even if the new load covers fewer days or fails partway.
+    """
+    trips_collection = get_db().trips
+    deleted = 0
+    replaced_range = None
+    if replace_existing:
+        replaced_range = previous_load_range(trips_collection, source_file)
+        if replaced_range is not None:
+            deleted = trips_collection.delete_many({"source_file": source_file}).deleted_count
+    if documents:
+        trips_collection.insert_many(documents, ordered=False)
+    return deleted, replaced_range
+
+def extend_range(stats, first, last):
+    """Widen the file's affected day range to cover [first, last]"""
+    range_start = pd.Timestamp(first).normalize()
+    range_end = pd.Timestamp(last).normalize() + pd.Timedelta(days=1)
+    if stats["range_start"] is None or range_start < stats["range_start"]:
+        stats["range_start"] = range_start
+    if stats["range_end"] is None or range_end > stats["range_end"]:
+        stats["range_end"] = range_end
+
+def record_write(stats, result):
+    deleted, replaced_range = result
+    stats["rows_deleted"] += deleted
+    if replaced_range is not None:
+        extend_range(stats, *replaced_range)
+
+def process_trip_file(csv_file_path, chunksize=DEFAULT_CHUNKSIZE, parquet_dir=None):
+    """
+    Stream one trip CSV into MongoDB chunk by chunk. Trips are tagged with the
+    file name, and reloading a file replaces only the trips from its previous load.
+    With parquet_dir set, the cleaned trips are also written to tenant/month Parquet partitions.
+    """
+    source_file = os.path.basename(csv_file_path)
+    stats = {
+        "file": source_file,
+        "rows_read": 0,
+        "rows_loaded": 0,
+        "rows_deleted": 0,
+        "seconds": 0.0,
+        "range_start": None,
+        "range_end": None,
+        "tenant_counts": {},
+        "error": None
+    }
     
-    print("Tenant distribution:")
-    print(df['tenant_id'].value_counts())
-    
-    print("Preparing documents for MongoDB...")
-    
-    trip_documents = []
-    for _, row in df.iterrows():
-        doc = {
-            "tenant_id": row['tenant_id'],
-            "started_at": row['started_at'],
-            "ended_at": row['ended_at'],
-            "start_station_id": row['start_station_id'],
-            "end_station_id": row['end_station_id'],
-            "duration_seconds": int(row['duration_seconds'])
-        }
-        trip_documents.append(doc)
+    print(f"[{source_file}] Streaming trip data ({chunksize} rows per chunk)")
     
-    print(f"Inserting {len(trip_documents)} trip records...")
-    batch_size = 10000
+    try:
+        reader = pd.read_csv(csv_file_path, low_memory=False, chunksize=chunksize)
+    except Exception as e:
+        stats["error"] = f"Error loading CSV: {e}"
+        return stats
     
+    station_lookup = None
+    has_coordinates = None
     try:
-        result = trips_collection.delete_many({})
-        print(f"Cleared {result.deleted_count} existing trip records")
+        parquet_writer = TripParquetWriter(parquet_dir, source_file) if parquet_dir else None
     except Exception as e:
-        print(f"Error clearing existing data: {e}")
+        stats["error"] = f"Error opening Parquet output: {e}"
+        return stats
+    started = time.perf_counter()
+    
+    # One writer thread: the next chunk parses while the previous one inserts,
+    # and at most two chunks are ever held in memory
+    with ThreadPoolExecutor(max_workers=1) as writer:
+        pending = None
+        
+        try:
+            for chunk_number, df in enumerate(reader, start=1):
+                df.columns = df.columns.str.strip()
+                df = df.rename(columns=COLUMN_MAPPING)
+                stats["rows_read"] += len(df)
+                
+                if has_coordinates is None:
+                    missing_cols = [col for col in REQUIRED_COLUMNS if col not in df.columns]
+                    if missing_cols:
+                        stats["error"] = f"Missing required columns: {missing_cols}"
+                        return stats
+                    
+                    has_coordinates = 'start_station_latitude' in df.columns and 'start_station_longitude' in df.columns
+                    if not has_coordinates:
+                        print(f"[{source_file}] No coordinate data found in CSV. Using station lookup for tenant assignment.")
+                        station_lookup = load_station_lookup()
+                
+                df = clean_chunk(df)
+                
+                # An all-invalid chunk writes nothing, but chunk 1 still replaces the previous load
+                documents = []
+                if not df.empty:
+                    df = assign_tenants(df, has_coordinates, station_lookup)
+                    if parquet_writer:
+                        parquet_writer.write(df)
+                    for tenant_id, count in df['tenant_id'].value_counts().items():
+                        stats["tenant_counts"][tenant_id] = stats["tenant_counts"].get(tenant_id, 0) + int(count)
+                    extend_range(stats, df['started_at'].min(), df['started_at'].max())
+                    documents = chunk_to_documents(df, source_file)
+                stats["rows_loaded"] += len(documents)
+                
+                if pending is not None:
+                    record_write(stats, pending.result())
+                pending = writer.submit(write_chunk, documents, source_file, chunk_number == 1)
+                
+                elapsed = time.perf_counter() - started
+                print(f"[{source_file}] Chunk {chunk_number}: {stats['rows_loaded']} rows loaded ({stats['rows_read'] / elapsed:,.0f} rows/sec)")
+            
+            if pending is not None:
+                record_write(stats, pending.result())
+        
+        except Exception as e:
+            stats["error"] = f"Error processing trip data: {e}"
+            # Whatever was already written still needs its rollups rebuilt
+            if pending is not None and pending.done() and pending.exception() is None:
+                record_write(stats, pending.result())
+            return stats
+        
+        finally:
+            if parquet_writer:
+                parquet_writer.close()
+    
+    stats["seconds"] = time.perf_counter() - started
+    return stats
+
+def expand_paths(paths):
+    """Expand files, directories and glob patterns into a sorted list of CSV files"""
+    files = set()
+    for path in paths:
+        if os.path.isdir(path):
+            files.update(glob.glob(os.path.join(path, "*.csv")))
+        elif glob.has_magic(path):
+            files.update(glob.glob(path))
+        elif os.path.exists(path):
+            files.add(path)
+        else:
+            print(f"File not found: {path}")
+    return sorted(files)
+
+def print_file_stats(stats):
+    if stats["error"]:
+        print(f"[{stats['file']}] FAILED: {stats['error']}")
+        return
+    rate = stats["rows_read"] / stats["seconds"] if stats["seconds"] else 0
+    print(
+        f"[{stats['file']}] {stats['rows_loaded']} of {stats['rows_read']} rows loaded "
+        f"(replaced {stats['rows_deleted']}) in {stats['seconds']:.1f}s ({rate:,.0f} rows/sec)"
+    )
+
+def process_trip_data(csv_file_paths, chunksize=DEFAULT_CHUNKSIZE, workers=None, parquet_dir=None):
+    """Load one or more trip CSVs in parallel and rebuild rollups for the days they cover"""
+    workers = max(1, min(workers or os.cpu_count() or 1, len(csv_file_paths)))
+    print(f"Loading {len(csv_file_paths)} trip file(s) with {workers} worker process(es)")
+    if parquet_dir:
+        print(f"Writing Parquet partitions to: {parquet_dir}")
     
     try:
-        for i in range(0, len(trip_documents), batch_size):
-            batch = trip_documents[i:i + batch_size]
-            trips_collection.insert_many(batch)
-            print(f"Inserted batch {i//batch_size + 1}: {len(batch)} records")
+        get_db().trips.create_index([("source_file", 1)])
     except Exception as e:
-        print(f"Error inserting data: {e}")
+        print(f"Error creating source_file index: {e}")
+    
+    started = time.perf_counter()
+    results = []
+    
+    if workers == 1:
+        for path in csv_file_paths:
+            stats = process_trip_file(path, chunksize, parquet_dir)
+            print_file_stats(stats)
+            results.append(stats)
+    else:
+        # Spawned workers open their own MongoDB connection instead of inheriting ours
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+            futures = [pool.submit(process_trip_file, path, chunksize, parquet_dir) for path in csv_file_paths]
+            for future in as_completed(futures):
+                stats = future.result()
+                print_file_stats(stats)
+                results.append(stats)
+    
+    elapsed = time.perf_counter() - started
+    # Files that changed trips, including ones that failed after writing part of their load
+    loaded = [stats for stats in results if stats["range_start"] is not None]
+    rows_read = sum(stats["rows_read"] for stats in results)
+    rows_loaded = sum(stats["rows_loaded"] for stats in results)
+    
+    if not loaded:
+        print("No valid trip records to load")
         return
     
+    tenant_counts = {}
+    for stats in loaded:
+        for tenant_id, count in stats["tenant_counts"].items():
+            tenant_counts[tenant_id] = tenant_counts.get(tenant_id, 0) + count
+    print("Tenant distribution:")
+    for tenant_id, count in sorted(tenant_counts.items()):
+        print(f"{tenant_id:<12} {count}")
+    
+    print("Rebuilding trip rollups...")
+    for stats in sorted(loaded, key=lambda s: s["range_start"]):
+        try:
+            rollup_count = rebuild_rollups(
+                get_db(),
+                stats["range_start"].to_pydatetime(),
+                stats["range_end"].to_pydatetime()
+            )
+            print(f"[{stats['file']}] Rebuilt {rollup_count} station-hour rollups")
+        except Exception as e:
+            print(f"[{stats['file']}] Error rebuilding rollups: {e}")
+    
+    # Running API workers drop cached analytics and flows when this version changes
+    try:
+        version = bump_version_sync(get_db(), TRIPS_VERSION)
+        print(f"Trip data version is now {version}")
+    except Exception as e:
+        print(f"Error bumping trip data version: {e}")
+    
+    # ru_maxrss is reported in KiB on Linux; children covers the worker processes
+    peak_rss_mb = max(
+        resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    ) / 1024
+    print(
+        f"Ingested {rows_read} rows ({rows_loaded} loaded) from {len(loaded)} file(s) in {elapsed:.1f}s "
+        f"({rows_read / elapsed:,.0f} rows/sec, peak RSS per process {peak_rss_mb:.0f} MiB)"
+    )
     print("Trip data processing completed!")
     
     try:
-        manhattan_count = trips_collection.count_documents({"tenant_id": "manhattan"})
-        brooklyn_count = trips_collection.count_documents({"tenant_id": "brooklyn"})
+        trips_collection = get_db().trips
+        counts = {
+            tenant_id: trips_collection.count_documents({"tenant_id": tenant_id})
+            for tenant_id in get_tenant_index().tenant_ids
+        }
         
         print(f"\nFinal statistics:")
-        print(f"Manhattan trips: {manhattan_count}")
-        print(f"Brooklyn trips: {brooklyn_count}")
-        print(f"Total trips: {manhattan_count + brooklyn_count}")
+        for tenant_id, count in counts.items():
+            print(f"{tenant_id} trips: {count}")
+        print(f"Total trips: {sum(counts.values())}")
     except Exception as e:
         print(f"Error getting final statistics: {e}")
 
 if __name__ == "__main__":
-    if len(sys.argv) != 2:
-        print("Usage: python process_trip_data.py <path_to_csv_file>")
-        sys.exit(1)
+    parser = argparse.ArgumentParser(description="Load Citi Bike trip CSVs into MongoDB")
+    parser.add_argument("paths", nargs="*",
+                        help="Trip CSV files, directories of CSVs, or glob patterns")
+    parser.add_argument("--chunksize", type=int, default=DEFAULT_CHUNKSIZE,
+                        help="Rows parsed and inserted per chunk")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Parallel worker processes (default: CPU count)")
+    parser.add_argument("--parquet-dir", default=None,
+                        help="Also write tenant/month Parquet partitions here "
+                             "(default: PARQUET_TRIP_PATH when ANALYTICS_BACKEND=parquet)")
+    parser.add_argument("--rebuild-rollups", action="store_true",
+                        help="Rebuild trip rollups over all trips already in MongoDB and exit "
+                             "(one-time migration for trips loaded before rollups existed)")
+    args = parser.parse_args()
+    
+    if args.rebuild_rollups:
+        print("Rebuilding trip rollups over all loaded trips...")
+        rollup_count = backfill_rollups(get_db())
+        version = bump_version_sync(get_db(), TRIPS_VERSION)
+        print(f"Rebuilt {rollup_count} station-hour rollups; trip data version is now {version}")
+        sys.exit(0)
+    if not args.paths:
+        parser.error("paths are required unless --rebuild-rollups is given")
+    
+    parquet_dir = args.parquet_dir
+    if parquet_dir is None and settings.analytics_backend == "parquet":
+        parquet_dir = settings.parquet_trip_path
     
-    csv_file_path = sys.argv[1]
-    if not os.path.exists(csv_file_path):
-        print(f"File not found: {csv_file_path}")
+    csv_file_paths = expand_paths(args.paths)
+    if not csv_file_paths:
+        print("No CSV files to process")
         sys.exit(1)
     
-    process_trip_data(csv_file_path)
\ No newline at end of file
+    process_trip_data(csv_file_paths, chunksize=args.chunksize, workers=args.workers, parquet_dir=parquet_dir)
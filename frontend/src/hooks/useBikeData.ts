@@ -1,6 +1,6 @@
 import { useState, useEffect, useCallback, useRef } from "react";
 import { apiService, ApiError } from "../services/api";
-import type { Station, Alert, AnalyticsSummary } from "../types";
+import type { Station, Alert, AnalyticsSummary, StationUpdate } from "../types";
 
 interface UseBikeDataReturn {
   stations: Station[];
@@ -15,8 +15,25 @@ interface UseBikeDataReturn {
 interface UseBikeDataOptions {
   autoRefreshInterval?: number;
   enableAutoRefresh?: boolean;
+  enableLiveStations?: boolean;
 }
 
+const applyStationUpdate = (
+  stations: Station[],
+  update: StationUpdate
+): Station[] => {
+  const changed = new Map(update.stations.map((s) => [s.station_id, s]));
+  const removed = new Set(update.removed);
+  const next = stations
+    .filter((s) => !removed.has(s.station_id))
+    .map((s) => {
+      const replacement = changed.get(s.station_id);
+      changed.delete(s.station_id);
+      return replacement ?? s;
+    });
+  return next.concat(Array.from(changed.values()));
+};
+
 export const useBikeData = (
   selectedTenant: string,
   options: UseBikeDataOptions = {}
@@ -24,6 +41,7 @@ export const useBikeData = (
   const {
     autoRefreshInterval = 60000,
     enableAutoRefresh = true,
+    enableLiveStations = true,
   } = options;
 
   const [stations, setStations] = useState<Station[]>([]);
@@ -112,6 +130,34 @@ export const useBikeData = (
     };
   }, [fetchData, autoRefreshInterval, enableAutoRefresh]);
 
+  // Live station updates pushed after each GBFS cycle; polling still
+  // refreshes alerts and analytics (stations revalidate via ETag)
+  useEffect(() => {
+    if (!enableLiveStations || typeof EventSource === "undefined") {
+      return;
+    }
+
+    const source = new EventSource(apiService.getStationStreamUrl(selectedTenant));
+
+    const handleSnapshot = (event: MessageEvent) => {
+      setStations(JSON.parse(event.data));
+      setLastUpdate(new Date());
+    };
+
+    const handleUpdate = (event: MessageEvent) => {
+      const update: StationUpdate = JSON.parse(event.data);
+      setStations((current) => applyStationUpdate(current, update));
+      setLastUpdate(new Date());
+    };
+
+    source.addEventListener("snapshot", handleSnapshot as EventListener);
+    source.addEventListener("update", handleUpdate as EventListener);
+
+    return () => {
+      source.close();
+    };
+  }, [selectedTenant, enableLiveStations]);
+
   useEffect(() => {
     return () => {
       if (abortControllerRef.current) {
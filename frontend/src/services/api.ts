@@ -39,6 +39,9 @@ export const apiService = {
     return handleResponse<AnalyticsSummary>(response);
   },
 
+  getStationStreamUrl: (tenantId: string): string =>
+    `${API_BASE}/stations/${tenantId}/stream`,
+
   refreshStations: async (): Promise<{ message: string }> => {
     const response = await fetch(`${API_BASE}/stations/refresh`, {
       method: "POST",
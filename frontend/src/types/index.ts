@@ -28,6 +28,14 @@ export interface Station {
   status_color: "green" | "yellow" | "red";
 }
 
+export interface StationUpdate {
+  tenant_id: string;
+  sequence: number;
+  published_at: string;
+  stations: Station[];
+  removed: string[];
+}
+
 export interface Alert {
   station_id: string;
   station_name: string;